@@ -0,0 +1,2 @@
+# 前処理（preprocess/）と特徴量抽出（feature_extraction/）で共有するデータディレクトリのカタログとモデルの管理
+# 各ディレクトリのutils.pyがリポジトリ直下をsys.pathに追加して読み込む
@@ -0,0 +1,110 @@
+import fnmatch
+import json
+import os
+from logzero import logger
+
+# データディレクトリのファイルの一覧を保存するファイル（走査の対象にならないように"."で始める）
+CATALOG_FILE_NAME = ".catalog.json"
+CATALOG_VERSION = 2
+# このプロセスで作成したカタログ
+_catalogs = {}
+
+
+def _scan_files(dir_path):
+    """
+    ディレクトリ直下のファイル名を取得する（globと同じく"."で始まるものは無視する）
+    """
+    with os.scandir(dir_path) as entries:
+        return sorted(
+            entry.name
+            for entry in entries
+            if not entry.name.startswith(".") and entry.is_file()
+        )
+
+
+def _load_catalog(data_dir):
+    """
+    前回作成したカタログを読み込む（なければ空のカタログを返す）
+    """
+    if os.path.abspath(data_dir) in _catalogs:
+        return _catalogs[os.path.abspath(data_dir)]
+    catalog_path = os.path.join(data_dir, CATALOG_FILE_NAME)
+    if os.path.exists(catalog_path):
+        try:
+            with open(catalog_path, encoding="utf-8") as f:
+                catalog = json.load(f)
+            if catalog.get("version") == CATALOG_VERSION:
+                return catalog
+        except (OSError, ValueError):
+            logger.warning(f"{catalog_path}を読み込めないため、作成し直します")
+    return {"version": CATALOG_VERSION, "files": [], "sub_dirs": {}}
+
+
+def get_catalog(data_dir):
+    """
+    データディレクトリ直下とその1階層下（データIDごとのディレクトリ）のファイルの一覧を取得する
+    os.scandirで一度だけ走査し、結果はデータディレクトリの.catalog.jsonに保存する
+    更新時刻が変わっていないサブディレクトリは走査せずに前回の結果を再利用する
+    ディレクトリの更新時刻はファイルの追加・削除・名前の変更でしか変わらないため、
+    ファイルの内容が書き換えられても古くならないようにファイル名のみを保存する
+    各ファイルはdata_id（直下のファイルはNone）・name・pathを持つ
+    """
+    if not os.path.isdir(data_dir):
+        return []
+    previous_catalog = _load_catalog(data_dir)
+    catalog = {"version": CATALOG_VERSION, "files": [], "sub_dirs": {}}
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir():
+                mtime_ns = entry.stat().st_mtime_ns
+                previous_sub_dir = previous_catalog["sub_dirs"].get(entry.name)
+                if previous_sub_dir and previous_sub_dir["mtime_ns"] == mtime_ns:
+                    files = previous_sub_dir["files"]
+                else:
+                    files = _scan_files(entry.path)
+                catalog["sub_dirs"][entry.name] = {"mtime_ns": mtime_ns, "files": files}
+            elif entry.is_file():
+                catalog["files"].append(entry.name)
+    catalog["files"].sort()
+
+    if catalog != previous_catalog:
+        catalog_path = os.path.join(data_dir, CATALOG_FILE_NAME)
+        try:
+            with open(f"{catalog_path}.tmp", mode="w", encoding="utf-8") as f:
+                json.dump(catalog, f, ensure_ascii=False, sort_keys=True)
+            os.replace(f"{catalog_path}.tmp", catalog_path)
+        except OSError as e:
+            logger.warning(f"{catalog_path}にカタログを保存できませんでした：{e}")
+    _catalogs[os.path.abspath(data_dir)] = catalog
+
+    result = [
+        {"data_id": None, "name": name, "path": os.path.join(data_dir, name)}
+        for name in catalog["files"]
+    ]
+    for data_id, sub_dir in sorted(catalog["sub_dirs"].items()):
+        result += [
+            {
+                "data_id": data_id,
+                "name": name,
+                "path": os.path.join(data_dir, data_id, name),
+            }
+            for name in sub_dir["files"]
+        ]
+    return result
+
+
+def get_data_files(data_dir, patterns):
+    """
+    データIDごとのディレクトリにあるファイルのうち、いずれかのパターンに一致するものを
+    (データID, パス)のリストとして取得する
+    """
+    result = []
+    for file in get_catalog(data_dir):
+        if file["data_id"] is None:
+            continue
+        if any(fnmatch.fnmatch(file["name"], pattern) for pattern in patterns):
+            result.append((file["data_id"], file["path"]))
+    result.sort()
+    return result
@@ -0,0 +1,72 @@
+import time
+from logzero import logger
+
+# 初めて使うときに読み込むモデルの読み込み方法と読み込んだモデル
+_model_loaders = {}
+_models = {}
+_model_load_seconds = {}
+_device = None
+
+
+def set_device(device=None):
+    """
+    モデルを読み込むデバイスを設定する
+    指定がなければCUDAが使える場合はcuda、そうでなければcpuを使う
+    """
+    global _device
+    if device is None:
+        # torchの読み込みは重いので、デバイスを自動で選ぶときだけ読み込む
+        import torch
+
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+    _device = device
+    return device
+
+
+def get_device():
+    """
+    モデルを読み込むデバイスを取得する（設定されていなければ自動で選ぶ）
+    """
+    return _device if _device is not None else set_device()
+
+
+def set_num_threads(num_threads=None):
+    """
+    torchが推論に使うスレッド数を設定する（Noneならtorchのデフォルトのまま）
+    """
+    if num_threads is not None:
+        import torch
+
+        torch.set_num_threads(num_threads)
+
+
+def register_model(name, loader):
+    """
+    モデルの読み込み方法を登録する
+    loaderはデバイスを受け取ってモデルを返す関数で、モデルを初めて使うときに呼ばれる
+    """
+    _model_loaders[name] = loader
+
+
+def get_model(name):
+    """
+    モデルを取得する（初めて使うときに読み込む）
+    """
+    if name not in _models:
+        device = get_device()
+        logger.info(f"{name}を{device}で読み込んでいます...")
+        start = time.perf_counter()
+        _models[name] = _model_loaders[name](device)
+        _model_load_seconds[name] = time.perf_counter() - start
+        logger.info(f"{name}を読み込みました（{_model_load_seconds[name]:.1f}秒）")
+    return _models[name]
+
+
+def log_model_load_seconds():
+    """
+    このプロセスでモデルの読み込みにかかった時間を出力する
+    """
+    total_seconds = sum(_model_load_seconds.values())
+    logger.info(
+        f"モデルの読み込みにかかった時間：{total_seconds:.1f}秒 {_model_load_seconds}"
+    )
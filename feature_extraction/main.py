@@ -1,7 +1,25 @@
 from voice_opensmile import extract_opensmile_lld_feature, analyze_opensmile_stats
 from video_openface import analyze_openface_stats
-from voice_vggish import extract_vggish_feature
-from text_ginza import analyze_text
+from voice_vggish import (
+    extract_vggish_feature,
+    register_vggish_model,
+    VGGISH_BATCH_SIZE,
+    VGGISH_STORAGE_FORMATS,
+    DEFAULT_VGGISH_STORAGE_FORMAT,
+    VGGISH_CHECKPOINT_PATH,
+    VGGISH_PCA_PARAMS_PATH,
+    VGGISH_CHECKPOINT_SHA256,
+    VGGISH_PCA_PARAMS_SHA256,
+)
+from text_ginza import (
+    analyze_text,
+    TEXT_BATCH_SIZE,
+    TEXT_BACKENDS,
+    DEFAULT_TEXT_BACKEND,
+)
+from parse_cache import DEFAULT_MAX_ENTRIES
+from utils import set_device, log_model_load_seconds, get_missing_modalities
+import os
 import pandas as pd
 import argparse
 from logzero import logger
@@ -17,14 +35,49 @@ def main(
     no_text,
     no_video,
     no_voice,
+    device=None,
+    text_batch_size=TEXT_BATCH_SIZE,
+    text_n_process=1,
+    text_backend=DEFAULT_TEXT_BACKEND,
+    text_cache_options=None,
+    text_jobs=1,
+    vggish_checkpoint_path=VGGISH_CHECKPOINT_PATH,
+    vggish_pca_params_path=VGGISH_PCA_PARAMS_PATH,
+    vggish_batch_size=VGGISH_BATCH_SIZE,
+    vggish_threads=None,
+    vggish_storage_format=DEFAULT_VGGISH_STORAGE_FORMAT,
+    vggish_int8=False,
+    vggish_checkpoint_sha256=VGGISH_CHECKPOINT_SHA256,
+    vggish_pca_params_sha256=VGGISH_PCA_PARAMS_SHA256,
 ):
+    device = set_device(device)
+    register_vggish_model(
+        vggish_checkpoint_path,
+        vggish_pca_params_path,
+        vggish_int8,
+        vggish_checkpoint_sha256,
+        vggish_pca_params_sha256,
+    )
+    logger.info(f"デバイス: {device}")
     logger.info("特徴量の抽出を開始します")
+    for data_id, missing_modalities in get_missing_modalities(
+        preprocessed_dir, feature_dir
+    ).items():
+        logger.warning(f"{data_id}に{'・'.join(missing_modalities)}がありません")
     adult_qa_df = pd.read_csv(input_adult_qa_file)
     child_qa_df = pd.read_csv(input_child_qa_file)
     if not no_text:
         logger.info("テキスト特徴量を抽出しています....")
         adult_qa_df, child_qa_df = analyze_text(
-            adult_qa_df, child_qa_df, preprocessed_dir, feature_dir
+            adult_qa_df,
+            child_qa_df,
+            preprocessed_dir,
+            feature_dir,
+            text_batch_size,
+            text_n_process,
+            text_backend,
+            text_cache_options,
+            text_jobs,
         )
     if not no_video:
         logger.info("動画特徴量を抽出しています....")
@@ -37,9 +90,16 @@ def main(
             adult_qa_df, child_qa_df, preprocessed_dir
         )
         extract_opensmile_lld_feature(preprocessed_dir, feature_dir)
-        extract_vggish_feature(preprocessed_dir, feature_dir)
+        extract_vggish_feature(
+            preprocessed_dir,
+            feature_dir,
+            vggish_batch_size,
+            vggish_threads,
+            vggish_storage_format,
+        )
     adult_qa_df.to_csv(output_adult_qa_file, index=False)
     child_qa_df.to_csv(output_child_qa_file, index=False)
+    log_model_load_seconds()
     logger.info("特徴量の抽出が完了しました")
     return
 
@@ -101,6 +161,109 @@ if __name__ == "__main__":
         help="音声特徴量を抽出するか否か",
     )
 
+    parser.add_argument(
+        "--device",
+        default=None,
+        type=str,
+        help="モデルを読み込むデバイス（指定しなければCUDAが使えればcuda、そうでなければcpu）",
+    )
+
+    parser.add_argument(
+        "--text_batch_size",
+        default=TEXT_BATCH_SIZE,
+        type=int,
+        help="GiNZAで一度に解析するテキストの数",
+    )
+    parser.add_argument(
+        "--text_n_process",
+        default=1,
+        type=int,
+        help="GiNZAでテキストを解析するプロセス数（nlp.pipeのn_process）",
+    )
+    parser.add_argument(
+        "--text_jobs",
+        default=1,
+        type=int,
+        help="テキストファイルごとの分析を並列に実行するプロセス数（2以上なら--text_n_processは使わない）",
+    )
+    parser.add_argument(
+        "--text_backend",
+        default=DEFAULT_TEXT_BACKEND,
+        choices=list(TEXT_BACKENDS),
+        help="テキストの解析に使うバックエンド（electra: ja_ginza_electraの全コンポーネント、"
+        "electra_light・ginza_light: ja_ginza_electra・ja_ginzaから係り受け解析・固有表現抽出を除いたもの、"
+        "sudachi: ja_ginzaのSudachiPyによる形態素解析のみ）",
+    )
+
+    parser.add_argument(
+        "--text_cache_path",
+        default=None,
+        type=str,
+        help="テキストの解析結果をキャッシュするSQLiteファイル（指定しなければ特徴量のディレクトリのtext_cache.sqlite3）",
+    )
+    parser.add_argument(
+        "--text_cache_max_entries",
+        default=DEFAULT_MAX_ENTRIES,
+        type=int,
+        help="テキストの解析結果のキャッシュに保存する最大件数",
+    )
+    parser.add_argument(
+        "--no_text_cache",
+        action="store_true",
+        dest="no_text_cache",
+        help="テキストの解析結果のキャッシュを使わないか否か",
+    )
+
+    parser.add_argument(
+        "--vggish_checkpoint_path",
+        default=VGGISH_CHECKPOINT_PATH,
+        type=str,
+        help="VGGishの重みのファイル（読み込む前にSHA-256ハッシュを確認する）",
+    )
+    parser.add_argument(
+        "--vggish_pca_params_path",
+        default=VGGISH_PCA_PARAMS_PATH,
+        type=str,
+        help="VGGishのPCAのパラメータのファイル（読み込む前にSHA-256ハッシュを確認する）",
+    )
+    parser.add_argument(
+        "--vggish_checkpoint_sha256",
+        default=VGGISH_CHECKPOINT_SHA256,
+        type=str,
+        help="VGGishの重みのファイルのSHA-256ハッシュ（先頭の8桁以上、デフォルトはリリースのファイルのハッシュ）",
+    )
+    parser.add_argument(
+        "--vggish_pca_params_sha256",
+        default=VGGISH_PCA_PARAMS_SHA256,
+        type=str,
+        help="VGGishのPCAのパラメータのファイルのSHA-256ハッシュ（先頭の8桁以上、デフォルトはリリースのファイルのハッシュ）",
+    )
+    parser.add_argument(
+        "--vggish_batch_size",
+        default=VGGISH_BATCH_SIZE,
+        type=int,
+        help="VGGishに一度に入力する例（0.96秒ごとのlog-melスペクトログラム）の数",
+    )
+    parser.add_argument(
+        "--vggish_threads",
+        default=None,
+        type=int,
+        help="VGGishの推論に使うtorchのスレッド数（指定しなければtorchのデフォルト）",
+    )
+    parser.add_argument(
+        "--vggish_storage_format",
+        default=DEFAULT_VGGISH_STORAGE_FORMAT,
+        choices=list(VGGISH_STORAGE_FORMATS),
+        help="VGGishの特徴量の保存形式（float: 8bit量子化した値をCSVとfloat64の.npyファイルに保存、"
+        "uint8: 8bit量子化した値をuint8の.npyファイルに保存、float16: 量子化前のPCAの値をfloat16の.npyファイルに保存）",
+    )
+    parser.add_argument(
+        "--vggish_int8",
+        action="store_true",
+        dest="vggish_int8",
+        help="VGGishの全結合層をINT8に動的量子化し、TorchScriptでトレースしたモデルを使うか否か（CPUのみ）",
+    )
+
     args = parser.parse_args()
     input_adult_qa_file = args.input_adult_qa_file
     input_child_qa_file = args.input_child_qa_file
@@ -111,6 +274,26 @@ if __name__ == "__main__":
     no_text = args.no_text
     no_video = args.no_video
     no_voice = args.no_voice
+    device = args.device
+    text_batch_size = args.text_batch_size
+    text_n_process = args.text_n_process
+    text_backend = args.text_backend
+    text_jobs = args.text_jobs
+    vggish_checkpoint_path = args.vggish_checkpoint_path
+    vggish_pca_params_path = args.vggish_pca_params_path
+    vggish_checkpoint_sha256 = args.vggish_checkpoint_sha256
+    vggish_pca_params_sha256 = args.vggish_pca_params_sha256
+    vggish_batch_size = args.vggish_batch_size
+    vggish_threads = args.vggish_threads
+    vggish_storage_format = args.vggish_storage_format
+    vggish_int8 = args.vggish_int8
+    text_cache_options = None
+    if not args.no_text_cache:
+        text_cache_options = {
+            "cache_path": args.text_cache_path
+            or os.path.join(feature_dir, "text_cache.sqlite3"),
+            "max_entries": args.text_cache_max_entries,
+        }
 
     logger.info(f"入力アンケートデータ（成人）: {input_adult_qa_file}")
     logger.info(f"入力アンケートデータ（児童思春期）: {input_child_qa_file}")
@@ -128,4 +311,18 @@ if __name__ == "__main__":
         no_text,
         no_video,
         no_voice,
+        device,
+        text_batch_size,
+        text_n_process,
+        text_backend,
+        text_cache_options,
+        text_jobs,
+        vggish_checkpoint_path,
+        vggish_pca_params_path,
+        vggish_batch_size,
+        vggish_threads,
+        vggish_storage_format,
+        vggish_int8,
+        vggish_checkpoint_sha256,
+        vggish_pca_params_sha256,
     )
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from logzero import logger
+
+# キャッシュに保存する発話の解析結果の最大件数（超えた場合は最後に使われた時刻が古いものから削除する）
+DEFAULT_MAX_ENTRIES = 1000000
+# SQLiteの1つのクエリに含める変数の最大数
+_QUERY_CHUNK_SIZE = 500
+
+# キャッシュから復元したトークン（特徴量の計算に使う属性のみをspaCyのTokenと同じ名前で持つ）
+ParsedToken = namedtuple("ParsedToken", ["text", "lemma_", "pos_"])
+
+
+def get_parse_key(text, model_id):
+    """
+    発話テキストとモデルからキャッシュのキーを作成する
+    """
+    return hashlib.sha256(f"{model_id}:{text}".encode()).hexdigest()
+
+
+def to_parsed_tokens(doc):
+    """
+    spaCyのDocをParsedTokenのリストに変換する
+    """
+    return [ParsedToken(token.text, token.lemma_, token.pos_) for token in doc]
+
+
+class ParseCache:
+    """
+    発話テキストごとのGiNZAの解析結果（トークンの表層形・見出し語・品詞）をSQLiteに保存するキャッシュ
+    """
+
+    def __init__(self, cache_path, max_entries=DEFAULT_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # 並列実行時は複数のプロセスから同じファイルに書き込むため、ロックを待てるようにする
+        self.connection = sqlite3.connect(cache_path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS parses ("
+            "key TEXT PRIMARY KEY, tokens TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS parses_last_used ON parses (last_used)"
+        )
+        self.connection.commit()
+
+    def get_many(self, keys):
+        """
+        キャッシュされた解析結果を{キー: ParsedTokenのリスト}として取得する（ないキーは含まない）
+        """
+        keys = list(dict.fromkeys(keys))
+        parses = {}
+        for i in range(0, len(keys), _QUERY_CHUNK_SIZE):
+            chunk = keys[i : i + _QUERY_CHUNK_SIZE]
+            rows = self.connection.execute(
+                f"SELECT key, tokens FROM parses WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for key, tokens in rows:
+                parses[key] = [ParsedToken(*token) for token in json.loads(tokens)]
+        self.hits += len(parses)
+        self.misses += len(keys) - len(parses)
+        now = time.time()
+        self.connection.executemany(
+            "UPDATE parses SET last_used = ? WHERE key = ?",
+            [(now, key) for key in parses],
+        )
+        self.connection.commit()
+        return parses
+
+    def put_many(self, parses):
+        """
+        {キー: ParsedTokenのリスト}をキャッシュに保存する
+        """
+        now = time.time()
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO parses (key, tokens, last_used) VALUES (?, ?, ?)",
+            [
+                (key, json.dumps(tokens, ensure_ascii=False), now)
+                for key, tokens in parses.items()
+            ],
+        )
+        self.connection.commit()
+
+    def log_stats(self):
+        """
+        キャッシュのヒット数・ミス数を出力する
+        """
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total > 0 else 0
+        logger.info(
+            f"テキスト解析のキャッシュ：ヒット{self.hits}件、ミス{self.misses}件（ヒット率{hit_rate:.1f}%）"
+        )
+
+    def evict(self):
+        """
+        最大件数を超えた分を最後に使われた時刻が古いものから削除する
+        """
+        (count,) = self.connection.execute("SELECT COUNT(*) FROM parses").fetchone()
+        if count <= self.max_entries:
+            return
+        self.connection.execute(
+            "DELETE FROM parses WHERE key IN ("
+            "SELECT key FROM parses ORDER BY last_used ASC LIMIT ?)",
+            (count - self.max_entries,),
+        )
+        self.connection.commit()
+        logger.info(
+            f"テキスト解析のキャッシュから{count - self.max_entries}件を削除しました"
+        )
+
+    def close(self):
+        """
+        上限を超えた分を削除してからキャッシュを閉じる
+        """
+        self.evict()
+        self.connection.close()
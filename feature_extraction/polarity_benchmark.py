@@ -0,0 +1,199 @@
+import os
+import argparse
+import time
+from functools import partial
+import numpy as np
+import pandas as pd
+from logzero import logger
+from polarity_lexicon import load_lexicon, NEGATIVE, POSITIVE
+from text_ginza import (
+    parse_texts,
+    _find_verb_adj,
+    NOUNS_FILE,
+    VERB_ADJ_FILE,
+    VERB_ADJ_POS,
+    TEXT_BACKENDS,
+    TEXT_BATCH_SIZE,
+)
+from utils import get_text_files, set_device
+
+# 合成する発話で用言の前後に付ける文
+_PREFIXES = ["今日は", "最近は仕事で", "家族と話していて", "正直に言うと", "その時は"]
+_SUFFIXES = [
+    "と思います。",
+    "気がします。",
+    "ことが多いです。",
+    "。",
+    "かもしれません。",
+]
+
+
+def _make_synthetic_texts(lexicon, utterance_count, seed=0):
+    """
+    極性辞書の用言（複数の単語からなるものを含む）を前後の文でつないだ発話を作成する
+    """
+    rng = np.random.default_rng(seed)
+    phrases = list(lexicon.verb_adj)
+    texts = []
+    for _ in range(utterance_count):
+        phrase = phrases[rng.integers(len(phrases))]
+        texts.append(
+            _PREFIXES[rng.integers(len(_PREFIXES))]
+            + "".join(phrase)
+            + _SUFFIXES[rng.integers(len(_SUFFIXES))]
+        )
+    return texts
+
+
+def _count_single_token(docs, verb_adj):
+    """
+    以前の方法：空白を除いてつなげた用言の集合に、動詞・形容詞の見出し語が含まれるかをトークンごとに調べる
+    """
+    count = 0
+    for doc in docs:
+        for token in doc:
+            if token.pos_ in VERB_ADJ_POS and token.lemma_ in verb_adj:
+                count += 1
+    return count
+
+
+def _count_phrase(docs, verb_adj_matcher):
+    """
+    現在の方法：見出し語の列をトライ木で最長一致で検索する
+    """
+    return sum(sum(1 for _ in _find_verb_adj(doc, verb_adj_matcher)) for doc in docs)
+
+
+def _get_best_seconds(func, repeats):
+    """
+    repeats回実行した中で最も短い時間と結果を返す
+    """
+    best_seconds = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best_seconds = min(best_seconds, time.perf_counter() - start)
+    return best_seconds, result
+
+
+def main(
+    input_data_dir,
+    output_path,
+    text_backend="ginza_light",
+    synthetic_utterances=720,
+    repeats=5,
+    device=None,
+):
+    """
+    被験者のテキスト（なければ極性辞書の用言から合成した発話）を解析し、用言の極性の判定にかかる時間と
+    見つかった用言の数を、以前のトークンごとの集合の検索とトライ木での検索で比較する
+    """
+    set_device(device)
+    lexicon = load_lexicon(NOUNS_FILE, VERB_ADJ_FILE)
+    texts = []
+    for _, text_file in get_text_files(os.path.join(input_data_dir, "subject_text")):
+        texts += pd.read_csv(text_file)["text"].dropna().astype(str).tolist()
+    if len(texts) == 0:
+        logger.info(
+            f"テキストファイルが見つからないため、極性辞書の用言から{synthetic_utterances}個の発話を合成します"
+        )
+        texts = _make_synthetic_texts(lexicon, synthetic_utterances)
+
+    start = time.perf_counter()
+    docs = parse_texts(texts, TEXT_BATCH_SIZE, 1, text_backend)
+    parse_seconds = time.perf_counter() - start
+    token_count = sum(len(doc) for doc in docs)
+    logger.info(
+        f"{len(texts)}個の発話（{token_count}トークン）を{text_backend}で解析しました（{parse_seconds:.1f}秒）"
+    )
+
+    rows = []
+    for polarity, matcher in [
+        (NEGATIVE, lexicon.negative_verb_adj),
+        (POSITIVE, lexicon.positive_verb_adj),
+    ]:
+        # 以前の極性辞書と同じく、用言の見出し語の空白を除いてつなげる
+        single_token_verb_adj = frozenset(
+            "".join(lemmas)
+            for lemmas, attributes in lexicon.verb_adj.items()
+            if any(x[0] == polarity for x in attributes)
+        )
+        for method, func in [
+            ("single_token", partial(_count_single_token, docs, single_token_verb_adj)),
+            ("phrase", partial(_count_phrase, docs, matcher)),
+        ]:
+            seconds, hits = _get_best_seconds(func, repeats)
+            rows.append(
+                {
+                    "polarity": polarity,
+                    "method": method,
+                    "hits": hits,
+                    "seconds": seconds,
+                    "utterances": len(texts),
+                    "tokens": token_count,
+                }
+            )
+            logger.info(
+                f"{polarity}・{method}：{seconds * 1000:.1f}ミリ秒、{hits}個の用言"
+            )
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    pd.DataFrame(rows).to_csv(output_path, index=False)
+    logger.info(f"結果を{output_path}に保存しました")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--input_data_dir",
+        help="前処理済みのデータを格納しているディレクトリ",
+        type=str,
+        default="../data/preprocessed",
+    )
+    parser.add_argument(
+        "--output_path",
+        help="極性・方法ごとの時間と見つかった用言の数を保存するCSVファイル",
+        type=str,
+        default="../data/feature/polarity_benchmark.csv",
+    )
+    parser.add_argument(
+        "--text_backend",
+        default="ginza_light",
+        choices=list(TEXT_BACKENDS),
+        help="テキストの解析に使うバックエンド",
+    )
+    parser.add_argument(
+        "--synthetic_utterances",
+        default=720,
+        type=int,
+        help="テキストファイルが見つからない場合に合成する発話の数",
+    )
+    parser.add_argument(
+        "--repeats",
+        default=5,
+        type=int,
+        help="それぞれの方法を実行する回数（最も短い時間を記録する）",
+    )
+    parser.add_argument(
+        "--device",
+        type=str,
+        default=None,
+        help="モデルを読み込むデバイス（指定しなければCUDAが使えればcuda、そうでなければcpu）",
+    )
+
+    args = parser.parse_args()
+    input_data_dir = args.input_data_dir
+    output_path = args.output_path
+    text_backend = args.text_backend
+    synthetic_utterances = args.synthetic_utterances
+    repeats = args.repeats
+    device = args.device
+
+    main(
+        input_data_dir,
+        output_path,
+        text_backend,
+        synthetic_utterances,
+        repeats,
+        device,
+    )
@@ -0,0 +1,222 @@
+import hashlib
+import os
+import pickle
+from logzero import logger
+import pandas as pd
+
+# 極性辞書を変換した結果を保存するファイル（極性辞書と同じディレクトリに作成する）
+LEXICON_CACHE_FILE_NAME = ".polarity_lexicon.pkl"
+LEXICON_CACHE_VERSION = 2
+
+NEGATIVE = "negative"
+POSITIVE = "positive"
+NEUTRAL = "neutral"
+# 名詞編の極性の記号（"?p?n"などの曖昧なものは使わない）
+_NOUN_POLARITIES = {"n": NEGATIVE, "p": POSITIVE, "e": NEUTRAL}
+# 用言編の極性の接頭辞（"ネガ（評価）"のように括弧内が分類になっている）
+_VERB_ADJ_POLARITIES = {"ネガ": NEGATIVE, "ポジ": POSITIVE}
+# トライ木で見出し語の列の終わりを表すキー
+_PHRASE_END = None
+
+
+class PhraseMatcher:
+    """
+    見出し語の列（"あきれる た"などの複数の単語からなる用言を含む）をトライ木にしたもの
+    単語の列の各位置から最長一致で検索するので、1回の走査で全ての用言を見つけられる
+    """
+
+    def __init__(self, phrases):
+        self.root = {}
+        self.phrase_count = 0
+        for phrase in phrases:
+            node = self.root
+            for lemma in phrase:
+                node = node.setdefault(lemma, {})
+            if _PHRASE_END not in node:
+                node[_PHRASE_END] = True
+                self.phrase_count += 1
+
+    def __len__(self):
+        return self.phrase_count
+
+    def __contains__(self, lemma):
+        """
+        1単語の見出し語が含まれているか否か
+        """
+        node = self.root.get(lemma)
+        return node is not None and _PHRASE_END in node
+
+    def find(self, lemmas):
+        """
+        見出し語のリストから、左から順に最長一致で重ならないように用言を探し、
+        (開始位置, 終了位置)を返す
+        """
+        i = 0
+        while i < len(lemmas):
+            node = self.root
+            end = None
+            for j in range(i, len(lemmas)):
+                node = node.get(lemmas[j])
+                if node is None:
+                    break
+                if _PHRASE_END in node:
+                    end = j + 1
+            if end is None:
+                i += 1
+            else:
+                yield i, end
+                i = end
+
+
+class PolarityLexicon:
+    """
+    極性辞書の名詞・用言を見出し語（lemma）で引けるようにしたもの
+    nounsは{見出し語: ((極性, 分類), ...)}、verb_adjは{見出し語のタプル: ((極性, 分類), ...)}の辞書で、
+    極性ごとに名詞はfrozenset、用言はPhraseMatcherで持つので、トークンごとの検索はO(1)で済む
+    """
+
+    def __init__(self, nouns, verb_adj):
+        self.nouns = nouns
+        self.verb_adj = verb_adj
+        self.negative_nouns = self._get_lemmas(nouns, NEGATIVE)
+        self.positive_nouns = self._get_lemmas(nouns, POSITIVE)
+        self.negative_verb_adj = PhraseMatcher(self._get_lemmas(verb_adj, NEGATIVE))
+        self.positive_verb_adj = PhraseMatcher(self._get_lemmas(verb_adj, POSITIVE))
+
+    @staticmethod
+    def _get_lemmas(entries, polarity):
+        """
+        指定した極性を持つ見出し語の集合を作成する
+        """
+        return frozenset(
+            lemma
+            for lemma, attributes in entries.items()
+            if any(x[0] == polarity for x in attributes)
+        )
+
+    def get_noun_polarities(self, lemma):
+        """
+        名詞の(極性, 分類)のタプルを返す（辞書になければ空のタプルを返す）
+        """
+        return self.nouns.get(lemma, ())
+
+    def get_verb_adj_polarities(self, lemmas):
+        """
+        用言の(極性, 分類)のタプルを返す（辞書になければ空のタプルを返す）
+        lemmasは見出し語のタプルか、"あきれる た"のように空白で区切った文字列
+        """
+        if isinstance(lemmas, str):
+            lemmas = tuple(lemmas.split())
+        return self.verb_adj.get(tuple(lemmas), ())
+
+
+def _get_file_hash(file_path):
+    """
+    ファイルの内容のSHA-256ハッシュを計算する
+    """
+    with open(file_path, mode="rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _add_entry(entries, lemma, polarity, category):
+    """
+    見出し語に(極性, 分類)を追加する（同じ組み合わせは重複させない）
+    """
+    attributes = entries.get(lemma, ())
+    if (polarity, category) not in attributes:
+        entries[lemma] = attributes + ((polarity, category),)
+
+
+def _compile_nouns(nouns_file):
+    """
+    名詞編を{見出し語: ((極性, 分類), ...)}に変換する
+    """
+    nouns_df = pd.read_csv(nouns_file, sep="\t", header=None, dtype=str)
+    nouns = {}
+    for lemma, polarity, category in zip(nouns_df[0], nouns_df[1], nouns_df[2]):
+        if polarity not in _NOUN_POLARITIES:
+            continue
+        _add_entry(
+            nouns,
+            str(lemma).strip(),
+            _NOUN_POLARITIES[polarity],
+            str(category).strip(),
+        )
+    return nouns
+
+
+def _compile_verb_adj(verb_adj_file):
+    """
+    用言編を{見出し語のタプル: ((極性, 分類), ...)}に変換する
+    "あきれる た"のような複数の単語からなる用言は、空白で区切って("あきれる", "た")にする
+    """
+    verb_adj_df = pd.read_csv(verb_adj_file, sep="\t", header=None, dtype=str)
+    verb_adj_df = verb_adj_df.dropna()
+    verb_adj = {}
+    for label, lemma in zip(verb_adj_df[0], verb_adj_df[1]):
+        for prefix, polarity in _VERB_ADJ_POLARITIES.items():
+            if prefix in label:
+                category = label.replace(prefix, "").strip("（）()")
+                _add_entry(verb_adj, tuple(lemma.split()), polarity, category)
+    return verb_adj
+
+
+def _load_lexicon_cache(cache_path, key):
+    """
+    変換済みの極性辞書を読み込む（極性辞書が変わっていたり、読み込めなければNoneを返す）
+    """
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, mode="rb") as f:
+            cache = pickle.load(f)
+    except Exception as e:
+        logger.warning(
+            f"{cache_path}を読み込めなかったため、極性辞書を変換し直します：{e}"
+        )
+        return None
+    if cache.get("key") != key:
+        logger.info("極性辞書が変更されたため、変換し直します")
+        return None
+    return cache["nouns"], cache["verb_adj"]
+
+
+def _save_lexicon_cache(cache_path, key, nouns, verb_adj):
+    """
+    変換した極性辞書を保存する（途中で中断しても壊れないように一時ファイルを経由する）
+    """
+    tmp_cache_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_cache_path, mode="wb") as f:
+            pickle.dump(
+                {"key": key, "nouns": nouns, "verb_adj": verb_adj},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_cache_path, cache_path)
+    except OSError as e:
+        logger.warning(f"{cache_path}に変換した極性辞書を保存できませんでした：{e}")
+
+
+def load_lexicon(nouns_file, verb_adj_file):
+    """
+    極性辞書（名詞編・用言編）を読み込む
+    変換結果は極性辞書のハッシュをキーとして保存し、極性辞書が変わらない限り再利用する
+    """
+    key = (
+        LEXICON_CACHE_VERSION,
+        _get_file_hash(nouns_file),
+        _get_file_hash(verb_adj_file),
+    )
+    cache_path = os.path.join(
+        os.path.dirname(os.path.abspath(nouns_file)), LEXICON_CACHE_FILE_NAME
+    )
+    cache = _load_lexicon_cache(cache_path, key)
+    if cache is not None:
+        return PolarityLexicon(*cache)
+
+    nouns = _compile_nouns(nouns_file)
+    verb_adj = _compile_verb_adj(verb_adj_file)
+    _save_lexicon_cache(cache_path, key, nouns, verb_adj)
+    logger.info(f"極性辞書を変換し、{cache_path}に保存しました")
+    return PolarityLexicon(nouns, verb_adj)
@@ -0,0 +1,225 @@
+import os
+import argparse
+import time
+import pandas as pd
+from logzero import logger
+from polarity_lexicon import load_lexicon
+from text_ginza import (
+    parse_texts,
+    get_text_features,
+    column_names,
+    NOUNS_FILE,
+    VERB_ADJ_FILE,
+    TEXT_BACKENDS,
+    DEFAULT_TEXT_BACKEND,
+    TEXT_BATCH_SIZE,
+)
+from utils import get_text_files, set_device
+
+# 単語分割・品詞・見出し語の一致率を表す行の特徴量名
+TOKEN_AGREEMENT = "TokenAgreement"
+
+
+def _get_token_agreement(baseline_docs, docs):
+    """
+    基準のバックエンドと単語分割・品詞・見出し語が全て一致したトークンの割合を計算する
+    単語分割が異なる発話のトークンは全て一致しなかったものとして数える
+    """
+    token_count = 0
+    agreed_token_count = 0
+    for baseline_doc, doc in zip(baseline_docs, docs):
+        token_count += len(baseline_doc)
+        if [token.text for token in baseline_doc] != [token.text for token in doc]:
+            continue
+        agreed_token_count += sum(
+            baseline_token.pos_ == token.pos_ and baseline_token.lemma_ == token.lemma_
+            for baseline_token, token in zip(baseline_doc, doc)
+        )
+    return agreed_token_count / token_count if token_count else 1.0
+
+
+def _get_parity_rows(data_id, text_backend, baseline_features, features, agreement):
+    """
+    基準のバックエンドとの特徴量の差を特徴量ごとの行にする
+    """
+    rows = [
+        {
+            "data_id": data_id,
+            "text_backend": text_backend,
+            "feature": TOKEN_AGREEMENT,
+            "baseline": 1.0,
+            "value": agreement,
+        }
+    ]
+    for key, value in features.items():
+        rows.append(
+            {
+                "data_id": data_id,
+                "text_backend": text_backend,
+                "feature": column_names[key],
+                "baseline": baseline_features[key],
+                "value": value,
+            }
+        )
+    return rows
+
+
+def _log_summary(report_df, parse_seconds, baseline_backend):
+    """
+    バックエンドごとに解析時間と特徴量の平均の相対誤差を出力する
+    基準が0の特徴量は相対誤差がNaNになるため平均には含めず、値が異なるものを別に出力する
+    """
+    for text_backend, backend_df in report_df.groupby("text_backend", sort=False):
+        speedup = parse_seconds[baseline_backend] / max(
+            parse_seconds[text_backend], 1e-9
+        )
+        feature_df = backend_df[backend_df["feature"] != TOKEN_AGREEMENT]
+        relative_errors = feature_df.groupby("feature", sort=False)[
+            "relative_diff"
+        ].apply(lambda x: x.abs().mean() * 100)
+        # 平均の相対誤差に含まれない、基準が0で値が異なる特徴量
+        undefined_df = feature_df[
+            feature_df["relative_diff"].isna() & (feature_df["diff"] != 0)
+        ]
+        agreement = backend_df[backend_df["feature"] == TOKEN_AGREEMENT]["value"]
+        logger.info(
+            f"{text_backend}：解析{parse_seconds[text_backend]:.1f}秒（{baseline_backend}の{speedup:.1f}倍速）、"
+            f"トークンの一致率{agreement.mean() * 100:.1f}%"
+        )
+        logger.info(
+            f"{text_backend}：特徴量の平均の相対誤差 "
+            + " ".join(f"{k}:{v:.1f}%" for k, v in relative_errors.items())
+        )
+        if len(undefined_df) > 0:
+            logger.warning(
+                f"{text_backend}：基準が0のため相対誤差を計算できず、値が異なるものが{len(undefined_df)}件あります（特徴量："
+                + " ".join(undefined_df["feature"].drop_duplicates())
+                + "）"
+            )
+
+
+def main(
+    input_data_dir,
+    output_path,
+    text_backends,
+    baseline_backend=DEFAULT_TEXT_BACKEND,
+    text_batch_size=TEXT_BATCH_SIZE,
+    device=None,
+):
+    """
+    同じテキストを各バックエンドで解析し、基準のバックエンドとの特徴量の差をCSVファイルに保存する
+    """
+    set_device(device)
+    text_files = get_text_files(os.path.join(input_data_dir, "subject_text"))
+    if len(text_files) == 0:
+        logger.error("テキストファイルが見つかりませんでした")
+        raise ValueError("テキストファイルが見つかりませんでした")
+    lexicon = load_lexicon(NOUNS_FILE, VERB_ADJ_FILE)
+    text_backends = [baseline_backend] + [
+        x for x in text_backends if x != baseline_backend
+    ]
+    # モデルの読み込み時間を解析時間に含めないように、先に読み込んでおく
+    for text_backend in text_backends:
+        parse_texts([], text_backend=text_backend)
+    logger.info(
+        f"{len(text_files)}個のテキストファイルを{text_backends}で解析し、{baseline_backend}と比較します"
+    )
+
+    parse_seconds = {text_backend: 0.0 for text_backend in text_backends}
+    rows = []
+    for data_id, text_file in text_files:
+        text_data = pd.read_csv(text_file)
+        texts = text_data["text"].tolist()
+        start_seconds = text_data["start_seconds"].tolist()
+        end_seconds = text_data["end_seconds"].tolist()
+        for text_backend in text_backends:
+            start = time.perf_counter()
+            docs = parse_texts(texts, text_batch_size, 1, text_backend)
+            parse_seconds[text_backend] += time.perf_counter() - start
+            features, _ = get_text_features(
+                texts, docs, start_seconds, end_seconds, lexicon
+            )
+            if text_backend == baseline_backend:
+                baseline_docs = docs
+                baseline_features = features
+                continue
+            rows += _get_parity_rows(
+                data_id,
+                text_backend,
+                baseline_features,
+                features,
+                _get_token_agreement(baseline_docs, docs),
+            )
+        logger.info(f"{data_id}のテキストを比較しました")
+
+    report_df = pd.DataFrame(
+        rows, columns=["data_id", "text_backend", "feature", "baseline", "value"]
+    )
+    report_df["diff"] = report_df["value"] - report_df["baseline"]
+    # 基準が0の場合は相対誤差を定義できないので、差があっても0にはせずNaNにする
+    report_df["relative_diff"] = (report_df["diff"] / report_df["baseline"]).where(
+        report_df["baseline"] != 0
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    report_df.to_csv(output_path, index=False)
+    _log_summary(report_df, parse_seconds, baseline_backend)
+    logger.info(f"結果を{output_path}に保存しました")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--input_data_dir",
+        help="前処理済みのデータを格納しているディレクトリ",
+        type=str,
+        default="../data/preprocessed",
+    )
+    parser.add_argument(
+        "--output_path",
+        help="バックエンドごとの特徴量の差を保存するCSVファイル",
+        type=str,
+        default="../data/feature/text_backend_parity.csv",
+    )
+    parser.add_argument(
+        "--text_backends",
+        nargs="+",
+        default=[x for x in TEXT_BACKENDS if x != DEFAULT_TEXT_BACKEND],
+        choices=list(TEXT_BACKENDS),
+        help="比較するバックエンド",
+    )
+    parser.add_argument(
+        "--baseline_backend",
+        default=DEFAULT_TEXT_BACKEND,
+        choices=list(TEXT_BACKENDS),
+        help="基準にするバックエンド",
+    )
+    parser.add_argument(
+        "--text_batch_size",
+        default=TEXT_BATCH_SIZE,
+        type=int,
+        help="GiNZAで一度に解析するテキストの数",
+    )
+    parser.add_argument(
+        "--device",
+        type=str,
+        default=None,
+        help="モデルを読み込むデバイス（指定しなければCUDAが使えればcuda、そうでなければcpu）",
+    )
+
+    args = parser.parse_args()
+    input_data_dir = args.input_data_dir
+    output_path = args.output_path
+    text_backends = args.text_backends
+    baseline_backend = args.baseline_backend
+    text_batch_size = args.text_batch_size
+    device = args.device
+
+    logger.info(f"入力ディレクトリ：{input_data_dir}")
+    main(
+        input_data_dir,
+        output_path,
+        text_backends,
+        baseline_backend,
+        text_batch_size,
+        device,
+    )
@@ -1,11 +1,51 @@
 import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import repeat
 from logzero import logger
 import pandas as pd
-import spacy
 from collections import Counter
-from utils import get_text_files
+from utils import (
+    get_text_files,
+    get_model,
+    register_model,
+    get_device,
+    set_device,
+)
+from polarity_lexicon import load_lexicon
+from parse_cache import ParseCache, get_parse_key, to_parsed_tokens
+
+GINZA_MODEL_NAME = "ja_ginza_electra"
+# GiNZAで一度に解析するテキストの数
+TEXT_BATCH_SIZE = 64
+# 用言として数える品詞
+VERB_ADJ_POS = ["VERB", "ADJ"]
+# 極性辞書（名詞編・用言編）
+NOUNS_FILE = "./sentiment_polarity/名詞.tsv"
+VERB_ADJ_FILE = "./sentiment_polarity/用言.tsv"
+
+# 特徴量の計算に使う品詞・見出し語に影響しないGiNZAのコンポーネント
+_UNUSED_COMPONENTS = ("parser", "ner", "bunsetu_recognizer")
+# SudachiPyの形態素解析（品詞・見出し語）のみを使う場合に読み込まないコンポーネント
+_NON_TOKENIZER_COMPONENTS = (
+    "transformer",
+    "tok2vec",
+    "morphologizer",
+    "compound_splitter",
+) + _UNUSED_COMPONENTS
+# テキストの解析に使うバックエンド（{バックエンド名: (spaCyのモデル名, 読み込まないコンポーネント)}）
+TEXT_BACKENDS = {
+    "electra": (GINZA_MODEL_NAME, ()),
+    "electra_light": (GINZA_MODEL_NAME, _UNUSED_COMPONENTS),
+    "ginza_light": ("ja_ginza", _UNUSED_COMPONENTS),
+    "sudachi": ("ja_ginza", _NON_TOKENIZER_COMPONENTS),
+}
+DEFAULT_TEXT_BACKEND = "electra"
 
-nlp = spacy.load("ja_ginza_electra")
+# ワーカープロセスで使う極性辞書とテキストの解析結果のキャッシュ（_init_text_workerで読み込む）
+_worker_lexicon = None
+_worker_parse_cache = None
 
 column_names = {
     "NegativeNounCount": "Neg_Noun_Count",
@@ -23,6 +63,33 @@ column_names = {
 }
 
 
+def _load_ginza_model(device, model_name=GINZA_MODEL_NAME, exclude=()):
+    """
+    GiNZAのモデルを読み込む（excludeに指定したコンポーネントは読み込まない）
+    """
+    import spacy
+
+    if device.startswith("cuda"):
+        spacy.prefer_gpu()
+    return spacy.load(model_name, exclude=list(exclude))
+
+
+def _get_text_model_name(text_backend):
+    """
+    バックエンドのモデルを登録する名前を取得する
+    """
+    if text_backend == DEFAULT_TEXT_BACKEND:
+        return GINZA_MODEL_NAME
+    return f"{TEXT_BACKENDS[text_backend][0]}:{text_backend}"
+
+
+for _text_backend, (_model_name, _exclude) in TEXT_BACKENDS.items():
+    register_model(
+        _get_text_model_name(_text_backend),
+        partial(_load_ginza_model, model_name=_model_name, exclude=_exclude),
+    )
+
+
 def _get_top_frequent_words(counter, top_num=5):
     """
     頻出単語を取得する
@@ -30,15 +97,77 @@ def _get_top_frequent_words(counter, top_num=5):
     return dict(counter.most_common(top_num))
 
 
-def _calculate_speech_rate(texts, start_seconds, end_seconds):
+def _get_text_model_id(text_backend):
+    """
+    解析結果が変わりうるので、キャッシュのキーに含めるモデルとGiNZAのバージョンを含むIDを作成する
+    モデルを読み込まずに済むように、インストールされているパッケージのバージョンを使う
+    """
+    import spacy
+
+    model_name = TEXT_BACKENDS[text_backend][0]
+    model_version = spacy.util.get_package_version(model_name)
+    ginza_version = spacy.util.get_package_version("ginza")
+    return f"{model_name}=={model_version}:ginza=={ginza_version}:{text_backend}"
+
+
+def _pipe_texts(texts, batch_size, n_process, text_backend):
+    """
+    テキストをnlp.pipeでまとめてGiNZAで解析し、テキストと同じ順番のDocのリストを返す
+    長さの近いテキストを同じバッチにすることで、パディングによる無駄な計算を減らす
+    """
+    nlp = get_model(_get_text_model_name(text_backend))
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    docs = [None] * len(texts)
+    parsed_docs = nlp.pipe(
+        (texts[i] for i in order), batch_size=batch_size, n_process=n_process
+    )
+    for i, doc in zip(order, parsed_docs):
+        docs[i] = doc
+    return docs
+
+
+def parse_texts(
+    texts,
+    batch_size=TEXT_BATCH_SIZE,
+    n_process=1,
+    text_backend=DEFAULT_TEXT_BACKEND,
+    parse_cache=None,
+):
+    """
+    テキストをGiNZAで解析し、テキストと同じ順番の解析結果のリストを返す
+    parse_cacheがNoneならDocのリストを、そうでなければParsedTokenのリストのリストを返し、
+    キャッシュにない（新しい・編集された）テキストのみを解析する
+    """
+    if text_backend not in TEXT_BACKENDS:
+        logger.error(f"テキストのバックエンド{text_backend}は存在しません")
+        raise ValueError(f"テキストのバックエンド{text_backend}は存在しません")
+    if parse_cache is None:
+        return _pipe_texts(texts, batch_size, n_process, text_backend)
+
+    model_id = _get_text_model_id(text_backend)
+    keys = [get_parse_key(text, model_id) for text in texts]
+    parses = parse_cache.get_many(keys)
+    missing_texts = {key: text for key, text in zip(keys, texts) if key not in parses}
+    if len(missing_texts) > 0:
+        new_docs = _pipe_texts(
+            list(missing_texts.values()), batch_size, n_process, text_backend
+        )
+        new_parses = {
+            key: to_parsed_tokens(doc) for key, doc in zip(missing_texts, new_docs)
+        }
+        parse_cache.put_many(new_parses)
+        parses.update(new_parses)
+    return [parses[key] for key in keys]
+
+
+def _calculate_speech_rate(texts, docs, start_seconds, end_seconds):
     """
     1分間の文字数と単語数を計算する
     """
-    assert len(texts) == len(start_seconds) == len(end_seconds)
+    assert len(texts) == len(docs) == len(start_seconds) == len(end_seconds)
     char_counts = [len(text) for text in texts]
     word_counts = []
-    for text in texts:
-        doc = nlp(text)
+    for doc in docs:
         words = [token.text for token in doc if token.pos_ != "SPACE"]
         word_counts.append(len(words))
     durations = [end - start for start, end in zip(start_seconds, end_seconds)]
@@ -53,7 +182,19 @@ def _calculate_speech_rate(texts, start_seconds, end_seconds):
     return average_char_per_minutes, average_word_per_minutes
 
 
-def _count_negative_words(texts, negative_nouns, negative_verb_adj):
+def _find_verb_adj(doc, verb_adj_matcher):
+    """
+    Docの中から極性辞書の用言を探し、見つかった用言（見出し語をつなげたもの）を返す
+    複数の単語からなる用言は品詞を問わず、1単語の用言は動詞・形容詞のみを対象にする
+    """
+    lemmas = [token.lemma_ for token in doc]
+    for start, end in verb_adj_matcher.find(lemmas):
+        if end - start == 1 and doc[start].pos_ not in VERB_ADJ_POS:
+            continue
+        yield "".join(lemmas[start:end])
+
+
+def _count_negative_words(docs, negative_nouns, negative_verb_adj):
     """
     ネガティブ単語をカウントする
     """
@@ -64,8 +205,7 @@ def _count_negative_words(texts, negative_nouns, negative_verb_adj):
     negative_noun_counter = Counter()
     negative_verb_adj_counter = Counter()
 
-    for text in texts:
-        doc = nlp(text)
+    for doc in docs:
         for token in doc:
             # ネガティブな名詞をカウント
             if token.pos_ == "NOUN":
@@ -73,12 +213,12 @@ def _count_negative_words(texts, negative_nouns, negative_verb_adj):
                 if token.lemma_ in negative_nouns:
                     negative_noun_count += 1
                     negative_noun_counter[token.lemma_] += 1
-            # ネガティブな用言をカウント
-            elif token.pos_ in ["VERB", "ADJ"]:
+            elif token.pos_ in VERB_ADJ_POS:
                 total_verb_adj_count += 1
-                if token.lemma_ in negative_verb_adj:
-                    negative_verb_count += 1
-                    negative_verb_adj_counter[token.lemma_] += 1
+        # ネガティブな用言（複数の単語からなるものを含む）をカウント
+        for verb_adj in _find_verb_adj(doc, negative_verb_adj):
+            negative_verb_count += 1
+            negative_verb_adj_counter[verb_adj] += 1
 
     top_negative_nouns = _get_top_frequent_words(negative_noun_counter)
     top_negative_verb_adj = _get_top_frequent_words(negative_verb_adj_counter)
@@ -94,7 +234,7 @@ def _count_negative_words(texts, negative_nouns, negative_verb_adj):
     )
 
 
-def _count_positive_words(texts, positive_nouns, positive_verb_adj):
+def _count_positive_words(docs, positive_nouns, positive_verb_adj):
     """
     ポジティブ単語をカウントする
     """
@@ -105,8 +245,7 @@ def _count_positive_words(texts, positive_nouns, positive_verb_adj):
     positive_noun_counter = Counter()
     positive_verb_counter = Counter()
 
-    for text in texts:
-        doc = nlp(text)
+    for doc in docs:
         for token in doc:
             # ポジティブな名詞をカウント
             if token.pos_ == "NOUN":
@@ -114,12 +253,12 @@ def _count_positive_words(texts, positive_nouns, positive_verb_adj):
                 if token.lemma_ in positive_nouns:
                     positive_noun_count += 1
                     positive_noun_counter[token.lemma_] += 1
-            # ポジティブな用言をカウント
-            elif token.pos_ in ["VERB", "ADJ"]:
+            elif token.pos_ in VERB_ADJ_POS:
                 total_verb_adj_count += 1
-                if token.lemma_ in positive_verb_adj:
-                    positive_verb_count += 1
-                    positive_verb_counter[token.lemma_] += 1
+        # ポジティブな用言（複数の単語からなるものを含む）をカウント
+        for verb_adj in _find_verb_adj(doc, positive_verb_adj):
+            positive_verb_count += 1
+            positive_verb_counter[verb_adj] += 1
     top_positive_nouns = _get_top_frequent_words(positive_noun_counter)
     top_positive_verb_adj = _get_top_frequent_words(positive_verb_counter)
 
@@ -135,210 +274,230 @@ def _count_positive_words(texts, positive_nouns, positive_verb_adj):
     )
 
 
-def _get_negative_nouns(nouns_file):
+def get_text_features(texts, docs, start_seconds, end_seconds, lexicon):
     """
-    極性辞書からネガティブな名詞のみを読み取る
+    1つのテキストファイルの解析結果から特徴量を計算する
+    ({column_namesのキー: 値}, (ネガティブな名詞, ネガティブな用言, ポジティブな名詞, ポジティブな用言の頻出語))を返す
     """
-    negative_nouns = []
-    nouns_df = pd.read_csv(nouns_file, sep="\t", header=None)
-    for _, row in nouns_df.iterrows():
-        if row[1] == "n":
-            negative_nouns.append(str(row[0]).strip())
-    return negative_nouns
+    char_per_minutes, word_per_minutes = _calculate_speech_rate(
+        texts, docs, start_seconds, end_seconds
+    )
+    (
+        negative_noun_count,
+        negative_verb_adj_count,
+        percentage_negative_nouns,
+        percentage_negative_verb_adj,
+        top_negative_nouns,
+        top_negative_verb_adj,
+    ) = _count_negative_words(docs, lexicon.negative_nouns, lexicon.negative_verb_adj)
+    (
+        positive_nouns_count,
+        positive_verb_adj_count,
+        percentage_positive_nouns,
+        percentage_positive_verb_adj,
+        top_positive_nouns,
+        top_positive_verb_adj,
+    ) = _count_positive_words(docs, lexicon.positive_nouns, lexicon.positive_verb_adj)
+    features = {
+        "NegativeNounCount": negative_noun_count,
+        "NegativeVerbAdjCount": negative_verb_adj_count,
+        "NegativeWordCount": negative_noun_count + negative_verb_adj_count,
+        "PositiveNounCount": positive_nouns_count,
+        "PositiveVerbAdjCount": positive_verb_adj_count,
+        "PositiveWordCount": positive_nouns_count + positive_verb_adj_count,
+        "PercentagePositiveNouns": percentage_positive_nouns,
+        "PercentagePositiveVerbAdj": percentage_positive_verb_adj,
+        "PercentageNegativeNouns": percentage_negative_nouns,
+        "PercentageNegativeVerbAdj": percentage_negative_verb_adj,
+        "CharPerMinutes": char_per_minutes,
+        "WordPerMinutes": word_per_minutes,
+    }
+    top_words = (
+        top_negative_nouns,
+        top_negative_verb_adj,
+        top_positive_nouns,
+        top_positive_verb_adj,
+    )
+    return features, top_words
 
 
-def _get_positive_nouns(nouns_file):
+def _add_results(qa_result_df, data_id, features):
     """
-    極性辞書からポジティブな名詞のみを読み取る
+    結果をDataFrameに追加する
     """
-    positive_nouns = []
-    nouns_df = pd.read_csv(nouns_file, sep="\t", header=None)
-    for _, row in nouns_df.iterrows():
-        if row[1] == "p":
-            positive_nouns.append(str(row[0]).strip())
-    return positive_nouns
+    for key, value in features.items():
+        qa_result_df.loc[qa_result_df["ID"] == data_id, column_names[key]] = value
+    return qa_result_df
 
 
-def _get_negative_verb_adj(verbs_file):
+def _write_result(file_name, result_dict):
     """
-    極性辞書からネガティブな用言のみを読み込む
+    結果を書き込む
     """
-    negative_verbs = []
-    verbs_df = pd.read_csv(verbs_file, sep="\t", header=None)
-    for _, row in verbs_df.iterrows():
-        if "ネガ" in row[0]:
-            negative_verbs.append(str(row[1]).replace(" ", "").strip())
-    return negative_verbs
+    with open(file_name, "w") as f:
+        f.writelines("\n".join(str(k) + "," + str(v) for k, v in result_dict.items()))
 
 
-def _get_positive_verb_adj(verbs_file):
+def _analyze_text_file(
+    text_file, lexicon, text_batch_size, text_n_process, text_backend, parse_cache
+):
     """
-    極性辞書からポジティブな用言のみを読み込む
+    1つのテキストファイルを分析し、(特徴量, 頻出語)を返す
     """
-    positive_verbs = []
-    verbs_df = pd.read_csv(verbs_file, sep="\t", header=None)
-    for _, row in verbs_df.iterrows():
-        if "ポジ" in row[0]:
-            positive_verbs.append(str(row[1]).replace(" ", "").strip())
-    return positive_verbs
+    logger.info(f"{text_file}からテキストを分析しています....")
+    text_data = pd.read_csv(text_file)
+    texts = text_data["text"].tolist()
+    start_seconds = text_data["start_seconds"].tolist()
+    end_seconds = text_data["end_seconds"].tolist()
+    docs = parse_texts(
+        texts, text_batch_size, text_n_process, text_backend, parse_cache
+    )
+    return get_text_features(texts, docs, start_seconds, end_seconds, lexicon)
 
 
-def _add_results(
-    qa_result_df,
-    data_id,
-    negative_noun_count,
-    negative_verb_adj_count,
-    positive_nouns_count,
-    positive_verb_adj_count,
-    percentage_negative_nouns,
-    percentage_negative_verb_adj,
-    percentage_positive_nouns,
-    percentage_positive_verb_adj,
-    char_per_minutes,
-    word_per_minutes,
-):
+def _init_text_worker(device, text_cache_options):
     """
-    結果をDataFrameに追加する
+    ワーカープロセスの初期化を行う
+    極性辞書とキャッシュはプロセスごとに一度だけ読み込み、GiNZAのモデルは初めて使うときに読み込む
     """
-    qa_result_df.loc[
-        qa_result_df["ID"] == data_id, column_names["NegativeNounCount"]
-    ] = negative_noun_count
-    qa_result_df.loc[
-        qa_result_df["ID"] == data_id,
-        column_names["NegativeVerbAdjCount"],
-    ] = negative_verb_adj_count
-    qa_result_df.loc[
-        qa_result_df["ID"] == data_id, column_names["NegativeWordCount"]
-    ] = negative_noun_count + negative_verb_adj_count
-
-    qa_result_df.loc[
-        qa_result_df["ID"] == data_id, column_names["PositiveNounCount"]
-    ] = positive_nouns_count
-    qa_result_df.loc[
-        qa_result_df["ID"] == data_id,
-        column_names["PositiveVerbAdjCount"],
-    ] = positive_verb_adj_count
-    qa_result_df.loc[
-        qa_result_df["ID"] == data_id, column_names["PositiveWordCount"]
-    ] = positive_nouns_count + positive_verb_adj_count
-
-    qa_result_df.loc[
-        qa_result_df["ID"] == data_id,
-        column_names["PercentagePositiveNouns"],
-    ] = percentage_positive_nouns
-    qa_result_df.loc[
-        qa_result_df["ID"] == data_id,
-        column_names["PercentagePositiveVerbAdj"],
-    ] = percentage_positive_verb_adj
-    qa_result_df.loc[
-        qa_result_df["ID"] == data_id,
-        column_names["PercentageNegativeNouns"],
-    ] = percentage_negative_nouns
-    qa_result_df.loc[
-        qa_result_df["ID"] == data_id,
-        column_names["PercentageNegativeVerbAdj"],
-    ] = percentage_negative_verb_adj
-    qa_result_df.loc[
-        qa_result_df["ID"] == data_id,
-        column_names["CharPerMinutes"],
-    ] = char_per_minutes
-    qa_result_df.loc[
-        qa_result_df["ID"] == data_id,
-        column_names["WordPerMinutes"],
-    ] = word_per_minutes
-    return qa_result_df
+    global _worker_lexicon, _worker_parse_cache
+    set_device(device)
+    _worker_lexicon = load_lexicon(NOUNS_FILE, VERB_ADJ_FILE)
+    if text_cache_options is not None:
+        _worker_parse_cache = ParseCache(**text_cache_options)
 
 
-def _write_result(file_name, result_dict):
+def _analyze_text_file_worker(text_file, text_batch_size, text_backend):
     """
-    結果を書き込む
+    ワーカープロセス上で1つのテキストファイルを分析する
+    (特徴量, 頻出語, キャッシュのヒット数, キャッシュのミス数)を返す
     """
-    with open(file_name, "w") as f:
-        f.writelines("\n".join(str(k) + "," + str(v) for k, v in result_dict.items()))
-
-
-def analyze_text(adult_qa_df, child_qa_df, input_data_dir, output_data_dir):
+    hits = misses = 0
+    if _worker_parse_cache is not None:
+        hits, misses = _worker_parse_cache.hits, _worker_parse_cache.misses
+    features, top_words = _analyze_text_file(
+        text_file,
+        _worker_lexicon,
+        text_batch_size,
+        1,
+        text_backend,
+        _worker_parse_cache,
+    )
+    if _worker_parse_cache is not None:
+        hits = _worker_parse_cache.hits - hits
+        misses = _worker_parse_cache.misses - misses
+    return features, top_words, hits, misses
+
+
+def _analyze_text_files_parallel(
+    text_files,
+    text_jobs,
+    text_batch_size,
+    text_backend,
+    text_cache_options,
+    parse_cache,
+):
+    """
+    テキストファイルを複数のプロセスで並列に分析し、text_filesと同じ順番で(特徴量, 頻出語)のリストを返す
+    """
+    # CUDAを使う場合があるためforkではなくspawnでワーカーを起動する
+    with ProcessPoolExecutor(
+        max_workers=text_jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_text_worker,
+        initargs=(get_device(), text_cache_options),
+    ) as executor:
+        worker_results = list(
+            executor.map(
+                _analyze_text_file_worker,
+                [text_file for _, text_file in text_files],
+                repeat(text_batch_size),
+                repeat(text_backend),
+            )
+        )
+    results = []
+    for features, top_words, hits, misses in worker_results:
+        if parse_cache is not None:
+            parse_cache.hits += hits
+            parse_cache.misses += misses
+        results.append((features, top_words))
+    return results
+
+
+def analyze_text(
+    adult_qa_df,
+    child_qa_df,
+    input_data_dir,
+    output_data_dir,
+    text_batch_size=TEXT_BATCH_SIZE,
+    text_n_process=1,
+    text_backend=DEFAULT_TEXT_BACKEND,
+    text_cache_options=None,
+    text_jobs=1,
+):
     """
     GiNZAと極性辞書を使ってテキストを分析する
+    テキストファイルごとに全ての発話を一度だけ解析し、その結果を全ての特徴量の計算に使う
+    text_cache_optionsはParseCacheの引数で、Noneなら解析結果のキャッシュを使わない
+    text_jobsが2以上ならテキストファイルごとの分析を複数のプロセスで並列に行い、
+    結果は直列に実行した場合と同じ順番で結合する
     """
-    logger.info("テキストを分析しています....")
+    logger.info(f"テキストを分析しています（バックエンド：{text_backend}）....")
     text_files = get_text_files(os.path.join(input_data_dir, "subject_text"))
     if len(text_files) == 0:
         logger.error("テキストファイルが見つかりませんでした")
         raise ValueError("テキストファイルが見つかりませんでした")
     logger.info(f"{len(text_files)}個のテキストファイルを読み込みました")
 
-    nouns_file = "./sentiment_polarity/名詞.tsv"
-    verb_adj_file = "./sentiment_polarity/用言.tsv"
-    negative_nouns = _get_negative_nouns(nouns_file)
-    positive_nouns = _get_positive_nouns(nouns_file)
-    negative_verb_adj = _get_negative_verb_adj(verb_adj_file)
-    positive_verb_adj = _get_positive_verb_adj(verb_adj_file)
+    parse_cache = None
+    if text_cache_options is not None:
+        parse_cache = ParseCache(**text_cache_options)
+    if text_jobs > 1:
+        logger.info(f"{text_jobs}個のプロセスでテキストを分析します")
+        results = _analyze_text_files_parallel(
+            text_files,
+            text_jobs,
+            text_batch_size,
+            text_backend,
+            text_cache_options,
+            parse_cache,
+        )
+    else:
+        lexicon = load_lexicon(NOUNS_FILE, VERB_ADJ_FILE)
+        results = (
+            _analyze_text_file(
+                text_file,
+                lexicon,
+                text_batch_size,
+                text_n_process,
+                text_backend,
+                parse_cache,
+            )
+            for _, text_file in text_files
+        )
 
     all_negative_noun_counter = Counter()
     all_negative_verb_adj_counter = Counter()
     all_positive_noun_counter = Counter()
     all_positive_verb_adj_counter = Counter()
-
-    for data_id, text_file in text_files:
-        logger.info(f"{text_file}からテキストを分析しています....")
-        text_data = pd.read_csv(text_file)
-        texts = text_data["text"].tolist()
-        start_seconds = text_data["start_seconds"].tolist()
-        end_seconds = text_data["end_seconds"].tolist()
-        char_per_minutes, word_per_minutes = _calculate_speech_rate(
-            texts, start_seconds, end_seconds
-        )
-        (
-            negative_noun_count,
-            negative_verb_adj_count,
-            percentage_negative_nouns,
-            percentage_negative_verb_adj,
-            top_negative_nouns,
-            top_negative_verb_adj,
-        ) = _count_negative_words(texts, negative_nouns, negative_verb_adj)
-        all_negative_noun_counter.update(top_negative_nouns)
-        all_negative_verb_adj_counter.update(top_negative_verb_adj)
-        (
-            positive_nouns_count,
-            positive_verb_adj_count,
-            percentage_positive_nouns,
-            percentage_positive_verb_adj,
-            top_positive_nouns,
-            top_positive_verb_adj,
-        ) = _count_positive_words(texts, positive_nouns, positive_verb_adj)
-        all_positive_noun_counter.update(top_positive_nouns)
-        all_positive_verb_adj_counter.update(top_positive_verb_adj)
-
-        adult_qa_df = _add_results(
-            adult_qa_df,
-            data_id,
-            negative_noun_count,
-            negative_verb_adj_count,
-            positive_nouns_count,
-            positive_verb_adj_count,
-            percentage_negative_nouns,
-            percentage_negative_verb_adj,
-            percentage_positive_nouns,
-            percentage_positive_verb_adj,
-            char_per_minutes,
-            word_per_minutes,
-        )
-
-        child_qa_df = _add_results(
-            child_qa_df,
-            data_id,
-            negative_noun_count,
-            negative_verb_adj_count,
-            positive_nouns_count,
-            positive_verb_adj_count,
-            percentage_negative_nouns,
-            percentage_negative_verb_adj,
-            percentage_positive_nouns,
-            percentage_positive_verb_adj,
-            char_per_minutes,
-            word_per_minutes,
-        )
+    # 並列に実行した場合もtext_filesの順番で結合するので、頻出語の順位は直列の場合と変わらない
+    for (data_id, _), (features, top_words) in zip(text_files, results):
+        for counter, words in zip(
+            (
+                all_negative_noun_counter,
+                all_negative_verb_adj_counter,
+                all_positive_noun_counter,
+                all_positive_verb_adj_counter,
+            ),
+            top_words,
+        ):
+            counter.update(words)
+        adult_qa_df = _add_results(adult_qa_df, data_id, features)
+        child_qa_df = _add_results(child_qa_df, data_id, features)
+
+    if parse_cache is not None:
+        parse_cache.log_stats()
+        parse_cache.close()
 
     os.makedirs(os.path.join(output_data_dir, "text_ranking"), exist_ok=True)
     all_top_negative_nouns = _get_top_frequent_words(all_negative_noun_counter, 100)
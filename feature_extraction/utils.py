@@ -1,8 +1,25 @@
 import numpy as np
 import os
-import glob
+import sys
+import fnmatch
 import pandas as pd
 
+# リポジトリ直下のcommon/（前処理と共有するモジュール）を読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.catalog import get_catalog, get_data_files
+from common.models import (
+    set_device,
+    get_device,
+    set_num_threads,
+    register_model,
+    get_model,
+    log_model_load_seconds,
+)
+
+# 前処理で作成した16kHz・モノラル・16bitの音声のNumPy形式のファイルの接尾辞（preprocess/main.pyと同じ）
+PCM_SIDECAR_SUFFIX = "_pcm16k.npy"
+PCM_SIDECAR_SAMPLE_RATE = 16000
+
 
 def _save_as_npy(csv_file_path, output_dir):
     """
@@ -28,38 +45,77 @@ def get_voice_files(input_data_dir):
     """
     音声ファイルを取得する
     """
-    pattern = os.path.join(input_data_dir, "*", "*.wav")
-    file_paths = glob.glob(pattern, recursive=True)
-    result = []
-    for file_path in file_paths:
-        data_id = os.path.relpath(file_path, input_data_dir).split(os.sep)[0]
-        result.append((data_id, file_path))
-    result.sort()
-    return result
+    return get_data_files(input_data_dir, ["*.wav"])
+
+
+def get_pcm_sidecar_path(voice_file_path):
+    """
+    前処理済みの音声に対応する16kHzの音声のファイルがあればそのパスを、なければNoneを返す
+    """
+    pcm_sidecar_path = os.path.splitext(voice_file_path)[0] + PCM_SIDECAR_SUFFIX
+    if os.path.exists(pcm_sidecar_path):
+        return pcm_sidecar_path
+    return None
+
+
+def load_voice(voice_file_path):
+    """
+    音声を[-1, 1]の浮動小数点数の配列とサンプリングレートとして読み込む
+    16kHzの音声のファイルがあれば、デコードやリサンプリングをせずにメモリマップで読み込む
+    """
+    pcm_sidecar_path = get_pcm_sidecar_path(voice_file_path)
+    if pcm_sidecar_path is not None:
+        pcm = np.load(pcm_sidecar_path, mmap_mode="r")
+        return pcm.astype(np.float32) / (1 << 15), PCM_SIDECAR_SAMPLE_RATE
+    import librosa
+
+    return librosa.load(voice_file_path, sr=None)
 
 
 def get_text_files(input_data_dir):
     """
     テキストファイルを取得する
     """
-    pattern = os.path.join(input_data_dir, "*.csv")
-    file_paths = glob.glob(pattern, recursive=True)
     result = []
-    for file_path in file_paths:
-        data_id = (
-            os.path.relpath(file_path, input_data_dir).split(os.sep)[0].split("_")[0]
-        )
-        result.append((data_id, file_path))
+    for file in get_catalog(input_data_dir):
+        if file["data_id"] is None and fnmatch.fnmatch(file["name"], "*.csv"):
+            result.append((file["name"].split("_")[0], file["path"]))
     result.sort()
     return result
 
 
 def get_openface_files(input_data_dir):
-    pattern = os.path.join(input_data_dir, "*.csv")
-    file_paths = glob.glob(pattern, recursive=True)
     result = []
-    for file_path in file_paths:
-        data_id = os.path.splitext(os.path.basename(file_path))[0]
-        result.append((data_id, file_path))
+    for file in get_catalog(input_data_dir):
+        if file["data_id"] is None and fnmatch.fnmatch(file["name"], "*.csv"):
+            result.append((os.path.splitext(file["name"])[0], file["path"]))
     result.sort()
     return result
+
+
+def get_missing_modalities(preprocessed_dir, feature_dir):
+    """
+    データIDごとに見つからなかった前処理済みのデータ・特徴量の種類を取得する
+    """
+    modality_files = {
+        "前処理済みの音声": get_voice_files(preprocessed_dir),
+        "被験者のテキスト": get_text_files(
+            os.path.join(preprocessed_dir, "subject_text")
+        ),
+        "OpenFaceの特徴量": get_openface_files(os.path.join(feature_dir, "openface")),
+    }
+    modality_data_ids = {
+        modality: {data_id for data_id, _ in files}
+        for modality, files in modality_files.items()
+    }
+    data_ids = set().union(*modality_data_ids.values())
+    missing_modalities = {}
+    for data_id in sorted(data_ids):
+        missing = [
+            modality
+            for modality, ids in modality_data_ids.items()
+            if data_id not in ids
+        ]
+        if missing:
+            missing_modalities[data_id] = missing
+    return missing_modalities
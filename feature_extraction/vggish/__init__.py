@@ -0,0 +1,2 @@
+# VGGish (https://github.com/harritaylor/torchvggish, Apache License 2.0) のモデル定義と入力の前処理
+# torch.hubを使わずに、ローカルの重みからモデルを作成できるようにこのリポジトリに含めている
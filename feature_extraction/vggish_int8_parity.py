@@ -0,0 +1,206 @@
+import os
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from logzero import logger
+from vggish import vggish_params
+from voice_vggish import (
+    load_vggish_model,
+    get_vggish_embeddings,
+    VGGISH_BATCH_SIZE,
+    VGGISH_CHECKPOINT_PATH,
+    VGGISH_PCA_PARAMS_PATH,
+    VGGISH_CHECKPOINT_SHA256,
+    VGGISH_PCA_PARAMS_SHA256,
+)
+from utils import set_num_threads
+
+# 合成音声で基本周波数を変える間隔（秒）
+_TONE_SECONDS = 1.0
+
+
+def _make_synthetic_audio(seconds, seed=0):
+    """
+    ベンチマーク用に、一定間隔で基本周波数と大きさが変わる調波音に雑音を混ぜた16kHzの音声を作成する
+    """
+    rng = np.random.default_rng(seed)
+    sample_rate = vggish_params.SAMPLE_RATE
+    tone_samples = int(_TONE_SECONDS * sample_rate)
+    t = np.arange(tone_samples) / sample_rate
+    tones = []
+    for _ in range(int(np.ceil(seconds / _TONE_SECONDS))):
+        f0 = rng.uniform(80, 400)
+        tone = sum(
+            np.sin(2 * np.pi * f0 * k * t + rng.uniform(0, 2 * np.pi)) / k
+            for k in range(1, 6)
+        )
+        tones.append(rng.uniform(0.05, 0.5) * tone / 2)
+    waveform = np.concatenate(tones)[: int(seconds * sample_rate)]
+    waveform += rng.normal(scale=0.01, size=len(waveform))
+    return np.clip(waveform, -1, 1).astype(np.float32)
+
+
+def _get_frames_per_second(model, waveform, batch_size):
+    """
+    VGGishの特徴量の抽出にかかった時間から、1秒あたりに処理したフレーム（0.96秒の例）の数を計算する
+    """
+    # 初回の推論の準備にかかる時間を含めないように、先に1バッチ分だけ推論しておく
+    get_vggish_embeddings(model, waveform[: vggish_params.SAMPLE_RATE * 10], batch_size)
+    start = time.perf_counter()
+    embeddings = get_vggish_embeddings(model, waveform, batch_size)
+    return len(embeddings) / (time.perf_counter() - start)
+
+
+def _get_cosine_similarity(x, y):
+    """
+    フレームごとのコサイン類似度を計算する
+    """
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    norm = np.linalg.norm(x, axis=1) * np.linalg.norm(y, axis=1)
+    return np.sum(x * y, axis=1) / np.maximum(norm, 1e-12)
+
+
+def main(
+    output_path,
+    checkpoint_path=VGGISH_CHECKPOINT_PATH,
+    pca_params_path=VGGISH_PCA_PARAMS_PATH,
+    seconds=600,
+    batch_size=VGGISH_BATCH_SIZE,
+    num_threads=None,
+    checkpoint_sha256=VGGISH_CHECKPOINT_SHA256,
+    pca_params_sha256=VGGISH_PCA_PARAMS_SHA256,
+):
+    """
+    合成音声からfloat32のVGGishとINT8のVGGishで特徴量を抽出し、フレームごとのコサイン類似度と
+    1秒あたりに処理したフレームの数を比較する
+    """
+    set_num_threads(num_threads)
+    float_model = load_vggish_model(
+        "cpu",
+        checkpoint_path,
+        pca_params_path,
+        checkpoint_sha256=checkpoint_sha256,
+        pca_params_sha256=pca_params_sha256,
+    )
+    int8_model = load_vggish_model(
+        "cpu",
+        checkpoint_path,
+        pca_params_path,
+        int8=True,
+        checkpoint_sha256=checkpoint_sha256,
+        pca_params_sha256=pca_params_sha256,
+    )
+    waveform = _make_synthetic_audio(seconds)
+    logger.info(f"{seconds}秒の合成音声でfloat32とINT8のVGGishを比較します")
+
+    # コサイン類似度はPCAを適用した量子化前の値で、8bit量子化した値は保存する値で比較する
+    float_pca = get_vggish_embeddings(float_model, waveform, batch_size, "float16")
+    int8_pca = get_vggish_embeddings(int8_model, waveform, batch_size, "float16")
+    float_codes = get_vggish_embeddings(float_model, waveform, batch_size, "uint8")
+    int8_codes = get_vggish_embeddings(int8_model, waveform, batch_size, "uint8")
+    report_df = pd.DataFrame(
+        {
+            "frame": np.arange(len(float_pca)),
+            "start_seconds": np.arange(len(float_pca))
+            * vggish_params.EXAMPLE_HOP_SECONDS,
+            "cosine_similarity": _get_cosine_similarity(float_pca, int8_pca),
+            "max_abs_diff": np.abs(
+                float_pca.astype(np.float32) - int8_pca.astype(np.float32)
+            ).max(axis=1),
+            "max_code_diff": np.abs(
+                float_codes.astype(np.int16) - int8_codes.astype(np.int16)
+            ).max(axis=1),
+        }
+    )
+
+    float_fps = _get_frames_per_second(float_model, waveform, batch_size)
+    int8_fps = _get_frames_per_second(int8_model, waveform, batch_size)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    report_df.to_csv(output_path, index=False)
+    logger.info(
+        f"コサイン類似度：平均{report_df['cosine_similarity'].mean():.6f}、最小{report_df['cosine_similarity'].min():.6f}"
+        f"（{len(report_df)}フレーム）"
+    )
+    logger.info(
+        f"8bit量子化した値が全て一致したフレーム：{(report_df['max_code_diff'] == 0).mean() * 100:.1f}%、"
+        f"最大の差：{report_df['max_code_diff'].max()}"
+    )
+    logger.info(
+        f"float32：{float_fps:.1f}フレーム/秒、INT8：{int8_fps:.1f}フレーム/秒（{int8_fps / float_fps:.2f}倍速）"
+    )
+    logger.info(f"結果を{output_path}に保存しました")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--output_path",
+        help="フレームごとのコサイン類似度を保存するCSVファイル",
+        type=str,
+        default="../data/feature/vggish_int8_parity.csv",
+    )
+    parser.add_argument(
+        "--vggish_checkpoint_path",
+        default=VGGISH_CHECKPOINT_PATH,
+        type=str,
+        help="VGGishの重みのファイル（読み込む前にSHA-256ハッシュを確認する）",
+    )
+    parser.add_argument(
+        "--vggish_pca_params_path",
+        default=VGGISH_PCA_PARAMS_PATH,
+        type=str,
+        help="VGGishのPCAのパラメータのファイル（読み込む前にSHA-256ハッシュを確認する）",
+    )
+    parser.add_argument(
+        "--vggish_checkpoint_sha256",
+        default=VGGISH_CHECKPOINT_SHA256,
+        type=str,
+        help="VGGishの重みのファイルのSHA-256ハッシュ（先頭の8桁以上、デフォルトはリリースのファイルのハッシュ）",
+    )
+    parser.add_argument(
+        "--vggish_pca_params_sha256",
+        default=VGGISH_PCA_PARAMS_SHA256,
+        type=str,
+        help="VGGishのPCAのパラメータのファイルのSHA-256ハッシュ（先頭の8桁以上、デフォルトはリリースのファイルのハッシュ）",
+    )
+    parser.add_argument(
+        "--seconds",
+        default=600,
+        type=float,
+        help="比較に使う合成音声の長さ（秒）",
+    )
+    parser.add_argument(
+        "--vggish_batch_size",
+        default=VGGISH_BATCH_SIZE,
+        type=int,
+        help="VGGishに一度に入力する例（0.96秒ごとのlog-melスペクトログラム）の数",
+    )
+    parser.add_argument(
+        "--vggish_threads",
+        default=None,
+        type=int,
+        help="VGGishの推論に使うtorchのスレッド数（指定しなければtorchのデフォルト）",
+    )
+
+    args = parser.parse_args()
+    output_path = args.output_path
+    vggish_checkpoint_path = args.vggish_checkpoint_path
+    vggish_pca_params_path = args.vggish_pca_params_path
+    vggish_checkpoint_sha256 = args.vggish_checkpoint_sha256
+    vggish_pca_params_sha256 = args.vggish_pca_params_sha256
+    seconds = args.seconds
+    vggish_batch_size = args.vggish_batch_size
+    vggish_threads = args.vggish_threads
+
+    main(
+        output_path,
+        vggish_checkpoint_path,
+        vggish_pca_params_path,
+        seconds,
+        vggish_batch_size,
+        vggish_threads,
+        vggish_checkpoint_sha256,
+        vggish_pca_params_sha256,
+    )
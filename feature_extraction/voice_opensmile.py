@@ -1,22 +1,46 @@
 import opensmile
 import os
 from logzero import logger
-from utils import save_feature, get_voice_files
+from utils import (
+    save_feature,
+    get_voice_files,
+    get_model,
+    register_model,
+    get_pcm_sidecar_path,
+    load_voice,
+)
 import pandas as pd
 import librosa
 
 """
 OpenSMILEの設定、特徴量セットにはeGeMAPSv02を使用
 """
-smile_functions = opensmile.Smile(
-    feature_set=opensmile.FeatureSet.eGeMAPSv02,
-    feature_level=opensmile.FeatureLevel.Functionals,  # LLDの統計値を計算する
-)
+SMILE_FUNCTIONALS_NAME = "opensmile_eGeMAPSv02_functionals"
+SMILE_LLDS_NAME = "opensmile_eGeMAPSv02_llds"
+
+
+def _load_smile_functionals(device):
+    """
+    LLDの統計値を計算するOpenSMILEを作成する
+    """
+    return opensmile.Smile(
+        feature_set=opensmile.FeatureSet.eGeMAPSv02,
+        feature_level=opensmile.FeatureLevel.Functionals,  # LLDの統計値を計算する
+    )
 
-smile_llds = opensmile.Smile(
-    feature_set=opensmile.FeatureSet.eGeMAPSv02,
-    feature_level=opensmile.FeatureLevel.LowLevelDescriptors,  # LLDを計算する
-)
+
+def _load_smile_llds(device):
+    """
+    LLDを計算するOpenSMILEを作成する
+    """
+    return opensmile.Smile(
+        feature_set=opensmile.FeatureSet.eGeMAPSv02,
+        feature_level=opensmile.FeatureLevel.LowLevelDescriptors,  # LLDを計算する
+    )
+
+
+register_model(SMILE_FUNCTIONALS_NAME, _load_smile_functionals)
+register_model(SMILE_LLDS_NAME, _load_smile_llds)
 
 column_names = {
     "PitchMean": "PitchMean",
@@ -133,6 +157,16 @@ def _add_results(
     return qa_result_df
 
 
+def _process_voice_file(smile, voice_file):
+    """
+    音声をOpenSMILEで処理する（16kHzの音声のファイルがあればそれを使う）
+    """
+    if get_pcm_sidecar_path(voice_file) is not None:
+        y, sr = load_voice(voice_file)
+        return smile.process_signal(y, sampling_rate=sr)
+    return smile.process_file(voice_file)
+
+
 def analyze_opensmile_stats(adult_qa_df, child_qa_df, input_data_dir):
     """
     音声からopenSMILEの特徴量の統計値を取得し、その平均と標準偏差を計算する
@@ -142,7 +176,9 @@ def analyze_opensmile_stats(adult_qa_df, child_qa_df, input_data_dir):
 
     for data_id, voice_file in voice_files:
         logger.info(f"{voice_file}からOpenSMILE特徴量の統計値を計算しています....")
-        stats_feature = smile_functions.process_file(voice_file)
+        stats_feature = _process_voice_file(
+            get_model(SMILE_FUNCTIONALS_NAME), voice_file
+        )
         pitch_mean, pitch_stddev = _get_pitch(stats_feature)
         loudness_mean, loudness_stddev = _get_loudness(stats_feature)
         jitter_mean, jitter_stddev = _get_jitter(stats_feature)
@@ -191,7 +227,8 @@ def _get_lld(voice_path):
     1秒毎にLLDsを抽出・平均化し、全てのLLDsを連結したものを特徴量とする
     frameStep, frameSizeの合わせ方は不明なので無視する
     """
-    y, sr = librosa.load(voice_path, sr=None)
+    smile_llds = get_model(SMILE_LLDS_NAME)
+    y, sr = load_voice(voice_path)
     duration = int(librosa.get_duration(y=y, sr=sr))
 
     lld_data = []
@@ -1,30 +1,370 @@
+import hashlib
+import json
+import re
+import numpy as np
 import pandas as pd
-import torch
 import os
+from functools import partial
 from logzero import logger
-from utils import save_feature, get_voice_files
+from utils import (
+    save_feature,
+    get_voice_files,
+    get_model,
+    register_model,
+    get_pcm_sidecar_path,
+    set_num_threads,
+)
+from vggish import vggish_params
 
-# VGGishのPyTorch実装
-# See: https://github.com/harritaylor/torchvggish
-model = torch.hub.load("harritaylor/torchvggish", "vggish")
-model.eval()
+VGGISH_MODEL_NAME = "vggish"
+# VGGishの重みとPCAのパラメータ（harritaylor/torchvggishのリリースのファイルをダウンロードして置いておく）
+VGGISH_CHECKPOINT_PATH = "./models/vggish-10086976.pth"
+VGGISH_PCA_PARAMS_PATH = "./models/vggish_pca_params-970ea276.pth"
+VGGISH_RELEASE_URL = "https://github.com/harritaylor/torchvggish/releases/download/v0.1"
+# リリースのファイルのSHA-256ハッシュ（リリースで公開されているtorch.hubのファイル名に含まれる先頭の8桁）
+# torch.hubのcheck_hashと同じく、先頭の8桁の照合は破損したファイルや別のファイルを誤って置いた場合を検出するためのもので、
+# 意図的に用意された差し替えを防ぐものではない。64桁のハッシュを指定した場合は全体が一致するかを確認する
+VGGISH_CHECKPOINT_SHA256 = "10086976"
+VGGISH_PCA_PARAMS_SHA256 = "970ea276"
+_SHA256_REGEX = re.compile(r"[a-f0-9]{8,64}")
+# ハッシュ計算時に一度に読み込むバイト数
+_HASH_CHUNK_BYTES = 8 * 1024 * 1024
+# VGGishに一度に入力する例（0.96秒ごとのlog-melスペクトログラム）の数
+VGGISH_BATCH_SIZE = 64
+# STFTの窓の長さと間隔のサンプル数、VGGishの例の長さと間隔のフレーム数（vggish_inputと同じ）
+_STFT_WINDOW_SAMPLES = int(
+    round(vggish_params.SAMPLE_RATE * vggish_params.STFT_WINDOW_LENGTH_SECONDS)
+)
+_STFT_HOP_SAMPLES = int(
+    round(vggish_params.SAMPLE_RATE * vggish_params.STFT_HOP_LENGTH_SECONDS)
+)
+_EXAMPLE_WINDOW_FRAMES = int(
+    round(vggish_params.EXAMPLE_WINDOW_SECONDS / vggish_params.STFT_HOP_LENGTH_SECONDS)
+)
+_EXAMPLE_HOP_FRAMES = int(
+    round(vggish_params.EXAMPLE_HOP_SECONDS / vggish_params.STFT_HOP_LENGTH_SECONDS)
+)
+# VGGishの特徴量の保存形式
+# float: PCA・8bit量子化した値（0〜255）をCSVとfloat64の.npyファイルに保存する
+# uint8: PCA・8bit量子化した値をuint8の.npyファイルに保存する（floatと同じ値を1/8のサイズで保存できる）
+# float16: PCAを適用した量子化前の値をfloat16の.npyファイルに保存する
+VGGISH_STORAGE_FORMATS = ("float", "uint8", "float16")
+DEFAULT_VGGISH_STORAGE_FORMAT = "float"
+_VGGISH_DTYPES = {"float": np.float32, "uint8": np.uint8, "float16": np.float16}
+# 量子化のパラメータなどを.npyファイルと同じ名前で保存するファイルの拡張子
+_VGGISH_PARAMS_SUFFIX = ".json"
 
 
-def extract_vggish_feature(input_data_dir, output_data_dir):
+def _verify_checksum(file_path, expected_sha256):
+    """
+    ファイルのSHA-256ハッシュの先頭が、固定したハッシュ（8〜64桁）と一致するか確認する
+    """
+    if _SHA256_REGEX.fullmatch(expected_sha256) is None:
+        logger.error(
+            f"{file_path}のSHA-256ハッシュの指定が不正です（8〜64桁の小文字の16進数）：{expected_sha256}"
+        )
+        raise ValueError(f"{file_path}のSHA-256ハッシュの指定が不正です")
+    sha256 = hashlib.sha256()
+    with open(file_path, mode="rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            sha256.update(chunk)
+    if not sha256.hexdigest().startswith(expected_sha256):
+        logger.error(
+            f"{file_path}のSHA-256ハッシュが一致しません（期待値：{expected_sha256}、実際：{sha256.hexdigest()}）"
+        )
+        raise ValueError(f"{file_path}のSHA-256ハッシュが一致しません")
+
+
+def _load_pca_params(pca_params_path):
+    """
+    PCAのパラメータ（NumPyの配列の辞書）を、NumPyの配列の復元のみを許可したweights_only=Trueで読み込む
+    """
+    import torch
+
+    # NumPyの配列をpickleから復元する関数（NumPy 2ではnumpy._coreに移動したが、
+    # リリースのファイルは以前のnumpy.coreの名前で参照しているので、両方の名前で許可する）
+    reconstruct = np.ndarray.__reduce__(np.zeros(0))[0]
+    # dtypeの復元では、dtypeのクラス（float32・float64）も許可する必要がある
+    safe_globals = [
+        np.ndarray,
+        np.dtype,
+        type(np.dtype(np.float32)),
+        type(np.dtype(np.float64)),
+        reconstruct,
+    ]
+    legacy_name = "numpy.core.multiarray._reconstruct"
+    if f"{reconstruct.__module__}.{reconstruct.__name__}" != legacy_name:
+        safe_globals.append((reconstruct, legacy_name))
+    with torch.serialization.safe_globals(safe_globals):
+        pca_params = torch.load(pca_params_path, map_location="cpu", weights_only=True)
+    for name in [vggish_params.PCA_EIGEN_VECTORS_NAME, vggish_params.PCA_MEANS_NAME]:
+        if not isinstance(pca_params.get(name), np.ndarray):
+            logger.error(f"{pca_params_path}に{name}の配列が含まれていません")
+            raise ValueError(f"{pca_params_path}に{name}の配列が含まれていません")
+    return pca_params
+
+
+def _optimize_vggish_model(model):
+    """
+    VGGishの全結合層の重みをINT8に動的量子化し、畳み込み層と全結合層をTorchScriptでトレースする
+    PCA・量子化の後処理はfloat32のまま残すので、get_vggish_embeddingsでそのまま使える
+    """
+    import torch
+
+    torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+    )
+    with torch.inference_mode():
+        model.features = torch.jit.trace(
+            model.features,
+            torch.zeros(1, 1, vggish_params.NUM_FRAMES, vggish_params.NUM_BANDS),
+        )
+        model.embeddings = torch.jit.trace(
+            model.embeddings, torch.zeros(1, model.embeddings[0].in_features)
+        )
+    return model
+
+
+def load_vggish_model(
+    device,
+    checkpoint_path=VGGISH_CHECKPOINT_PATH,
+    pca_params_path=VGGISH_PCA_PARAMS_PATH,
+    int8=False,
+    checkpoint_sha256=VGGISH_CHECKPOINT_SHA256,
+    pca_params_sha256=VGGISH_PCA_PARAMS_SHA256,
+):
+    """
+    このリポジトリに含めたVGGishのPyTorch実装（harritaylor/torchvggish）に、ローカルの重みを読み込む
+    torch.hubを使わないので、ネットワークに接続できない環境でも使える
+    int8がTrueなら、同じ重みから全結合層をINT8に動的量子化したTorchScriptのモデルを作成する（CPUのみ）
+    checkpoint_sha256・pca_params_sha256は読み込む前に確認するそれぞれのファイルのSHA-256ハッシュ
+    """
+    import torch
+    from vggish.model import VGGish
+
+    for file_path, expected_sha256 in [
+        (checkpoint_path, checkpoint_sha256),
+        (pca_params_path, pca_params_sha256),
+    ]:
+        if not os.path.exists(file_path):
+            logger.error(
+                f"{file_path}が見つかりません（{VGGISH_RELEASE_URL}/{os.path.basename(file_path)}からダウンロードしてください）"
+            )
+            raise ValueError(f"{file_path}が見つかりません")
+        _verify_checksum(file_path, expected_sha256)
+    if int8 and device != "cpu":
+        logger.warning("INT8のVGGishはCPUでしか使えないため、cpuで読み込みます")
+        device = "cpu"
+    # 重みはメモリマップで読み込み、そのままモデルのパラメータにする
+    state_dict = torch.load(
+        checkpoint_path, map_location="cpu", weights_only=True, mmap=True
+    )
+    pca_params = _load_pca_params(pca_params_path)
+    # 音声からlog-melスペクトログラムへの変換と、PCA・量子化はバッチごとにget_vggish_embeddingsで行う
+    model = VGGish(
+        state_dict, pca_params, device=device, preprocess=False, postprocess=False
+    )
+    model.eval()
+    if int8:
+        model = _optimize_vggish_model(model)
+    return model
+
+
+def register_vggish_model(
+    checkpoint_path=VGGISH_CHECKPOINT_PATH,
+    pca_params_path=VGGISH_PCA_PARAMS_PATH,
+    int8=False,
+    checkpoint_sha256=VGGISH_CHECKPOINT_SHA256,
+    pca_params_sha256=VGGISH_PCA_PARAMS_SHA256,
+):
+    """
+    VGGishの重みとPCAのパラメータのパスとSHA-256ハッシュ、INT8のモデルを使うか否かを指定してモデルの読み込み方法を登録する
+    """
+    register_model(
+        VGGISH_MODEL_NAME,
+        partial(
+            load_vggish_model,
+            checkpoint_path=checkpoint_path,
+            pca_params_path=pca_params_path,
+            int8=int8,
+            checkpoint_sha256=checkpoint_sha256,
+            pca_params_sha256=pca_params_sha256,
+        ),
+    )
+
+
+register_vggish_model()
+
+
+def _load_vggish_waveform(voice_file):
+    """
+    VGGishに入力する16kHz・モノラルの音声を読み込む
+    16kHzの音声のファイルがあれば、int16のままメモリマップで読み込む（[-1, 1]への変換はバッチごとに行う）
+    """
+    pcm_sidecar_path = get_pcm_sidecar_path(voice_file)
+    if pcm_sidecar_path is not None:
+        return np.load(pcm_sidecar_path, mmap_mode="r")
+    import resampy
+    import soundfile as sf
+
+    # vggish_input.wavfile_to_examplesと同じ変換をする
+    wav_data, sr = sf.read(voice_file, dtype="int16")
+    waveform = wav_data / 32768.0
+    if len(waveform.shape) > 1:
+        waveform = np.mean(waveform, axis=1)
+    if sr != vggish_params.SAMPLE_RATE:
+        waveform = resampy.resample(waveform, sr, vggish_params.SAMPLE_RATE)
+    return waveform
+
+
+def _count_vggish_examples(sample_count):
+    """
+    16kHzの音声のサンプル数から、VGGishの例の数を計算する（vggish_inputと同じく、足りない分は切り捨てる）
+    """
+    frame_count = 1 + (sample_count - _STFT_WINDOW_SAMPLES) // _STFT_HOP_SAMPLES
+    return max(0, 1 + (frame_count - _EXAMPLE_WINDOW_FRAMES) // _EXAMPLE_HOP_FRAMES)
+
+
+def _iter_vggish_examples(waveform, batch_size):
+    """
+    音声をbatch_size個の例ごとに区切ってlog-melスペクトログラムの例に変換し、(先頭の例の番号, 例)を返す
+    例の境界で区切るので、音声全体を一度に変換した場合と同じ例が得られる
+    """
+    from vggish import vggish_input
+
+    example_count = _count_vggish_examples(len(waveform))
+    for start in range(0, example_count, batch_size):
+        end = min(start + batch_size, example_count)
+        start_sample = start * _EXAMPLE_HOP_FRAMES * _STFT_HOP_SAMPLES
+        end_sample = (
+            (end - 1) * _EXAMPLE_HOP_FRAMES + _EXAMPLE_WINDOW_FRAMES - 1
+        ) * _STFT_HOP_SAMPLES + _STFT_WINDOW_SAMPLES
+        chunk = waveform[start_sample:end_sample]
+        if chunk.dtype == np.int16:
+            # utils.load_voiceと同じく、float32で[-1, 1]に変換する
+            chunk = chunk.astype(np.float32) / (1 << 15)
+        yield start, vggish_input.waveform_to_examples(
+            chunk, vggish_params.SAMPLE_RATE, return_tensor=False
+        )
+
+
+def get_vggish_embeddings(
+    model,
+    waveform,
+    batch_size=VGGISH_BATCH_SIZE,
+    storage_format=DEFAULT_VGGISH_STORAGE_FORMAT,
+):
+    """
+    16kHz・モノラルの音声からVGGishの特徴量（例の数 × 128次元）を抽出する
+    batch_size個の例ごとに推論して結果を事前に確保した保存形式の型の配列に書き込むので、
+    音声が長くても推論時のメモリ使用量はbatch_sizeで決まる
+    """
+    import torch
+
+    embeddings = np.empty(
+        (_count_vggish_examples(len(waveform)), vggish_params.EMBEDDING_SIZE),
+        dtype=_VGGISH_DTYPES[storage_format],
+    )
+    with torch.inference_mode():
+        for start, examples in _iter_vggish_examples(waveform, batch_size):
+            x = torch.as_tensor(examples)[:, None, :, :].float()
+            embedding = model.pproc.pca(model(x))
+            if storage_format != "float16":
+                embedding = model.pproc.quantize(embedding)
+            embeddings[start : start + len(examples)] = embedding.cpu().numpy()
+    return embeddings
+
+
+def _save_vggish_feature(feature, output_dir, data_id, storage_format):
+    """
+    VGGishの特徴量を保存形式に合わせて保存する
+    uint8・float16の場合は、.npyファイルの隣に量子化のパラメータをJSONファイルで保存する
+    以前に別の形式で保存したときにしか作らないファイル（floatのCSV、uint8・float16のJSON）が残っていれば削除する
+    """
+    params_path = os.path.join(output_dir, f"{data_id}{_VGGISH_PARAMS_SUFFIX}")
+    csv_path = os.path.join(output_dir, f"{data_id}.csv")
+    if storage_format == "float":
+        save_feature(pd.DataFrame(feature), output_dir, f"{data_id}.csv")
+        stale_path = params_path
+    else:
+        stale_path = csv_path
+    if os.path.exists(stale_path):
+        os.remove(stale_path)
+        logger.info(f"以前に別の形式で保存した{stale_path}を削除しました")
+    if storage_format == "float":
+        return
+    params = {"storage_format": storage_format}
+    if storage_format == "uint8":
+        params.update(
+            {
+                "quantize_min_val": vggish_params.QUANTIZE_MIN_VAL,
+                "quantize_max_val": vggish_params.QUANTIZE_MAX_VAL,
+                "quantize_levels": 256,
+            }
+        )
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, f"{data_id}.npy"), feature)
+    with open(params_path, mode="w") as f:
+        json.dump(params, f)
+
+
+def load_vggish_feature(feature_dir, data_id):
+    """
+    保存したVGGishの特徴量を読み込み、PCAを適用した値（float32の例の数 × 128次元の配列）に戻す
+    uint8とfloatの形式で保存したものは、量子化した値を[quantize_min_val, quantize_max_val]の範囲に戻す
+    """
+    vggish_dir = os.path.join(feature_dir, "vggish")
+    feature = np.load(os.path.join(vggish_dir, f"{data_id}.npy"))
+    params_path = os.path.join(vggish_dir, f"{data_id}{_VGGISH_PARAMS_SUFFIX}")
+    if os.path.exists(params_path):
+        with open(params_path) as f:
+            params = json.load(f)
+    else:
+        # パラメータのファイルがなければfloatの形式で保存したもの
+        params = {
+            "storage_format": "float",
+            "quantize_min_val": vggish_params.QUANTIZE_MIN_VAL,
+            "quantize_max_val": vggish_params.QUANTIZE_MAX_VAL,
+            "quantize_levels": 256,
+        }
+    feature = feature.reshape(-1, vggish_params.EMBEDDING_SIZE).astype(np.float32)
+    if params["storage_format"] == "float16":
+        return feature
+    scale = (params["quantize_max_val"] - params["quantize_min_val"]) / (
+        params["quantize_levels"] - 1
+    )
+    return feature * np.float32(scale) + np.float32(params["quantize_min_val"])
+
+
+def extract_vggish_feature(
+    input_data_dir,
+    output_data_dir,
+    batch_size=VGGISH_BATCH_SIZE,
+    num_threads=None,
+    storage_format=DEFAULT_VGGISH_STORAGE_FORMAT,
+):
     """
     VGGishの特徴量を抽出する
+    batch_sizeは一度にVGGishに入力する例の数、num_threadsは推論に使うtorchのスレッド数、
+    storage_formatは特徴量の保存形式（VGGISH_STORAGE_FORMATSのいずれか）
     """
+    if storage_format not in VGGISH_STORAGE_FORMATS:
+        logger.error(f"VGGishの特徴量の保存形式{storage_format}には対応していません")
+        raise ValueError(
+            f"VGGishの特徴量の保存形式{storage_format}には対応していません"
+        )
     logger.info("VGGishの特徴量を抽出しています....")
+    set_num_threads(num_threads)
     voice_files = get_voice_files(input_data_dir)
+    model = get_model(VGGISH_MODEL_NAME)
 
     for data_id, voice_file in voice_files:
         logger.info(f"{voice_file}からVGGishの特徴量を抽出しています....")
-        # VGGishの特徴量を取得
-        feature = model.forward(voice_file)
-        save_feature(
-            pd.DataFrame(feature.detach().cpu().numpy()),
-            os.path.join(output_data_dir, "vggish"),
-            f"{data_id}.csv",
+        # 16kHzの音声のファイルがあればリサンプリングせずに使う
+        waveform = _load_vggish_waveform(voice_file)
+        feature = get_vggish_embeddings(model, waveform, batch_size, storage_format)
+        _save_vggish_feature(
+            feature, os.path.join(output_data_dir, "vggish"), data_id, storage_format
         )
     logger.info("VGGishの特徴量を抽出しました")
     return
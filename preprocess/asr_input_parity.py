@@ -0,0 +1,206 @@
+import os
+import csv
+import argparse
+import tempfile
+import numpy as np
+from pydub import AudioSegment
+from logzero import logger
+from main import (
+    REAZON_MODEL_NAME,
+    REAZON_SAMPLE_RATE,
+    _get_speech_segments,
+    _get_utterance_audio,
+    _get_tmp_wav_audio,
+)
+from silence import get_mono_samples
+from utils import get_subject_voice_files, get_counsellor_voice_files, get_model
+
+
+def _load_tmp_wav_samples(utterance, tmp_utterance_path):
+    """
+    一時的なWAVファイルを経由した場合のReazonSpeechの入力（audio_from_pathと同じくlibrosa.loadで読み込む）
+    """
+    import librosa
+
+    utterance.export(tmp_utterance_path, format="wav")
+    samples, sample_rate = librosa.load(tmp_utterance_path, sr=None)
+    os.remove(tmp_utterance_path)
+    return samples, sample_rate
+
+
+def _to_reazon_input(samples, sample_rate):
+    """
+    ReazonSpeechのnorm_audioと同じくlibrosaで16kHzにリサンプリングする
+    """
+    import librosa
+
+    if sample_rate == REAZON_SAMPLE_RATE:
+        return samples
+    return librosa.resample(samples, orig_sr=sample_rate, target_sr=REAZON_SAMPLE_RATE)
+
+
+def _get_max_abs_diff(x, y):
+    """
+    2つの波形の最大の差を計算する（長さが違えば無限大）
+    """
+    if len(x) != len(y):
+        return np.inf
+    if len(x) == 0:
+        return 0.0
+    return float(np.abs(x.astype(np.float64) - y.astype(np.float64)).max())
+
+
+def _transcribe(audio):
+    """
+    ReazonSpeechで発話をテキスト化する
+    """
+    from reazonspeech.nemo.asr import transcribe
+
+    return transcribe(get_model(REAZON_MODEL_NAME), audio).text
+
+
+def main(
+    input_data_dir,
+    output_path,
+    is_counsellor=False,
+    max_utterances=None,
+    with_transcript=False,
+):
+    """
+    発話ごとに、メモリ上の音声から作成したReazonSpeechの入力と一時的なWAVファイルを経由した入力
+    （--use_tmp_wav）を、元のサンプリングレートと16kHzにリサンプリングした後で比較する
+    with_transcriptがTrueなら、両方の入力をテキスト化した結果も比較する（reazonspeechが必要）
+    """
+    if is_counsellor:
+        voice_files = get_counsellor_voice_files(input_data_dir)
+    else:
+        voice_files = get_subject_voice_files(input_data_dir)
+    logger.info(f"{len(voice_files)}個の音声の発話区間を比較します")
+
+    mismatch_count = 0
+    utterance_total = 0
+    max_diff = 0.0
+    max_resampled_diff = 0.0
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(
+        output_path, mode="w", encoding="utf-8", newline=""
+    ) as f, tempfile.TemporaryDirectory() as tmp_dir:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "data_id",
+                "start",
+                "end",
+                "sample_rate",
+                "max_abs_diff",
+                "resampled_max_abs_diff",
+                "memory_text",
+                "tmp_wav_text",
+            ]
+        )
+        for data_id, voice_file_path in voice_files:
+            audio = AudioSegment.from_file(voice_file_path)
+            speech_segments = _get_speech_segments(audio)
+            if max_utterances is not None:
+                speech_segments = speech_segments[:max_utterances]
+            for start, end in speech_segments:
+                utterance = audio[start:end]
+                tmp_utterance_path = os.path.join(tmp_dir, "utterance.wav")
+                memory_samples = get_mono_samples(
+                    utterance.raw_data, utterance.sample_width, utterance.channels
+                )
+                tmp_wav_samples, sample_rate = _load_tmp_wav_samples(
+                    utterance, tmp_utterance_path
+                )
+                if sample_rate != utterance.frame_rate:
+                    logger.error(
+                        f"一時的なWAVファイルのサンプリングレートが元の音声と異なります：{sample_rate}Hz, {utterance.frame_rate}Hz"
+                    )
+                    raise ValueError(
+                        f"一時的なWAVファイルのサンプリングレートが元の音声と異なります：{sample_rate}Hz, {utterance.frame_rate}Hz"
+                    )
+                diff = _get_max_abs_diff(memory_samples, tmp_wav_samples)
+                resampled_diff = _get_max_abs_diff(
+                    _to_reazon_input(memory_samples, utterance.frame_rate),
+                    _to_reazon_input(tmp_wav_samples, sample_rate),
+                )
+                memory_text = tmp_wav_text = ""
+                if with_transcript:
+                    memory_text = _transcribe(_get_utterance_audio(utterance))
+                    tmp_wav_text = _transcribe(
+                        _get_tmp_wav_audio(utterance, tmp_utterance_path)
+                    )
+                if memory_text != tmp_wav_text:
+                    mismatch_count += 1
+                writer.writerow(
+                    [
+                        data_id,
+                        start,
+                        end,
+                        utterance.frame_rate,
+                        diff,
+                        resampled_diff,
+                        memory_text,
+                        tmp_wav_text,
+                    ]
+                )
+                max_diff = max(max_diff, diff)
+                max_resampled_diff = max(max_resampled_diff, resampled_diff)
+                utterance_total += 1
+            logger.info(f"{data_id}：{len(speech_segments)}個の発話区間を比較しました")
+
+    logger.info(
+        f"{utterance_total}個の発話区間：最大の差{max_diff:.3g}、16kHzにリサンプリングした後の最大の差{max_resampled_diff:.3g}"
+    )
+    if with_transcript:
+        logger.info(f"テキストが一致しなかった発話区間：{mismatch_count}個")
+    logger.info(f"結果を{output_path}に保存しました")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--input_data_dir",
+        help="生データを格納しているディレクトリ",
+        type=str,
+        default="../data/raw",
+    )
+    parser.add_argument(
+        "--output_path",
+        help="発話区間ごとの比較結果を保存するCSVファイル",
+        type=str,
+        default="../data/preprocessed/asr_input_parity.csv",
+    )
+    parser.add_argument(
+        "--counsellor",
+        action="store_true",
+        dest="is_counsellor",
+        help="被験者ではなくカウンセラーの音声を比較するか否か",
+    )
+    parser.add_argument(
+        "--max_utterances",
+        default=None,
+        type=int,
+        help="音声ごとに比較する発話区間の最大数（指定しなければ全て）",
+    )
+    parser.add_argument(
+        "--with_transcript",
+        action="store_true",
+        help="ReazonSpeechでテキスト化した結果も比較するか否か",
+    )
+
+    args = parser.parse_args()
+    input_data_dir = args.input_data_dir
+    output_path = args.output_path
+    is_counsellor = args.is_counsellor
+    max_utterances = args.max_utterances
+    with_transcript = args.with_transcript
+
+    logger.info(f"入力ディレクトリ：{input_data_dir}")
+    main(
+        input_data_dir,
+        output_path,
+        is_counsellor,
+        max_utterances,
+        with_transcript,
+    )
@@ -0,0 +1,65 @@
+import time
+from logzero import logger
+
+
+class BatchScheduler:
+    """
+    テキスト化する発話を集め、長さの近い発話ごとにバッチにまとめてテキスト化する
+    長さの近い発話をまとめることで、バッチ内のパディングによる無駄な計算を減らす
+    """
+
+    def __init__(self, transcribe_batch, batch_size=1):
+        """
+        transcribe_batchは音声のリストを受け取り、テキストのリストを返す関数
+        """
+        self.transcribe_batch = transcribe_batch
+        self.batch_size = max(batch_size, 1)
+        self.requests = []
+
+    def add(self, request_id, duration_milli_seconds, get_audio):
+        """
+        テキスト化する発話を追加する
+        get_audioは音声を返す関数で、その発話を含むバッチをテキスト化するときに呼ぶ
+        """
+        self.requests.append((request_id, duration_milli_seconds, get_audio))
+
+    def _transcribe(self, batch):
+        """
+        1つのバッチをテキスト化する
+        バッチ全体で失敗した場合は1つずつテキスト化し直し、それでも失敗した発話はNoneにする
+        """
+        try:
+            return self.transcribe_batch([get_audio() for _, _, get_audio in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"テキスト化の際に例外が発生しました：{e}")
+                return [None]
+            logger.warning(
+                f"{len(batch)}個の発話のバッチのテキスト化に失敗したため、1つずつテキスト化します：{e}"
+            )
+            return [self._transcribe([request])[0] for request in batch]
+
+    def run(self):
+        """
+        追加された発話を長さ順にbatch_size個ずつテキスト化し、{request_id: テキスト}を返す
+        """
+        if len(self.requests) == 0:
+            return {}
+        requests = sorted(self.requests, key=lambda x: x[1])
+        self.requests = []
+        start = time.perf_counter()
+        texts = {}
+        for i in range(0, len(requests), self.batch_size):
+            batch = requests[i : i + self.batch_size]
+            logger.info(
+                f"{len(batch)}個の発話（{batch[0][1]}〜{batch[-1][1]}ミリ秒）をテキスト化しています..."
+            )
+            for (request_id, _, _), text in zip(batch, self._transcribe(batch)):
+                texts[request_id] = text
+        seconds = time.perf_counter() - start
+        audio_seconds = sum(x[1] for x in requests) / 1000
+        logger.info(
+            f"{len(requests)}個の発話（{audio_seconds:.1f}秒）を{seconds:.1f}秒でテキスト化しました"
+            f"（{audio_seconds / max(seconds, 1e-9):.1f}音声秒/秒、バッチサイズ{self.batch_size}）"
+        )
+        return texts
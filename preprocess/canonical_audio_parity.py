@@ -0,0 +1,234 @@
+import os
+import csv
+import argparse
+import tempfile
+import wave
+import numpy as np
+from pydub import AudioSegment
+from logzero import logger
+from main import REAZON_SAMPLE_RATE, _get_speech_segments, _get_speech_only_audio
+from resample import ResampledWavWriter
+from utils import get_subject_voice_files
+
+# 折り返し雑音を確認する合成音声の正弦波の周波数（Hz）とサンプリングレート・チャンネル数
+TONE_FREQUENCIES = [1000, 10000, 12000, 15000]
+TONE_FORMATS = [(44100, 2), (48000, 1)]
+TONE_SECONDS = 3
+# 音声の端での立ち上がりが折り返し雑音に含まれないように、正弦波の前後をなめらかにする秒数
+TONE_FADE_SECONDS = 0.1
+
+
+def _load_resampy_reference(voice_file_path):
+    """
+    以前の特徴量抽出（vggish_input.wavfile_to_examples）と同じく、音声全体をresampyで16kHzにする
+    """
+    import resampy
+    import soundfile as sf
+
+    wav_data, sr = sf.read(voice_file_path, dtype="int16")
+    waveform = wav_data / 32768.0
+    if len(waveform.shape) > 1:
+        waveform = np.mean(waveform, axis=1)
+    if sr != REAZON_SAMPLE_RATE:
+        waveform = resampy.resample(waveform, sr, REAZON_SAMPLE_RATE)
+    return waveform
+
+
+def _write_canonical_audio(audio, speech_segments, output_path, rng):
+    """
+    前処理（--canonical_audio）と同じく発話区間ごとにリサンプリングしながら書き込む
+    ストリーミングでの書き込みを模して、発話区間をさらにランダムな長さに分けて入力する
+    """
+    writer = ResampledWavWriter(
+        output_path,
+        audio.frame_rate,
+        audio.sample_width,
+        audio.channels,
+        REAZON_SAMPLE_RATE,
+    )
+    frame_width = audio.frame_width
+    try:
+        for start, end in speech_segments:
+            data = audio[start:end].raw_data
+            position = 0
+            while position < len(data):
+                frames = int(rng.integers(1, audio.frame_rate))
+                writer.writeframes(data[position : position + frames * frame_width])
+                position += frames * frame_width
+    finally:
+        writer.close()
+    with wave.open(output_path, "rb") as f:
+        return np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+
+
+def _get_pydub_samples(audio):
+    """
+    以前の前処理と同じくpydub（audioop.ratecv）で16kHz・モノラル・16bitにする
+    """
+    audio = audio.set_channels(1).set_frame_rate(REAZON_SAMPLE_RATE).set_sample_width(2)
+    return np.array(audio.get_array_of_samples(), dtype=np.int16)
+
+
+def _get_dbfs(samples):
+    """
+    16bit整数の音声のRMSをdBFSで計算する
+    """
+    rms = np.sqrt(np.mean(np.square(samples / 32768.0))) if len(samples) else 0.0
+    return 20 * np.log10(max(rms, 1e-12))
+
+
+def _get_snr_db(reference, samples):
+    """
+    resampyの出力を基準としたSN比（dB）を計算する
+    """
+    length = min(len(reference), len(samples))
+    noise = samples[:length] / 32768.0 - reference[:length]
+    signal_power = np.mean(np.square(reference[:length])) if length else 0.0
+    noise_power = np.mean(np.square(noise)) if length else 0.0
+    return 10 * np.log10(max(signal_power, 1e-24) / max(noise_power, 1e-24))
+
+
+def _make_tone_audio(frequency, frame_rate, channels):
+    """
+    -6dBFSの正弦波の合成音声を作成する（前後はハン窓でなめらかにする）
+    """
+    t = np.arange(TONE_SECONDS * frame_rate) / frame_rate
+    fade = np.hanning(2 * int(TONE_FADE_SECONDS * frame_rate))
+    envelope = np.ones(len(t))
+    envelope[: len(fade) // 2] = fade[: len(fade) // 2]
+    envelope[-(len(fade) // 2) :] = fade[len(fade) // 2 :]
+    samples = np.round(
+        0.5 * envelope * np.sin(2 * np.pi * frequency * t) * 32767
+    ).astype(np.int16)
+    return AudioSegment(
+        data=np.repeat(samples, channels).tobytes(),
+        sample_width=2,
+        frame_rate=frame_rate,
+        channels=channels,
+    )
+
+
+def _compare(audio, speech_segments, tmp_dir, rng):
+    """
+    発話区間のみの音声について、resampyの出力と前処理の出力・pydubの出力を比較する
+    """
+    speech_only_path = os.path.join(tmp_dir, "speech_only.wav")
+    canonical_path = os.path.join(tmp_dir, "canonical.wav")
+    speech_only_audio = _get_speech_only_audio(audio, speech_segments)
+    speech_only_audio.export(speech_only_path, format="wav")
+    reference = _load_resampy_reference(speech_only_path)
+    canonical = _write_canonical_audio(audio, speech_segments, canonical_path, rng)
+    pydub_samples = _get_pydub_samples(speech_only_audio)
+    if len(canonical) != len(reference):
+        logger.error(
+            f"resampyの出力とサンプル数が異なります：{len(canonical)}, {len(reference)}"
+        )
+        raise ValueError(
+            f"resampyの出力とサンプル数が異なります：{len(canonical)}, {len(reference)}"
+        )
+    reference_pcm16 = reference * 32768.0
+    return {
+        "sample_rate": audio.frame_rate,
+        "channels": audio.channels,
+        "samples": len(canonical),
+        "max_abs_diff": float(np.abs(canonical - reference_pcm16).max(initial=0.0)),
+        "snr_db": _get_snr_db(reference, canonical),
+        "resampy_dbfs": _get_dbfs(np.clip(np.round(reference_pcm16), -32768, 32767)),
+        "canonical_dbfs": _get_dbfs(canonical),
+        "pydub_dbfs": _get_dbfs(pydub_samples),
+        "pydub_snr_db": _get_snr_db(reference, pydub_samples),
+    }
+
+
+def main(input_data_dir, output_path, with_tones=True, seed=0):
+    """
+    被験者の発話区間のみの音声について、前処理で保存する16kHzの音声（--canonical_audio）を
+    以前の特徴量抽出と同じく音声全体をresampyでリサンプリングした結果と比較する
+    max_abs_diffは16bit整数の単位で、丸めのみの違いであれば0.5以下になる
+    with_tonesがTrueなら、合成した正弦波で折り返し雑音の大きさ（dBFS）もpydubと比較する
+    """
+    rng = np.random.default_rng(seed)
+    voice_files = get_subject_voice_files(input_data_dir)
+    logger.info(f"{len(voice_files)}個の音声を比較します")
+
+    columns = [
+        "data_id",
+        "sample_rate",
+        "channels",
+        "samples",
+        "max_abs_diff",
+        "snr_db",
+        "resampy_dbfs",
+        "canonical_dbfs",
+        "pydub_dbfs",
+        "pydub_snr_db",
+    ]
+    max_abs_diff = 0.0
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(
+        output_path, mode="w", encoding="utf-8", newline=""
+    ) as f, tempfile.TemporaryDirectory() as tmp_dir:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for data_id, voice_file_path in voice_files:
+            audio = AudioSegment.from_file(voice_file_path)
+            row = _compare(audio, _get_speech_segments(audio), tmp_dir, rng)
+            writer.writerow({"data_id": data_id, **row})
+            max_abs_diff = max(max_abs_diff, row["max_abs_diff"])
+            logger.info(
+                f"{data_id}：最大の差{row['max_abs_diff']:.3f}、SN比{row['snr_db']:.1f}dB"
+                f"（pydub：{row['pydub_snr_db']:.1f}dB）"
+            )
+        if with_tones:
+            for frame_rate, channels in TONE_FORMATS:
+                for frequency in TONE_FREQUENCIES:
+                    audio = _make_tone_audio(frequency, frame_rate, channels)
+                    row = _compare(audio, [(0, len(audio))], tmp_dir, rng)
+                    writer.writerow(
+                        {"data_id": f"tone_{frequency}Hz_{frame_rate}Hz", **row}
+                    )
+                    max_abs_diff = max(max_abs_diff, row["max_abs_diff"])
+                    logger.info(
+                        f"{frequency}Hzの正弦波（{frame_rate}Hz・{channels}ch）：resampy{row['resampy_dbfs']:.1f}dBFS、"
+                        f"前処理{row['canonical_dbfs']:.1f}dBFS、pydub{row['pydub_dbfs']:.1f}dBFS、最大の差{row['max_abs_diff']:.3f}"
+                    )
+
+    logger.info(f"resampyの出力との最大の差：{max_abs_diff:.3f}（16bit整数の単位）")
+    logger.info(f"結果を{output_path}に保存しました")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--input_data_dir",
+        help="生データを格納しているディレクトリ",
+        type=str,
+        default="../data/raw",
+    )
+    parser.add_argument(
+        "--output_path",
+        help="音声ごとの比較結果を保存するCSVファイル",
+        type=str,
+        default="../data/preprocessed/canonical_audio_parity.csv",
+    )
+    parser.add_argument(
+        "--no_tones",
+        action="store_false",
+        dest="with_tones",
+        help="合成した正弦波での折り返し雑音の比較を行わない",
+    )
+    parser.add_argument(
+        "--seed",
+        default=0,
+        type=int,
+        help="ストリーミングでの書き込みを模してチャンクの長さを決める乱数のシード値",
+    )
+
+    args = parser.parse_args()
+    input_data_dir = args.input_data_dir
+    output_path = args.output_path
+    with_tones = args.with_tones
+    seed = args.seed
+
+    logger.info(f"入力ディレクトリ：{input_data_dir}")
+    main(input_data_dir, output_path, with_tones, seed)
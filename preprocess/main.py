@@ -1,26 +1,101 @@
-from pydub.silence import detect_nonsilent
 import os
 from pydub import AudioSegment
 from logzero import logger
 import argparse
-from moviepy.editor import VideoFileClip, concatenate_videoclips
+import imageio_ffmpeg
 import csv
-from reazonspeech.nemo.asr import transcribe, audio_from_path
-from reazonspeech.nemo.asr import load_model
+import multiprocessing
+import subprocess
+import tempfile
+import time
+import wave
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import numpy as np
+from asr_scheduler import BatchScheduler
+from manifest import (
+    load_manifest,
+    save_manifest,
+    get_session_fingerprint,
+    is_up_to_date,
+)
+from resample import ResampledWavWriter, RESAMPLE_FILTER
+from segment_index import get_segment_index_path, save_segment_index
+from silence import (
+    MIN_SILENCE_LEN,
+    SILENCE_THRESH,
+    IGNORE_SEGMENTS_MILLI_SECONDS,
+    detect_nonsilent,
+    get_samples,
+    get_mono_samples,
+    StreamingNonsilentDetector,
+)
+from streaming import get_audio_stream_info, iter_pcm_chunks
+from transcript_cache import TranscriptCache, get_transcript_key, DEFAULT_MAX_ENTRIES
 from utils import (
     get_subject_voice_files,
     get_counsellor_voice_files,
     get_video_files,
+    get_missing_modalities,
+    get_model,
+    log_model_load_seconds,
+    register_model,
+    set_device,
+    set_log_session,
+    set_num_threads,
     set_random_seed,
 )
 
 # ReazonSpeech model for Speech-to-Text
 # See: https://huggingface.co/reazon-research/reazonspeech-nemo-v2
-REAZON_MODEL = load_model(device="cuda")
-IGNORE_SEGMENTS_MILLI_SECONDS = 1000
+REAZON_MODEL_NAME = "reazon-research/reazonspeech-nemo-v2"
+# ReazonSpeechのモデルが入力として想定しているサンプリングレート
+REAZON_SAMPLE_RATE = 16000
+# 特徴量抽出で読み込む16kHz・モノラル・16bitの音声のNumPy形式のファイルの接尾辞
+PCM_SIDECAR_SUFFIX = "_pcm16k.npy"
+# サイドカーファイルを作成する際に一度に読み込むフレーム数
+_PCM_SIDECAR_CHUNK_FRAMES = 60 * REAZON_SAMPLE_RATE
+# reazonspeechのtranscribeで発話の前後に付ける無音の秒数
+REAZON_PAD_SECONDS = 0.5
+# 前処理済みの動画のFPS
+VIDEO_FPS = 10
+# ストリーミングでデコードする際に一度に読み込む秒数
+STREAM_CHUNK_SECONDS = 10
+# 実行方法を変えるだけで前処理結果には影響しないため、マニフェストに記録しないオプション
+# streaming・stream_chunk_secondsはデコード方法が変わり前処理結果が変わりうるので記録する
+EXECUTION_OPTIONS = ["pipeline"]
+# テキスト化で一度にモデルに入力する発話の数
+ASR_BATCH_SIZE = 1
+
+
+def _load_reazon_model(device):
+    """
+    ReazonSpeechのモデルを読み込む
+    """
+    # NOTE: reazonspeech(NeMo)は読み込むだけで時間がかかるため、使うときに読み込む
+    from reazonspeech.nemo.asr import load_model
+
+    return load_model(device=device)
+
+
+register_model(REAZON_MODEL_NAME, _load_reazon_model)
 
 
-def _get_speech_segments(audio, min_silence_len=500, silence_thresh=-50):
+def _is_ignored_segment(start, end):
+    """
+    IGNORE_SEGMENTS_MILLI_SECONDSミリ秒未満の区間は無視する
+    """
+    if end - start < IGNORE_SEGMENTS_MILLI_SECONDS:
+        logger.info(
+            f"{start}ミリ秒から{end}ミリ秒の区間は{IGNORE_SEGMENTS_MILLI_SECONDS}ミリ秒未満であるため無視します"
+        )
+        return True
+    return False
+
+
+def _get_speech_segments(
+    audio, min_silence_len=MIN_SILENCE_LEN, silence_thresh=SILENCE_THRESH
+):
     """
     音声データから発話区間の開始ミリ秒・終了ミリ秒を取得
     """
@@ -34,145 +109,644 @@ def _get_speech_segments(audio, min_silence_len=500, silence_thresh=-50):
     )
     speech_segments = []
     for start, end in nonsilent_segments:
-        if (
-            end - start < IGNORE_SEGMENTS_MILLI_SECONDS
-        ):  # IGNORE_SEGMENTS_MILLI_SECONDSミリ秒未満の区間は無視する
-            logger.info(
-                f"{start}ミリ秒から{end}ミリ秒の区間は{IGNORE_SEGMENTS_MILLI_SECONDS}ミリ秒未満であるため無視します"
-            )
+        if _is_ignored_segment(start, end):
             continue
         speech_segments.append((start, end))
     logger.info("発話区間を取得しました")
     return speech_segments
 
 
-def _get_subject_text_list(voice_file_path, start, end):
+def _get_utterance_audio(utterance):
     """
-    発話開始秒, 発話終了秒, 発話テキスト からなるCSV行を生成する
+    発話区間の音声をファイルを経由せずにReazonSpeechの入力形式に変換する
+    一時的なWAVファイルを経由する場合（librosa.load）と同じく元のサンプリングレートのままモノラルにし、
+    16kHzへのリサンプリングはReazonSpeech（librosa）に任せる
+    ミリ秒単位で切り出し直すと1ミリ秒が整数のフレーム数でない場合（44.1kHzなど）に末尾が欠けるので、
+    切り出した音声をそのまま変換する
     """
-    audio = audio_from_path(voice_file_path)
-    try:
-        logger.info(
-            f"{voice_file_path}の{start}ミリ秒から{end}ミリ秒をテキスト化しています..."
+    from reazonspeech.nemo.asr import audio_from_numpy
+
+    samples = get_mono_samples(
+        utterance.raw_data, utterance.sample_width, utterance.channels
+    )
+    return audio_from_numpy(samples, utterance.frame_rate)
+
+
+def _get_tmp_wav_audio(utterance, tmp_utterance_path):
+    """
+    発話区間の音声を一時的なWAVファイルを経由してReazonSpeechの入力形式に変換する（従来の挙動）
+    """
+    from reazonspeech.nemo.asr import audio_from_path
+
+    # 発話ごとに音声を一時的に保存
+    utterance.export(tmp_utterance_path, format="wav")
+    audio = audio_from_path(tmp_utterance_path)
+    os.remove(tmp_utterance_path)
+    return audio
+
+
+def _transcribe_nemo_batch(model, audios):
+    """
+    NeMoのモデルに複数の発話をまとめて入力してテキスト化する
+    reazonspeechのtranscribeと同じく16kHz・モノラルにし、発話の前後に無音を付けてから、
+    一時的なWAVファイルを経由せずに配列のまま入力する
+    """
+    from reazonspeech.nemo.asr.audio import norm_audio
+
+    waveforms = []
+    for audio in audios:
+        audio = norm_audio(audio)
+        pad = np.zeros(int(REAZON_PAD_SECONDS * audio.samplerate), dtype=np.float32)
+        waveforms.append(
+            np.concatenate((pad, np.asarray(audio.waveform, dtype=np.float32), pad))
         )
-        result = transcribe(REAZON_MODEL, audio)
-    except Exception as e:
-        logger.error(f"テキスト化の際に例外が発生しました：{e}")
-        return None
-    text = result.text
-    if len(text) > 0:
-        return [start / 1000, end / 1000, text]  # ミリ秒を秒に直してからCSVに書き込む
-    return None
+    hypotheses = model.transcribe(waveforms, batch_size=len(waveforms))
+    # NeMoのバージョンによっては(最良の仮説, 全ての仮説)のタプルを返す
+    if isinstance(hypotheses, tuple):
+        hypotheses = hypotheses[0]
+    return [x if isinstance(x, str) else x.text for x in hypotheses]
 
 
-def _get_voice_text(
-    audio,
-    speech_segments,
-    voice_output_file_path,
-    text_output_file_path,
-    is_counsellor=False,
+def _transcribe_batch(audios, use_nemo_batch=False):
+    """
+    ReazonSpeechの入力形式の音声のリストをテキスト化する
+    use_nemo_batchがFalseなら従来通り1つずつreazonspeechのtranscribeでテキスト化する
+    """
+    from reazonspeech.nemo.asr import transcribe
+
+    model = get_model(REAZON_MODEL_NAME)
+    if use_nemo_batch:
+        return _transcribe_nemo_batch(model, audios)
+    return [transcribe(model, audio).text for audio in audios]
+
+
+def _get_asr_model_id(mode, asr_batch_size):
+    """
+    テキスト化の方法によって結果が変わりうるので、キャッシュのキーに含めるモデルのIDを作成する
+    """
+    asr_model_id = f"{REAZON_MODEL_NAME}:{mode}"
+    if asr_batch_size > 1:
+        asr_model_id += ":batch"
+    return asr_model_id
+
+
+def _get_text_lists(
+    utterance_lists, asr_model_id, transcript_cache=None, asr_batch_size=1
 ):
     """
-    発話区間だけ音声データを抜き出す
+    トラック（被験者・カウンセラー）ごとに、発話開始秒, 発話終了秒, 発話テキスト からなるCSV行のリストを生成する
+    utterance_listsはトラックごとの(発話区間の音声, 開始ミリ秒, 終了ミリ秒, ReazonSpeechの入力を返す関数)のリストで、
+    キャッシュにテキストがない発話のみ、全てのトラックの発話を長さの近いものごとにasr_batch_size個ずつまとめてテキスト化する
+    """
+    scheduler = BatchScheduler(
+        partial(_transcribe_batch, use_nemo_batch=asr_batch_size > 1), asr_batch_size
+    )
+    texts = [[None] * len(utterances) for utterances in utterance_lists]
+    cache_keys = {}
+    for track, utterances in enumerate(utterance_lists):
+        for i, (utterance, start, end, get_audio) in enumerate(utterances):
+            if transcript_cache is not None:
+                cache_keys[track, i] = get_transcript_key(utterance, asr_model_id)
+                texts[track][i] = transcript_cache.get(cache_keys[track, i])
+            if texts[track][i] is None:
+                scheduler.add((track, i), end - start, get_audio)
+    for (track, i), text in scheduler.run().items():
+        texts[track][i] = text
+        # 失敗した発話は次回テキスト化し直せるようにキャッシュしない
+        if text is not None and transcript_cache is not None:
+            transcript_cache.put(cache_keys[track, i], text)
+
+    text_lists = []
+    for utterances, track_texts in zip(utterance_lists, texts):
+        text_list = []
+        for (_, start, end, _), text in zip(utterances, track_texts):
+            if text:
+                # ミリ秒を秒に直してからCSVに書き込む
+                text_list.append([start / 1000, end / 1000, text])
+        text_lists.append(text_list)
+    return text_lists
+
+
+def _write_text(text_output_file_path, subject_text_list):
+    """
+    発話テキストを保存する
     """
-    subject_voice_sum = AudioSegment.empty()
-    subject_text_list = []
-    logger.info("音声とテキストを抽出しています...")
-    utterance_count = 1
-    for start, end in speech_segments:
-        subject_voice_sum += audio[start:end]
-        subject_voice = AudioSegment.empty()
-        subject_voice += audio[start:end]
-        tmp_utterance_path = f"./tmp_utterance_{utterance_count}.wav"
-        # 発話ごとに音声を一時的に保存
-        subject_voice.export(tmp_utterance_path, format="wav")
-        # 発話ごとのテキストを抽出
-        text_list = _get_subject_text_list(tmp_utterance_path, start, end)
-        if text_list:
-            subject_text_list.append(text_list)
-        utterance_count += 1
-        os.remove(tmp_utterance_path)
-    # 発話区間のみの音声データを保存
-    if not is_counsellor:
-        subject_voice_sum.export(voice_output_file_path, format="wav")
-        logger.info(f"{voice_output_file_path}に前処理済みの音声を保存しました")
-    # 発話テキストを保存
     with open(text_output_file_path, mode="w", encoding="utf-8") as f:
         writer = csv.writer(f)
         writer.writerow(["start_seconds", "end_seconds", "text"])
         writer.writerows(subject_text_list)
     logger.info(f"{text_output_file_path}にテキストを保存しました")
+
+
+def _get_speech_only_audio(audio, speech_segments):
+    """
+    発話区間のみを連結した音声を作成する
+    AudioSegmentを+=で連結すると毎回全体がコピーされるため、バイト列を一度に連結する
+    """
+    data = b"".join(audio[start:end].raw_data for start, end in speech_segments)
+    return AudioSegment(
+        data=data,
+        sample_width=audio.sample_width,
+        frame_rate=audio.frame_rate,
+        channels=audio.channels,
+    )
+
+
+def _get_pcm_sidecar_path(voice_output_file_path):
+    """
+    前処理済みの音声に対応するNumPy形式のサイドカーファイルのパスを取得する
+    """
+    return os.path.splitext(voice_output_file_path)[0] + PCM_SIDECAR_SUFFIX
+
+
+def _save_pcm_sidecar(voice_output_file_path):
+    """
+    16kHz・モノラル・16bitの前処理済みの音声から、int16の.npyファイルを作成する
+    特徴量抽出ではこれをメモリマップで読み込むことで、WAVのデコードとリサンプリングを省ける
+    """
+    pcm_sidecar_path = _get_pcm_sidecar_path(voice_output_file_path)
+    with wave.open(voice_output_file_path, "rb") as f:
+        frame_count = f.getnframes()
+        pcm = np.lib.format.open_memmap(
+            pcm_sidecar_path, mode="w+", dtype=np.int16, shape=(frame_count,)
+        )
+        for start in range(0, frame_count, _PCM_SIDECAR_CHUNK_FRAMES):
+            data = np.frombuffer(
+                f.readframes(_PCM_SIDECAR_CHUNK_FRAMES), dtype=np.int16
+            )
+            pcm[start : start + len(data)] = data
+        pcm.flush()
+    del pcm
+    logger.info(f"{pcm_sidecar_path}に16kHzの音声を保存しました")
+    return pcm_sidecar_path
+
+
+def _get_utterances(audio, speech_segments, use_tmp_wav=False, track_name=""):
+    """
+    発話区間ごとに(発話区間の音声, 開始ミリ秒, 終了ミリ秒, ReazonSpeechの入力を返す関数)のリストを作成する
+    """
+    utterances = []
+    utterance_count = 1
+    for start, end in speech_segments:
+        utterance = audio[start:end]
+        if use_tmp_wav:
+            # 並列実行時に他のプロセスと、まとめてテキスト化する他のトラックと衝突しないように
+            # プロセスIDとトラック名を付ける
+            tmp_utterance_path = (
+                f"./tmp_utterance_{os.getpid()}_{track_name}{utterance_count}.wav"
+            )
+            get_audio = partial(_get_tmp_wav_audio, utterance, tmp_utterance_path)
+        else:
+            # 発話ごとのテキストをメモリ上の音声から抽出
+            get_audio = partial(_get_utterance_audio, utterance)
+        utterances.append((utterance, start, end, get_audio))
+        utterance_count += 1
+    return utterances
+
+
+def _get_voice_text(
+    tracks,
+    use_tmp_wav=False,
+    transcript_cache=None,
+    asr_batch_size=1,
+):
+    """
+    tracksは(音声, 発話区間, テキストの出力先)のリストで、全てのトラックの発話をまとめてテキスト化し、
+    トラックごとに発話テキストを保存する
+    """
+    logger.info("テキストを抽出しています...")
+    asr_model_id = _get_asr_model_id(
+        "tmp_wav" if use_tmp_wav else "array", asr_batch_size
+    )
+    utterance_lists = [
+        _get_utterances(audio, speech_segments, use_tmp_wav, f"{track}_")
+        for track, (audio, speech_segments, _) in enumerate(tracks)
+    ]
+    text_lists = _get_text_lists(
+        utterance_lists, asr_model_id, transcript_cache, asr_batch_size
+    )
+    if transcript_cache is not None:
+        transcript_cache.log_stats()
+    # 発話テキストを保存
+    for (_, _, text_output_file_path), text_list in zip(tracks, text_lists):
+        _write_text(text_output_file_path, text_list)
     return
 
 
-def _get_video(video_file, speech_segments, video_output_file_path):
+def _save_voice(audio, speech_segments, voice_output_file_path, canonical_audio=False):
+    """
+    発話区間だけ音声データを抜き出して保存する
+    canonical_audioがTrueなら、前処理済みの音声を16kHz・モノラル・16bitで保存する
+    """
+    if canonical_audio:
+        # 発話区間ごとに帯域制限のフィルタ（resampy）でリサンプリングしながら書き込む
+        voice_writer = ResampledWavWriter(
+            voice_output_file_path,
+            audio.frame_rate,
+            audio.sample_width,
+            audio.channels,
+            REAZON_SAMPLE_RATE,
+        )
+        try:
+            for start, end in speech_segments:
+                voice_writer.writeframes(audio[start:end].raw_data)
+        finally:
+            voice_writer.close()
+    else:
+        output_audio = _get_speech_only_audio(audio, speech_segments)
+        output_audio.export(voice_output_file_path, format="wav")
+    logger.info(f"{voice_output_file_path}に前処理済みの音声を保存しました")
+    if canonical_audio:
+        _save_pcm_sidecar(voice_output_file_path)
+    return
+
+
+def _open_voice_writer(
+    voice_output_file_path, frame_rate, sample_width, channels, canonical_audio=False
+):
+    """
+    発話区間の音声を順に書き込むWAVファイルを開く
+    canonical_audioがTrueなら、16kHz・モノラル・16bitにリサンプリングしながら書き込む
+    """
+    if canonical_audio:
+        return ResampledWavWriter(
+            voice_output_file_path,
+            frame_rate,
+            sample_width,
+            channels,
+            REAZON_SAMPLE_RATE,
+        )
+    voice_writer = wave.open(voice_output_file_path, "wb")
+    voice_writer.setnchannels(channels)
+    voice_writer.setsampwidth(sample_width)
+    voice_writer.setframerate(frame_rate)
+    return voice_writer
+
+
+def _iter_streaming_utterances(
+    voice_file_path,
+    frame_rate,
+    channels,
+    sample_width,
+    stream_chunk_seconds=STREAM_CHUNK_SECONDS,
+):
+    """
+    音声ファイルをチャンクごとにデコードしながら発話区間を求め、
+    同時に確定した発話区間ごとに(発話区間の音声, 開始ミリ秒, 終了ミリ秒)のリストを返す
+    保持する音声は未確定の区間のみなので、メモリ使用量は音声の長さによらない
+    """
+    frame_width = sample_width * channels
+    detector = StreamingNonsilentDetector(
+        frame_rate, channels, sample_width, MIN_SILENCE_LEN, SILENCE_THRESH
+    )
+    # まだ発話区間として確定していない音声とその先頭のフレーム位置
+    pending = bytearray()
+    pending_start_frame = 0
+
+    def _get_utterances(nonsilent_segments):
+        utterances = []
+        for start, end in nonsilent_segments:
+            if _is_ignored_segment(start, end):
+                continue
+            # pydubのAudioSegment[start:end]と同じ方法でミリ秒をフレーム位置に変換する
+            start_byte = (int(start * frame_rate / 1000.0) - pending_start_frame) * (
+                frame_width
+            )
+            end_byte = (int(end * frame_rate / 1000.0) - pending_start_frame) * (
+                frame_width
+            )
+            data = bytes(pending[start_byte:end_byte])
+            # 音声の末尾を超える部分は無音で埋める（pydubと同じ）
+            data += b"\0" * (end_byte - start_byte - len(data))
+            utterance = AudioSegment(
+                data=data,
+                sample_width=sample_width,
+                frame_rate=frame_rate,
+                channels=channels,
+            )
+            utterances.append((utterance, start, end))
+        return utterances
+
+    for data in iter_pcm_chunks(
+        voice_file_path,
+        sample_width,
+        channels,
+        int(stream_chunk_seconds * frame_rate),
+    ):
+        pending += data
+        yield _get_utterances(detector.feed(get_samples(data, sample_width)))
+        # 以降の発話区間に含まれない音声を捨てる
+        drop_frame = int(detector.get_pending_start() * frame_rate / 1000.0)
+        drop_bytes = min((drop_frame - pending_start_frame) * frame_width, len(pending))
+        if drop_bytes > 0:
+            del pending[:drop_bytes]
+            pending_start_frame += drop_bytes // frame_width
+    yield _get_utterances(detector.finish())
+
+
+def _get_voice_text_streaming(
+    voice_file_path,
+    voice_output_file_path,
+    text_output_file_path,
+    is_counsellor=False,
+    use_tmp_wav=False,
+    transcript_cache=None,
+    stream_chunk_seconds=STREAM_CHUNK_SECONDS,
+    asr_batch_size=1,
+    canonical_audio=False,
+):
+    """
+    音声ファイルをチャンクごとにデコードしながら発話区間を求め、
+    確定した発話区間から順にテキスト化と音声の書き込みを行い、発話区間のリストを返す
+    保持する音声は未確定の区間のみなので、メモリ使用量は音声の長さによらない
+    """
+    logger.info(
+        "音声をストリーミングでデコードしながら音声とテキストを抽出しています..."
+    )
+    frame_rate, channels, sample_width = get_audio_stream_info(voice_file_path)
+    asr_model_id = _get_asr_model_id(
+        "tmp_wav" if use_tmp_wav else "array", asr_batch_size
+    )
+    voice_writer = None
+    if not is_counsellor:
+        voice_writer = _open_voice_writer(
+            voice_output_file_path, frame_rate, sample_width, channels, canonical_audio
+        )
+    speech_segments = []
+    subject_text_list = []
+    try:
+        for segment_utterances in _iter_streaming_utterances(
+            voice_file_path, frame_rate, channels, sample_width, stream_chunk_seconds
+        ):
+            # 同時に確定した発話区間はまとめてテキスト化する
+            utterances = []
+            for utterance, start, end in segment_utterances:
+                speech_segments.append((start, end))
+                if voice_writer is not None:
+                    voice_writer.writeframes(utterance.raw_data)
+                if use_tmp_wav:
+                    tmp_utterance_path = (
+                        f"./tmp_utterance_{os.getpid()}_{len(speech_segments)}.wav"
+                    )
+                    get_audio = partial(
+                        _get_tmp_wav_audio, utterance, tmp_utterance_path
+                    )
+                else:
+                    get_audio = partial(_get_utterance_audio, utterance)
+                utterances.append((utterance, start, end, get_audio))
+            subject_text_list.extend(
+                _get_text_lists(
+                    [utterances], asr_model_id, transcript_cache, asr_batch_size
+                )[0]
+            )
+    finally:
+        if voice_writer is not None:
+            voice_writer.close()
+    if transcript_cache is not None:
+        transcript_cache.log_stats()
+    if voice_writer is not None:
+        logger.info(f"{voice_output_file_path}に前処理済みの音声を保存しました")
+        if canonical_audio:
+            _save_pcm_sidecar(voice_output_file_path)
+    _write_text(text_output_file_path, subject_text_list)
+    return speech_segments
+
+
+def _get_select_expr(speech_segments):
+    """
+    ffmpegのselect/aselectフィルタで発話区間のみを選択する式を作成する
+    """
+    return "+".join(
+        f"gte(t,{start_ms / 1000:.3f})*lt(t,{end_ms / 1000:.3f})"
+        for start_ms, end_ms in speech_segments
+    )
+
+
+def _get_video(
+    video_file,
+    speech_segments,
+    video_output_file_path,
+    video_fps=VIDEO_FPS,
+    video_scale=None,
+):
     """
     speech_segmentsを使って、対象者の映っている区間の動画フレームを抜き出す
+    区間ごとに動画を開かずに、1つのffmpegプロセスで切り抜き・結合・エンコードを行う
     """
-    video = VideoFileClip(video_file)
-    # 動画の切り抜きと保存
-    clips = []
-    for i, (start_ms, end_ms) in enumerate(speech_segments):
-        start_time = start_ms / 1000  # 秒に変換
-        end_time = end_ms / 1000  # 秒に変換
-        clip = video.subclip(start_time, end_time)
-        clips.append(clip)
-    # 切り抜いた動画を結合
-    final_clip = concatenate_videoclips(clips)
-    # 10FPSで動画を保存する
-    final_clip.write_videofile(video_output_file_path, codec="libx264", fps=10)
-
-    # リソースを解放
-    video.reader.close()
-    video.audio.reader.close_proc()
-    for clip in clips:
-        clip.reader.close()
-        clip.audio.reader.close_proc()
-    logger.info(f"{video_output_file_path}に前処理済みの動画を保存しました")
+    select_expr = _get_select_expr(speech_segments)
+    # 先にFPSを揃えてから発話区間のフレームを選択し、タイムスタンプを詰め直す
+    video_filters = [
+        f"fps={video_fps}",
+        f"select='{select_expr}'",
+        f"setpts=N/{video_fps}/TB",
+    ]
+    if video_scale:
+        video_filters.append(f"scale={video_scale}")
+    # 音声は区間の境界の精度を上げるため細かいフレームに分けてから選択する
+    audio_filters = [
+        "asetnsamples=n=64:p=0",
+        f"aselect='{select_expr}'",
+        "asetpts=N/SR/TB",
+    ]
+    filter_complex = (
+        f"[0:v]{','.join(video_filters)}[v];[0:a]{','.join(audio_filters)}[a]"
+    )
+    # 発話区間ごとに式が長くなり、発話区間が数千個あるとコマンドライン引数1つの上限（128KiB）を超えるので、
+    # フィルタグラフは一時ファイルに書き出して-filter_complex_scriptで渡す
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filter_script_path = os.path.join(tmp_dir, "filter_complex.txt")
+        with open(filter_script_path, mode="w", encoding="utf-8") as f:
+            f.write(filter_complex)
+        command = [
+            imageio_ffmpeg.get_ffmpeg_exe(),
+            "-y",
+            "-loglevel",
+            "error",
+            "-i",
+            video_file,
+            "-filter_complex_script",
+            filter_script_path,
+            "-map",
+            "[v]",
+            "-map",
+            "[a]",
+            "-c:v",
+            "libx264",
+            "-pix_fmt",
+            "yuv420p",
+            "-r",
+            str(video_fps),
+            "-c:a",
+            "aac",
+            video_output_file_path,
+        ]
+        logger.info(f"{video_file}から発話区間の動画を切り抜いています...")
+        result = subprocess.run(
+            command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        if result.returncode != 0:
+            logger.error(f"動画の切り抜きに失敗しました：{result.stderr}")
+            raise RuntimeError("動画の切り抜きに失敗しました")
+
+    # 切り抜いた動画の長さとフレーム数が発話区間の合計と一致するか確認する
+    expected_seconds = sum(end - start for start, end in speech_segments) / 1000
+    frame_count, seconds = imageio_ffmpeg.count_frames_and_secs(video_output_file_path)
+    if abs(frame_count - expected_seconds * video_fps) > len(speech_segments):
+        logger.warning(
+            f"frame count: {frame_count} != expected: {expected_seconds * video_fps:.1f}"
+        )
+    logger.info(
+        f"{video_output_file_path}に前処理済みの動画を保存しました（{frame_count}フレーム、{seconds:.1f}秒）"
+    )
     return
 
 
+def _run_with_background(foreground, background):
+    """
+    backgroundを別スレッドで実行しながらforegroundを実行し、両方の終了を待つ
+    両方で例外が発生した場合は、backgroundの例外をログに出力してforegroundの例外を送出する
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        background_future = executor.submit(background)
+        try:
+            foreground()
+        except Exception:
+            background_exception = background_future.exception()
+            if background_exception is not None:
+                logger.error(
+                    f"並行して実行していた処理も失敗しました：{background_exception}"
+                )
+            raise
+        foreground_seconds = time.perf_counter() - start
+        background_future.result()
+    logger.info(
+        f"並行して実行しました（前景{foreground_seconds:.1f}秒、全体{time.perf_counter() - start:.1f}秒）"
+    )
+
+
 def _preprocess(
     video_file_path,
     voice_file_path,
+    counsellor_voice_file_path,
     save_dir,
     text_output_file_path,
-    is_counsellor=False,
+    counsellor_text_output_file_path,
+    use_tmp_wav=False,
+    video_fps=VIDEO_FPS,
+    video_scale=None,
+    transcript_cache=None,
+    streaming=False,
+    stream_chunk_seconds=STREAM_CHUNK_SECONDS,
+    pipeline=False,
+    asr_batch_size=1,
+    canonical_audio=False,
 ):
     """
-    前処理を行う
+    被験者とカウンセラーの前処理を行い、出力したファイルのパスのリストを返す
+    被験者とカウンセラーの発話はまとめてテキスト化する（streamingがTrueならトラックごとに逐次的に行う）
+    pipelineがTrueなら、発話区間が分かった時点で動画の切り抜きを別スレッドで始め、テキスト化と並行して行う
     """
-    logger.info(f"{video_file_path}と{voice_file_path}の前処理を開始します...")
-    # pydubで音声ファイルを開く
-    audio = AudioSegment.from_file(voice_file_path)
-    # 音声データから対象者が喋っている区間のミリ秒を取得する
-    speech_segments = _get_speech_segments(audio)
-
+    logger.info(
+        f"{video_file_path}と{voice_file_path}と{counsellor_voice_file_path}の前処理を開始します..."
+    )
     voice_output_file_name = os.path.splitext(os.path.basename(voice_file_path))[0]
     voice_output_file_path = os.path.join(save_dir, f"{voice_output_file_name}.wav")
-    # speech_segmentsを利用して音声データから発話区間の音声と発話テキストを抜き出す
-    _get_voice_text(
-        audio,
-        speech_segments,
-        voice_output_file_path,
-        text_output_file_path,
-        is_counsellor,
+    video_output_file_name = os.path.splitext(os.path.basename(video_file_path))[0]
+    video_output_file_path = os.path.join(save_dir, f"{video_output_file_name}.mp4")
+    get_video = partial(
+        _get_video,
+        video_file_path,
+        video_output_file_path=video_output_file_path,
+        video_fps=video_fps,
+        video_scale=video_scale,
     )
-
-    if not is_counsellor:
-        video_output_file_name = os.path.splitext(os.path.basename(video_file_path))[0]
-        video_output_file_path = os.path.join(save_dir, f"{video_output_file_name}.mp4")
+    if streaming:
+        # 音声全体を読み込まずに、発話区間の取得・テキスト化・音声の保存を逐次的に行う
+        # 音声全体を保持しないため、トラックごとにテキスト化する
+        speech_segments = _get_voice_text_streaming(
+            voice_file_path,
+            voice_output_file_path,
+            text_output_file_path,
+            False,
+            use_tmp_wav,
+            transcript_cache,
+            stream_chunk_seconds,
+            asr_batch_size,
+            canonical_audio,
+        )
+        _get_voice_text_streaming(
+            counsellor_voice_file_path,
+            None,
+            counsellor_text_output_file_path,
+            True,
+            use_tmp_wav,
+            transcript_cache,
+            stream_chunk_seconds,
+            asr_batch_size,
+            canonical_audio,
+        )
         # speech_segmentsを利用して動画データから対象者の映っている動画フレームを抜き出す
-        _get_video(video_file_path, speech_segments, video_output_file_path)
-    return
+        get_video(speech_segments=speech_segments)
+    else:
+        # pydubで音声ファイルを開き、音声データから対象者・カウンセラーが喋っている区間のミリ秒を取得する
+        audio = AudioSegment.from_file(voice_file_path)
+        speech_segments = _get_speech_segments(audio)
+        counsellor_audio = AudioSegment.from_file(counsellor_voice_file_path)
+        counsellor_speech_segments = _get_speech_segments(counsellor_audio)
+        # 被験者とカウンセラーの発話を1つのスケジューラでまとめてテキスト化する
+        get_voice_text = partial(
+            _get_voice_text,
+            [
+                (audio, speech_segments, text_output_file_path),
+                (
+                    counsellor_audio,
+                    counsellor_speech_segments,
+                    counsellor_text_output_file_path,
+                ),
+            ],
+            use_tmp_wav,
+            transcript_cache,
+            asr_batch_size,
+        )
+        if pipeline:
+            # 動画の切り抜きはffmpegのサブプロセスで行うので、テキスト化と並行して実行できる
+            _run_with_background(
+                get_voice_text, partial(get_video, speech_segments=speech_segments)
+            )
+        else:
+            get_voice_text()
+            # speech_segmentsを利用して動画データから対象者の映っている動画フレームを抜き出す
+            get_video(speech_segments=speech_segments)
+        # 発話区間のみの音声データを保存
+        _save_voice(audio, speech_segments, voice_output_file_path, canonical_audio)
 
+    # 後段の処理で元の音声と結合した音声・動画の時刻を対応付けられるように発話区間を保存する
+    segment_index_path = get_segment_index_path(voice_output_file_path)
+    save_segment_index(segment_index_path, speech_segments)
+    output_file_paths = [
+        text_output_file_path,
+        voice_output_file_path,
+        video_output_file_path,
+        segment_index_path,
+    ]
+    if canonical_audio:
+        output_file_paths.append(_get_pcm_sidecar_path(voice_output_file_path))
+    output_file_paths.append(counsellor_text_output_file_path)
+    return output_file_paths
 
-def main(input_data_dir, output_data_dir):
-    os.makedirs(output_data_dir, exist_ok=True)
 
+def _get_sessions(input_data_dir):
+    """
+    データIDごとに被験者の音声・カウンセラーの音声・動画のファイルパスをまとめる
+    """
     subject_voice_files = get_subject_voice_files(input_data_dir)
     counsellor_voice_files = get_counsellor_voice_files(input_data_dir)
     video_files = get_video_files(input_data_dir)
+    for data_id, missing_modalities in get_missing_modalities(input_data_dir).items():
+        logger.warning(
+            f"{data_id}に{'・'.join(missing_modalities)}のファイルがありません"
+        )
 
     if not (
         len(subject_voice_files) == len(counsellor_voice_files) == len(video_files)
@@ -183,61 +757,250 @@ def main(input_data_dir, output_data_dir):
         raise ValueError(
             "被験者の音声ファイルの数、カウンセラーの音声ファイルの数、動画ファイルの数が一致しません"
         )
-    logger.info(f"{len(subject_voice_files)}個のデータを前処理します")
 
-    # 被験者データの前処理
-    for voice_file, video_file in zip(subject_voice_files, video_files):
-        voice_data_id = voice_file[0]
-        voice_file_path = voice_file[1]
+    sessions = []
+    for subject_voice_file, counsellor_voice_file, video_file in zip(
+        subject_voice_files, counsellor_voice_files, video_files
+    ):
         video_data_id = video_file[0]
-        video_file_path = video_file[1]
-
-        if voice_data_id != video_data_id:
-            logger.error(
-                f"voice_data_id: {voice_data_id} != video_data_id: {video_data_id}"
+        for voice_data_id, _ in [subject_voice_file, counsellor_voice_file]:
+            if voice_data_id != video_data_id:
+                logger.error(
+                    f"voice_data_id: {voice_data_id} != video_data_id: {video_data_id}"
+                )
+                raise ValueError("voice_data_idとvideo_data_idが一致しません")
+        sessions.append(
+            (
+                video_data_id,
+                subject_voice_file[1],
+                counsellor_voice_file[1],
+                video_file[1],
             )
-            raise ValueError("voice_data_idとvideo_data_idが一致しません")
-
-        data_id = voice_data_id
-        multimodal_save_dir = os.path.join(output_data_dir, data_id)
-        os.makedirs(multimodal_save_dir, exist_ok=True)
-        video_filename = os.path.splitext(os.path.basename(video_file_path))[0]
-        os.makedirs(os.path.join(output_data_dir, "subject_text"), exist_ok=True)
-        _preprocess(
+        )
+    return sessions
+
+
+def _preprocess_session(
+    data_id,
+    subject_voice_file_path,
+    counsellor_voice_file_path,
+    video_file_path,
+    output_data_dir,
+    preprocess_options,
+    transcript_cache_options=None,
+):
+    """
+    1つのデータIDについて被験者とカウンセラーの前処理を行い、出力したファイルのパスのリストを返す
+    preprocess_optionsは_preprocessのキーワード引数として渡す
+    transcript_cache_optionsはTranscriptCacheの引数で、Noneならキャッシュを使わない
+    """
+    multimodal_save_dir = os.path.join(output_data_dir, data_id)
+    os.makedirs(multimodal_save_dir, exist_ok=True)
+    video_filename = os.path.splitext(os.path.basename(video_file_path))[0]
+    transcript_cache = None
+    if transcript_cache_options is not None:
+        transcript_cache = TranscriptCache(**transcript_cache_options)
+
+    try:
+        # 被験者データとカウンセラーデータの前処理
+        output_file_paths = _preprocess(
             video_file_path,
-            voice_file_path,
+            subject_voice_file_path,
+            counsellor_voice_file_path,
             multimodal_save_dir,
             os.path.join(
                 output_data_dir, "subject_text", f"{data_id}_{video_filename}.csv"
             ),
+            os.path.join(
+                output_data_dir, "counsellor_text", f"{data_id}_{video_filename}.csv"
+            ),
+            transcript_cache=transcript_cache,
+            **preprocess_options,
         )
+    finally:
+        if transcript_cache is not None:
+            transcript_cache.close()
+    return output_file_paths
 
-    for voice_file, video_file in zip(counsellor_voice_files, video_files):
-        voice_data_id = voice_file[0]
-        voice_file_path = voice_file[1]
-        video_data_id = video_file[0]
-        video_file_path = video_file[1]
 
-        if voice_data_id != video_data_id:
-            logger.error(
-                f"voice_data_id: {voice_data_id} != video_data_id: {video_data_id}"
+def _preprocess_session_worker(
+    session, output_data_dir, preprocess_options, transcript_cache_options
+):
+    """
+    ワーカープロセス上で1つのデータIDの前処理を行う
+    """
+    set_log_session(session[0])
+    return _preprocess_session(
+        *session, output_data_dir, preprocess_options, transcript_cache_options
+    )
+
+
+def _init_worker(device, asr_threads=None):
+    """
+    ワーカープロセスの初期化を行う
+    """
+    set_random_seed()
+    set_device(device)
+    set_num_threads(asr_threads)
+
+
+def _preprocess_parallel(
+    sessions,
+    output_data_dir,
+    jobs,
+    preprocess_options,
+    on_complete,
+    device,
+    transcript_cache_options,
+    asr_threads=None,
+):
+    """
+    データIDごとの前処理を複数のプロセスで並列に行い、失敗したデータIDを返す
+    前処理が完了したデータIDごとにon_complete(data_id, output_file_paths)を呼ぶ
+    """
+    failed_data_ids = []
+    # CUDAを使うためforkではなくspawnでワーカーを起動する
+    # 各ワーカーはReazonSpeechのモデルを初めて使うときに一度だけ読み込む
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(device, asr_threads),
+    ) as executor:
+        futures = {
+            executor.submit(
+                _preprocess_session_worker,
+                session,
+                output_data_dir,
+                preprocess_options,
+                transcript_cache_options,
+            ): session[0]
+            for session in sessions
+        }
+        for future in as_completed(futures):
+            data_id = futures[future]
+            try:
+                output_file_paths = future.result()
+                logger.info(f"{data_id}の前処理が完了しました")
+                on_complete(data_id, output_file_paths)
+            except Exception as e:
+                # 1つのデータIDの失敗で他のデータIDの前処理は止めない
+                logger.error(f"{data_id}の前処理中に例外が発生しました：{e}")
+                failed_data_ids.append(data_id)
+    return sorted(failed_data_ids)
+
+
+def _get_manifest_parameters(preprocess_options):
+    """
+    前処理結果に影響するパラメータとモデルをマニフェストに記録する形式で返す
+    """
+    parameters = {
+        "min_silence_len": MIN_SILENCE_LEN,
+        "silence_thresh": SILENCE_THRESH,
+        "ignore_segments_milli_seconds": IGNORE_SEGMENTS_MILLI_SECONDS,
+        "asr_model": REAZON_MODEL_NAME,
+        **{
+            key: value
+            for key, value in preprocess_options.items()
+            if key not in EXECUTION_OPTIONS
+        },
+    }
+    if preprocess_options.get("canonical_audio"):
+        # リサンプリングの方法が変われば16kHzの音声を作成し直す
+        parameters["resample_filter"] = RESAMPLE_FILTER
+    return parameters
+
+
+def main(
+    input_data_dir,
+    output_data_dir,
+    jobs=1,
+    preprocess_options=None,
+    force_data_ids=None,
+    device=None,
+    transcript_cache_options=None,
+    asr_threads=None,
+):
+    """
+    force_data_idsがNoneなら変更のないデータIDをスキップし、空リストなら全て、
+    データIDのリストならそれらのデータIDを強制的に前処理し直す
+    transcript_cache_optionsはTranscriptCacheの引数で、Noneならテキスト化のキャッシュを使わない
+    asr_threadsはテキスト化に使うtorchのスレッド数で、Noneならtorchのデフォルトを使う
+    """
+    if preprocess_options is None:
+        preprocess_options = {}
+    device = set_device(device)
+    logger.info(f"デバイス：{device}")
+    set_num_threads(asr_threads)
+    os.makedirs(output_data_dir, exist_ok=True)
+    os.makedirs(os.path.join(output_data_dir, "subject_text"), exist_ok=True)
+    os.makedirs(os.path.join(output_data_dir, "counsellor_text"), exist_ok=True)
+
+    sessions = _get_sessions(input_data_dir)
+    manifest = load_manifest(output_data_dir)
+    parameters = _get_manifest_parameters(preprocess_options)
+    fingerprints = {}
+    pending_sessions = []
+    for session in sessions:
+        data_id = session[0]
+        entry = manifest["sessions"].get(data_id)
+        fingerprint = get_session_fingerprint(
+            {
+                "subject_voice": session[1],
+                "counsellor_voice": session[2],
+                "video": session[3],
+            },
+            parameters,
+            entry,
+        )
+        is_forced = force_data_ids is not None and (
+            len(force_data_ids) == 0 or data_id in force_data_ids
+        )
+        if not is_forced and is_up_to_date(entry, fingerprint):
+            logger.info(
+                f"{data_id}は入力ファイルとパラメータに変更がないためスキップします"
             )
-            raise ValueError("voice_data_idとvideo_data_idが一致しません")
-
-        data_id = voice_data_id
-        multimodal_save_dir = os.path.join(output_data_dir, data_id)
-        os.makedirs(multimodal_save_dir, exist_ok=True)
-        video_filename = os.path.splitext(os.path.basename(video_file_path))[0]
-        os.makedirs(os.path.join(output_data_dir, "counsellor_text"), exist_ok=True)
-        _preprocess(
-            video_file_path,
-            voice_file_path,
-            multimodal_save_dir,
-            os.path.join(
-                output_data_dir, "counsellor_text", f"{data_id}_{video_filename}.csv"
-            ),
-            True,
+            continue
+        fingerprints[data_id] = fingerprint
+        pending_sessions.append(session)
+        # 途中で中断した場合に前処理済みと判定されないように、前回の記録を消しておく
+        manifest["sessions"].pop(data_id, None)
+    save_manifest(output_data_dir, manifest)
+    logger.info(
+        f"{len(sessions)}個のデータのうち{len(pending_sessions)}個のデータを前処理します"
+    )
+
+    def _record_session(data_id, output_file_paths):
+        manifest["sessions"][data_id] = {
+            **fingerprints[data_id],
+            "outputs": output_file_paths,
+        }
+        save_manifest(output_data_dir, manifest)
+
+    if jobs > 1:
+        logger.info(f"{jobs}個のプロセスで並列に前処理します")
+        failed_data_ids = _preprocess_parallel(
+            pending_sessions,
+            output_data_dir,
+            jobs,
+            preprocess_options,
+            _record_session,
+            device,
+            transcript_cache_options,
+            asr_threads,
         )
+        if failed_data_ids:
+            logger.error(
+                f"{len(failed_data_ids)}個のデータの前処理に失敗しました：{failed_data_ids}"
+            )
+            raise RuntimeError("前処理に失敗したデータがあります")
+    else:
+        for session in pending_sessions:
+            output_file_paths = _preprocess_session(
+                *session, output_data_dir, preprocess_options, transcript_cache_options
+            )
+            _record_session(session[0], output_file_paths)
+    log_model_load_seconds()
     logger.info("前処理は正常に終了しました")
 
 
@@ -256,11 +1019,143 @@ if __name__ == "__main__":
         help="前処理結果を保存するディレクトリ",
     )
 
+    parser.add_argument(
+        "--use_tmp_wav",
+        action="store_true",
+        dest="use_tmp_wav",
+        help="発話ごとに一時的なWAVファイルを経由してテキスト化するか否か（従来の挙動）",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        default=1,
+        type=int,
+        help="データIDごとの前処理を並列に実行するプロセス数",
+    )
+
+    parser.add_argument(
+        "--video_fps",
+        default=VIDEO_FPS,
+        type=int,
+        help="前処理済みの動画のFPS",
+    )
+    parser.add_argument(
+        "--video_scale",
+        default=None,
+        type=str,
+        help="前処理済みの動画の解像度（ffmpegのscaleフィルタの形式、例：640:-2）",
+    )
+
+    parser.add_argument(
+        "--force",
+        nargs="*",
+        default=None,
+        metavar="DATA_ID",
+        dest="force_data_ids",
+        help="指定したデータIDを変更の有無にかかわらず前処理し直す（データIDを省略すると全て）",
+    )
+
+    parser.add_argument(
+        "--device",
+        default=None,
+        type=str,
+        help="モデルを読み込むデバイス（指定しなければCUDAが使えればcuda、そうでなければcpu）",
+    )
+
+    parser.add_argument(
+        "--asr_cache_path",
+        default=None,
+        type=str,
+        help="テキスト化の結果をキャッシュするSQLiteファイル（指定しなければ出力ディレクトリのasr_cache.sqlite3）",
+    )
+    parser.add_argument(
+        "--asr_cache_max_entries",
+        default=DEFAULT_MAX_ENTRIES,
+        type=int,
+        help="テキスト化のキャッシュに保存する最大件数",
+    )
+    parser.add_argument(
+        "--no_asr_cache",
+        action="store_true",
+        dest="no_asr_cache",
+        help="テキスト化のキャッシュを使うか否か",
+    )
+
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        dest="streaming",
+        help="音声全体を読み込まずにチャンクごとにデコードしながら前処理するか否か",
+    )
+    parser.add_argument(
+        "--stream_chunk_seconds",
+        default=STREAM_CHUNK_SECONDS,
+        type=float,
+        help="ストリーミングでデコードする際に一度に読み込む秒数",
+    )
+
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        dest="pipeline",
+        help="被験者の動画の切り抜きをテキスト化と並行して行うか否か",
+    )
+
+    parser.add_argument(
+        "--canonical_audio",
+        action="store_true",
+        dest="canonical_audio",
+        help="被験者の前処理済みの音声を16kHz・モノラル・16bitで保存し、特徴量抽出用の.npyファイルも作成するか否か",
+    )
+
+    parser.add_argument(
+        "--asr_batch_size",
+        default=ASR_BATCH_SIZE,
+        type=int,
+        help="テキスト化で長さの近い発話をまとめて一度にモデルに入力する数（1なら発話ごとにテキスト化する）",
+    )
+    parser.add_argument(
+        "--asr_threads",
+        default=None,
+        type=int,
+        help="テキスト化に使うtorchのスレッド数（並列実行時はプロセスごとのスレッド数）",
+    )
+
     args = parser.parse_args()
     input_data_dir = args.input_data_dir
     output_data_dir = args.output_data_dir
+    jobs = args.jobs
+    force_data_ids = args.force_data_ids
+    device = args.device
+    asr_threads = args.asr_threads
+    transcript_cache_options = None
+    if not args.no_asr_cache:
+        transcript_cache_options = {
+            "cache_path": args.asr_cache_path
+            or os.path.join(output_data_dir, "asr_cache.sqlite3"),
+            "max_entries": args.asr_cache_max_entries,
+        }
+    preprocess_options = {
+        "use_tmp_wav": args.use_tmp_wav,
+        "video_fps": args.video_fps,
+        "video_scale": args.video_scale,
+        "streaming": args.streaming,
+        "stream_chunk_seconds": args.stream_chunk_seconds,
+        "pipeline": args.pipeline,
+        "asr_batch_size": args.asr_batch_size,
+        "canonical_audio": args.canonical_audio,
+    }
 
     logger.info(f"入力ディレクトリ：{input_data_dir}")
     logger.info(f"出力ディレクトリ：{output_data_dir}")
     set_random_seed()  # Speech2Textモデルが常に同じ結テキスト果を返すようにシード値を設定
-    main(input_data_dir, output_data_dir)
+    main(
+        input_data_dir,
+        output_data_dir,
+        jobs,
+        preprocess_options,
+        force_data_ids,
+        device,
+        transcript_cache_options,
+        asr_threads,
+    )
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+from logzero import logger
+
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+# ハッシュ計算時に一度に読み込むバイト数
+_HASH_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+def load_manifest(output_data_dir):
+    """
+    出力ディレクトリのマニフェストを読み込む（存在しなければ空のマニフェストを返す）
+    """
+    manifest_path = os.path.join(output_data_dir, MANIFEST_FILE_NAME)
+    if not os.path.exists(manifest_path):
+        return {"version": MANIFEST_VERSION, "sessions": {}}
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        logger.warning(
+            f"{manifest_path}のバージョンが異なるため、全てのデータを前処理し直します"
+        )
+        return {"version": MANIFEST_VERSION, "sessions": {}}
+    return manifest
+
+
+def save_manifest(output_data_dir, manifest):
+    """
+    マニフェストを保存する（途中で中断しても壊れないように一時ファイルを経由する）
+    """
+    manifest_path = os.path.join(output_data_dir, MANIFEST_FILE_NAME)
+    tmp_manifest_path = f"{manifest_path}.tmp"
+    with open(tmp_manifest_path, mode="w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_manifest_path, manifest_path)
+
+
+def _get_file_hash(file_path):
+    """
+    ファイルの内容のSHA-256ハッシュを計算する
+    """
+    sha256 = hashlib.sha256()
+    with open(file_path, mode="rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def get_file_fingerprint(file_path, previous_fingerprint=None):
+    """
+    入力ファイルのサイズ・更新時刻・ハッシュを取得する
+    サイズと更新時刻が前回と同じであれば、前回のハッシュを再利用する
+    """
+    stat = os.stat(file_path)
+    fingerprint = {
+        "path": os.path.abspath(file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    if (
+        previous_fingerprint
+        and previous_fingerprint.get("size") == fingerprint["size"]
+        and previous_fingerprint.get("mtime_ns") == fingerprint["mtime_ns"]
+    ):
+        fingerprint["sha256"] = previous_fingerprint["sha256"]
+    else:
+        fingerprint["sha256"] = _get_file_hash(file_path)
+    return fingerprint
+
+
+def get_session_fingerprint(input_file_paths, parameters, previous_entry=None):
+    """
+    1つのデータIDの入力ファイルと前処理のパラメータからフィンガープリントを作成する
+    input_file_pathsは{役割: ファイルパス}の辞書
+    """
+    previous_inputs = (previous_entry or {}).get("inputs", {})
+    return {
+        "inputs": {
+            role: get_file_fingerprint(file_path, previous_inputs.get(role))
+            for role, file_path in input_file_paths.items()
+        },
+        "parameters": parameters,
+    }
+
+
+def is_up_to_date(entry, fingerprint):
+    """
+    前回の前処理結果が現在の入力ファイルとパラメータに対して最新か判定する
+    """
+    if not entry or entry.get("parameters") != fingerprint["parameters"]:
+        return False
+    previous_inputs = entry.get("inputs", {})
+    if set(previous_inputs) != set(fingerprint["inputs"]):
+        return False
+    for role, file_fingerprint in fingerprint["inputs"].items():
+        if previous_inputs[role].get("sha256") != file_fingerprint["sha256"]:
+            return False
+    # 出力ファイルが削除されていれば前処理し直す
+    return all(os.path.exists(output) for output in entry.get("outputs", []))
@@ -0,0 +1,147 @@
+import wave
+import numpy as np
+from logzero import logger
+from silence import get_mono_samples
+
+# 特徴量抽出（vggish_input）と同じresampyのフィルタ
+RESAMPLE_FILTER = "kaiser_best"
+
+
+class StreamingResampler:
+    """
+    resampyと同じ帯域制限のフィルタで、チャンクごとに入力した音声をリサンプリングする
+    出力時刻をresampyと同じく音声全体での位置から計算し、フィルタがかかる範囲の入力だけを保持するため、
+    音声全体をresampy.resampleでリサンプリングした結果とビット単位で一致する
+    """
+
+    def __init__(self, sr_orig, sr_new, filter=RESAMPLE_FILTER):
+        from resampy.filters import get_filter
+
+        if sr_orig <= 0 or sr_new <= 0:
+            logger.error(
+                f"サンプリングレートは正の値にしてください：{sr_orig}Hz, {sr_new}Hz"
+            )
+            raise ValueError(
+                f"サンプリングレートは正の値にしてください：{sr_orig}Hz, {sr_new}Hz"
+            )
+        self.sr_orig = sr_orig
+        self.sr_new = sr_new
+        sample_ratio = float(sr_new) / sr_orig
+        interp_win, self._precision, _ = get_filter(filter)
+        if sample_ratio < 1:
+            interp_win = sample_ratio * interp_win
+        self._interp_win = interp_win
+        self._interp_delta = np.diff(interp_win, append=interp_win[-1])
+        self._scale = min(1.0, sample_ratio)
+        self._time_increment = 1.0 / sample_ratio
+        # 1つの出力の左右それぞれで参照する入力のサンプル数の上限
+        self._support = len(interp_win) // int(self._scale * self._precision)
+        # 保持している入力とその先頭の音声全体での位置
+        self._buffer = np.zeros(0)
+        self._buffer_start = 0
+        self._input_count = 0
+        self._output_count = 0
+
+    def _resample(self, output_end):
+        """
+        音声全体での位置がoutput_count以上output_end未満の出力を計算し、不要になった入力を捨てる
+        """
+        from resampy.interpn import resample_f_s
+
+        # 音声全体での出力時刻から整数の入力位置を引くのは誤差なく計算できるので、
+        # 保持している入力の先頭からの時刻でもresampyと同じ重みになる
+        t_out = np.arange(self._output_count, output_end) * self._time_increment
+        t_out -= self._buffer_start
+        y = np.zeros(len(t_out))
+        if len(t_out) > 0:
+            resample_f_s(
+                self._buffer,
+                t_out,
+                self._interp_win,
+                self._interp_delta,
+                self._precision,
+                self._scale,
+                y,
+            )
+        self._output_count = output_end
+        # 次の出力の左側のフィルタが参照する入力より前は捨てる
+        next_n = int(output_end * self._time_increment)
+        drop = min(
+            max(0, next_n - self._support - self._buffer_start), len(self._buffer)
+        )
+        self._buffer = self._buffer[drop:]
+        self._buffer_start += drop
+        return y
+
+    def process(self, samples):
+        """
+        モノラルの音声を入力し、右側のフィルタがかかる範囲の入力が揃った出力を返す
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        if self.sr_orig == self.sr_new:
+            self._input_count += len(samples)
+            self._output_count += len(samples)
+            return samples
+        self._buffer = np.concatenate([self._buffer, samples])
+        self._input_count += len(samples)
+        # 出力時刻の整数部分からsupport個先までの入力が揃った出力を確定する
+        ready_until = self._input_count - self._support
+        output_end = self._output_count
+        if ready_until > 0:
+            output_end = int(np.ceil(ready_until / self._time_increment))
+            while (
+                output_end > 0
+                and int((output_end - 1) * self._time_increment) >= ready_until
+            ):
+                output_end -= 1
+            while int(output_end * self._time_increment) < ready_until:
+                output_end += 1
+            output_end = max(output_end, self._output_count)
+        return self._resample(output_end)
+
+    def finish(self):
+        """
+        残りの出力を返す（出力の数はresampyと同じく入力の数に変換比を掛けて切り捨てた数）
+        """
+        output_count = int(self._input_count * float(self.sr_new) / float(self.sr_orig))
+        if self.sr_orig == self.sr_new or output_count <= self._output_count:
+            return np.zeros(0)
+        return self._resample(output_count)
+
+
+def to_pcm16(samples):
+    """
+    [-1, 1]の浮動小数点数の音声を16bit整数に変換する（範囲外の値は切り詰める）
+    """
+    return np.clip(np.round(samples * (1 << 15)), -(1 << 15), (1 << 15) - 1).astype(
+        np.int16
+    )
+
+
+class ResampledWavWriter:
+    """
+    PCMのバイト列を順に受け取り、モノラル・16bit・指定したサンプリングレートのWAVファイルに書き込む
+    wave.Wave_writeと同じくwriteframesとcloseを持つ
+    """
+
+    def __init__(self, path, frame_rate, sample_width, channels, output_frame_rate):
+        self.sample_width = sample_width
+        self.channels = channels
+        self._resampler = StreamingResampler(frame_rate, output_frame_rate)
+        self._writer = wave.open(path, "wb")
+        self._writer.setnchannels(1)
+        self._writer.setsampwidth(2)
+        self._writer.setframerate(output_frame_rate)
+
+    def writeframes(self, data):
+        # vggish_inputと同じく、[-1, 1]に変換してからチャンネルの平均を取る
+        samples = get_mono_samples(
+            data, self.sample_width, self.channels, dtype=np.float64
+        )
+        self._writer.writeframes(to_pcm16(self._resampler.process(samples)).tobytes())
+
+    def close(self):
+        try:
+            self._writer.writeframes(to_pcm16(self._resampler.finish()).tobytes())
+        finally:
+            self._writer.close()
@@ -0,0 +1,82 @@
+import os
+import numpy as np
+from logzero import logger
+
+# 前処理済みの音声ファイル名に付けるセグメントインデックスのファイル名の接尾辞
+SEGMENT_INDEX_SUFFIX = "_segments.npy"
+
+
+def get_segment_index_path(voice_output_file_path):
+    """
+    前処理済みの音声ファイルに対応するセグメントインデックスのパスを取得する
+    """
+    return os.path.splitext(voice_output_file_path)[0] + SEGMENT_INDEX_SUFFIX
+
+
+def save_segment_index(segment_index_path, speech_segments):
+    """
+    発話区間の元の音声での開始・終了ミリ秒と、結合した音声での開始ミリ秒を保存する
+    int64のN x 3の配列（開始, 終了, 結合後の開始）として.npy形式で保存する
+    """
+    segments = np.array(speech_segments, dtype=np.int64).reshape(-1, 2)
+    lengths = segments[:, 1] - segments[:, 0]
+    offsets = np.cumsum(lengths) - lengths
+    np.save(segment_index_path, np.column_stack((segments, offsets)))
+    logger.info(f"{segment_index_path}に発話区間のインデックスを保存しました")
+
+
+class SegmentIndex:
+    """
+    元の音声の時刻と発話区間のみを結合した音声・動画の時刻を二分探索で相互に変換する
+    時刻はミリ秒で、スカラーでもNumPy配列でも渡せる（どの発話区間にも含まれない時刻は-1を返す）
+    """
+
+    def __init__(self, segment_index_path):
+        index = np.load(segment_index_path)
+        if index.ndim != 2 or index.shape[1] != 3:
+            logger.error(f"{segment_index_path}の形式が正しくありません：{index.shape}")
+            raise ValueError("セグメントインデックスの形式が正しくありません")
+        self.starts = index[:, 0]
+        self.ends = index[:, 1]
+        self.offsets = index[:, 2]
+        # 結合した音声の長さ
+        self.duration = int((self.ends - self.starts).sum())
+
+    def __len__(self):
+        return len(self.starts)
+
+    def find_segment(self, original_milli_seconds):
+        """
+        元の音声の時刻を含む発話区間の番号を取得する
+        """
+        times = np.asarray(original_milli_seconds)
+        if len(self) == 0:
+            return np.full(times.shape, -1)
+        indices = np.searchsorted(self.starts, times, side="right") - 1
+        is_inside = (indices >= 0) & (times < self.ends[np.maximum(indices, 0)])
+        return np.where(is_inside, indices, -1)
+
+    def to_concatenated(self, original_milli_seconds):
+        """
+        元の音声の時刻を結合した音声の時刻に変換する
+        """
+        times = np.asarray(original_milli_seconds)
+        if len(self) == 0:
+            return np.full(times.shape, -1)
+        indices = self.find_segment(times)
+        safe_indices = np.maximum(indices, 0)
+        concatenated = self.offsets[safe_indices] + times - self.starts[safe_indices]
+        return np.where(indices >= 0, concatenated, -1)
+
+    def to_original(self, concatenated_milli_seconds):
+        """
+        結合した音声の時刻を元の音声の時刻に変換する
+        """
+        times = np.asarray(concatenated_milli_seconds)
+        if len(self) == 0:
+            return np.full(times.shape, -1)
+        indices = np.searchsorted(self.offsets, times, side="right") - 1
+        safe_indices = np.maximum(indices, 0)
+        original = self.starts[safe_indices] + times - self.offsets[safe_indices]
+        is_inside = (indices >= 0) & (times < self.duration)
+        return np.where(is_inside, original, -1)
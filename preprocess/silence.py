@@ -0,0 +1,344 @@
+from collections import namedtuple
+import numpy as np
+
+# 前処理で発話区間を求める際の無音判定のパラメータ
+# MIN_SILENCE_LENミリ秒以上、SILENCE_THRESH dBFS以下が続く区間を無音とみなし、
+# IGNORE_SEGMENTS_MILLI_SECONDSミリ秒未満の発話区間は無視する
+MIN_SILENCE_LEN = 500
+SILENCE_THRESH = -50
+IGNORE_SEGMENTS_MILLI_SECONDS = 1000
+
+# 1ミリ秒ごとのエネルギーを計算する際に一度に処理するミリ秒数（メモリ使用量を抑えるため）
+_CHUNK_MILLI_SECONDS = 60 * 1000
+
+# ミリ秒単位の音声エネルギー
+# - cumsum: 先頭から各ミリ秒境界までの二乗和の累積（長さはseg_len + 1）
+# - boundaries: 各ミリ秒境界に対応するフレーム位置（pydubのスライスと同じ計算方法）
+MsEnergy = namedtuple(
+    "MsEnergy",
+    ["cumsum", "boundaries", "channels", "seg_len", "max_possible_amplitude"],
+)
+
+
+def get_samples(raw_data, sample_width):
+    """
+    PCMのバイト列を整数のNumPy配列に変換する（audioopと同じく符号付きとして扱う）
+    """
+    if sample_width == 1:
+        return np.frombuffer(raw_data, dtype=np.int8)
+    if sample_width == 2:
+        return np.frombuffer(raw_data, dtype=np.int16)
+    if sample_width == 4:
+        return np.frombuffer(raw_data, dtype=np.int32)
+    if sample_width == 3:
+        data = np.frombuffer(raw_data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = data[:, 0] | (data[:, 1] << 8) | (data[:, 2] << 16)
+        # 24bitの符号を拡張する
+        return np.where(samples & 0x800000, samples - (1 << 24), samples)
+    raise ValueError(f"サポートしていないサンプル幅です：{sample_width}")
+
+
+def get_mono_samples(raw_data, sample_width, channels, dtype=np.float32):
+    """
+    PCMのバイト列をモノラルの[-1, 1]の浮動小数点数の配列に変換する
+    librosa.load（soundfileで読み込んでからチャンネルの平均を取る）と同じ順に計算する
+    """
+    samples = get_samples(raw_data, sample_width).astype(dtype)
+    samples /= 1 << (8 * sample_width - 1)
+    return samples.reshape(-1, channels).mean(axis=1, dtype=dtype)
+
+
+def _get_boundaries(milli_seconds, frame_rate):
+    """
+    pydubのAudioSegment[start:end]と同じ方法でミリ秒をフレーム位置に変換する
+    """
+    return (milli_seconds * (frame_rate / 1000.0)).astype(np.int64)
+
+
+def _get_ms_sums(squares, offsets):
+    """
+    二乗したサンプルをoffsetsで区切ったミリ秒ごとに合計する
+    offsetsは各ミリ秒の開始位置と最後のミリ秒の終了位置（長さはミリ秒数 + 1）
+    """
+    # 末尾の空区間でreduceatが誤った値を返さないように番兵を付ける
+    squares = np.append(squares, 0)
+    ms_sums = np.add.reduceat(squares, offsets[:-1])
+    ms_sums[offsets[1:] == offsets[:-1]] = 0
+    return ms_sums
+
+
+def get_ms_energy(audio):
+    """
+    AudioSegmentから1ミリ秒ごとの二乗和の累積を計算する
+    """
+    channels = audio.channels
+    frame_rate = audio.frame_rate
+    samples = get_samples(audio.raw_data, audio.sample_width)
+    frame_count = len(samples) // channels
+    seg_len = len(audio)
+    boundaries = _get_boundaries(np.arange(seg_len + 1), frame_rate)
+    clipped = np.minimum(boundaries, frame_count) * channels
+    # 16bit以下なら二乗和を整数のまま正確に計算できる
+    dtype = np.int64 if audio.sample_width <= 2 else np.float64
+
+    ms_sums = np.empty(seg_len, dtype=dtype)
+    for chunk_start in range(0, seg_len, _CHUNK_MILLI_SECONDS):
+        chunk_end = min(chunk_start + _CHUNK_MILLI_SECONDS, seg_len)
+        offset = clipped[chunk_start]
+        chunk = samples[offset : clipped[chunk_end]].astype(dtype)
+        ms_sums[chunk_start:chunk_end] = _get_ms_sums(
+            chunk * chunk, clipped[chunk_start : chunk_end + 1] - offset
+        )
+
+    cumsum = np.zeros(seg_len + 1, dtype=dtype)
+    np.cumsum(ms_sums, out=cumsum[1:])
+    return MsEnergy(cumsum, boundaries, channels, seg_len, audio.max_possible_amplitude)
+
+
+def get_window_rms(energy, min_silence_len, seek_step=1):
+    """
+    min_silence_lenミリ秒の窓ごとのRMSと窓の開始ミリ秒を計算する
+    """
+    last_slice_start = energy.seg_len - min_silence_len
+    starts = np.arange(0, last_slice_start + 1, seek_step)
+    if last_slice_start % seek_step:
+        starts = np.append(starts, last_slice_start)
+    ends = starts + min_silence_len
+    sum_squares = energy.cumsum[ends] - energy.cumsum[starts]
+    # 音声の末尾を超える部分は無音として窓の長さに含める（pydubと同じ）
+    sample_counts = (
+        energy.boundaries[ends] - energy.boundaries[starts]
+    ) * energy.channels
+    rms = np.zeros(len(starts), dtype=np.float64)
+    nonzero = sample_counts > 0
+    rms[nonzero] = np.sqrt(sum_squares[nonzero] / sample_counts[nonzero])
+    # audioop.rmsは整数を返すので切り捨てる
+    return starts, np.floor(rms)
+
+
+def _get_silence_thresh(max_possible_amplitude, silence_thresh):
+    """
+    dBFSで指定された閾値を振幅に変換する
+    """
+    return (10 ** (silence_thresh / 20)) * max_possible_amplitude
+
+
+def get_silent_ranges(starts, is_silent, min_silence_len, seek_step=1):
+    """
+    無音と判定された窓を連結して無音区間の配列（N x 2）を得る
+    """
+    silence_starts = starts[is_silent]
+    if len(silence_starts) == 0:
+        return np.empty((0, 2), dtype=np.int64)
+    diffs = np.diff(silence_starts)
+    # 窓が連続しておらず、かつmin_silence_lenより離れている位置で区間を分ける
+    breaks = np.flatnonzero((diffs != seek_step) & (diffs > min_silence_len))
+    range_starts = silence_starts[np.concatenate(([0], breaks + 1))]
+    range_ends = silence_starts[np.concatenate((breaks, [len(silence_starts) - 1]))]
+    return np.stack((range_starts, range_ends + min_silence_len), axis=1)
+
+
+def get_nonsilent_ranges(silent_ranges, seg_len):
+    """
+    無音区間の配列から音のある区間のリストを得る
+    """
+    if len(silent_ranges) == 0:
+        return [[0, seg_len]]
+    if silent_ranges[0][0] == 0 and silent_ranges[0][1] == seg_len:
+        return []
+    starts = np.concatenate(([0], silent_ranges[:, 1]))
+    ends = np.concatenate((silent_ranges[:, 0], [seg_len]))
+    if silent_ranges[-1][1] == seg_len:
+        starts, ends = starts[:-1], ends[:-1]
+    nonsilent_ranges = [[int(start), int(end)] for start, end in zip(starts, ends)]
+    if nonsilent_ranges[0] == [0, 0]:
+        nonsilent_ranges.pop(0)
+    return nonsilent_ranges
+
+
+def detect_nonsilent_from_energy(
+    energy, min_silence_len=1000, silence_thresh=-16, seek_step=1
+):
+    """
+    計算済みのエネルギーから音のある区間を取得する
+    """
+    if energy.seg_len < min_silence_len:
+        return [[0, energy.seg_len]]
+    starts, rms = get_window_rms(energy, min_silence_len, seek_step)
+    is_silent = rms <= _get_silence_thresh(
+        energy.max_possible_amplitude, silence_thresh
+    )
+    silent_ranges = get_silent_ranges(starts, is_silent, min_silence_len, seek_step)
+    return get_nonsilent_ranges(silent_ranges, energy.seg_len)
+
+
+def detect_nonsilent(audio, min_silence_len=1000, silence_thresh=-16, seek_step=1):
+    """
+    pydub.silence.detect_nonsilentと同じ結果をNumPyで高速に計算する
+    """
+    return detect_nonsilent_from_energy(
+        get_ms_energy(audio), min_silence_len, silence_thresh, seek_step
+    )
+
+
+class StreamingNonsilentDetector:
+    """
+    チャンクごとに与えたPCMから、detect_nonsilentと同じ音のある区間を確定した順に求める
+    音声全体を保持しないため、メモリ使用量は音声の長さによらない（seek_stepは1のみ対応）
+    """
+
+    def __init__(
+        self,
+        frame_rate,
+        channels,
+        sample_width,
+        min_silence_len=1000,
+        silence_thresh=-16,
+    ):
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.min_silence_len = min_silence_len
+        # 16bit以下なら二乗和を整数のまま正確に計算できる
+        self.dtype = np.int64 if sample_width <= 2 else np.float64
+        self.silence_thresh = _get_silence_thresh(
+            (1 << (8 * sample_width)) / 2, silence_thresh
+        )
+        self.frame_count = 0
+        # 1ミリ秒に満たず、まだ二乗和を計算していない末尾のサンプル
+        self.tail = np.empty(0, dtype=self.dtype)
+        # まだ窓の計算に使うミリ秒ごとの二乗和（ms_sums_startミリ秒目から）
+        self.ms_sums = np.empty(0, dtype=self.dtype)
+        self.ms_sums_start = 0
+        # 最後に無音と判定された窓の開始ミリ秒
+        self.prev_silence_start = None
+
+    def _get_tail_start_frame(self):
+        """
+        まだ二乗和を計算していないサンプルの先頭のフレーム位置
+        """
+        return self.frame_count - len(self.tail) // self.channels
+
+    def _add_ms_sums(self, ms_end, frame_end):
+        """
+        ms_endミリ秒目までの二乗和を計算する（frame_end以降のフレームは無音として扱う）
+        """
+        ms_start = self.ms_sums_start + len(self.ms_sums)
+        if ms_end <= ms_start:
+            return
+        tail_start_frame = self._get_tail_start_frame()
+        boundaries = _get_boundaries(np.arange(ms_start, ms_end + 1), self.frame_rate)
+        offsets = (np.minimum(boundaries, frame_end) - tail_start_frame) * self.channels
+        ms_sums = _get_ms_sums(self.tail[: offsets[-1]] ** 2, offsets)
+        self.tail = self.tail[offsets[-1] :]
+        self.ms_sums = np.concatenate((self.ms_sums, ms_sums))
+
+    def _get_nonsilent_ranges(self, last_window_start):
+        """
+        last_window_startミリ秒目までの窓を判定し、確定した音のある区間を返す
+        """
+        window_count = last_window_start - self.ms_sums_start + 1
+        if window_count <= 0:
+            return []
+        starts = np.arange(self.ms_sums_start, last_window_start + 1)
+        ends = starts + self.min_silence_len
+        cumsum = np.zeros(len(self.ms_sums) + 1, dtype=self.dtype)
+        np.cumsum(self.ms_sums, out=cumsum[1:])
+        sum_squares = cumsum[ends - self.ms_sums_start] - cumsum[: len(starts)]
+        sample_counts = (
+            _get_boundaries(ends, self.frame_rate)
+            - _get_boundaries(starts, self.frame_rate)
+        ) * self.channels
+        rms = np.zeros(len(starts), dtype=np.float64)
+        nonzero = sample_counts > 0
+        rms[nonzero] = np.sqrt(sum_squares[nonzero] / sample_counts[nonzero])
+        silence_starts = starts[np.floor(rms) <= self.silence_thresh]
+        # 判定が済んだ窓の二乗和は不要なので捨てる
+        self.ms_sums = self.ms_sums[window_count:]
+        self.ms_sums_start += window_count
+
+        nonsilent_ranges = []
+        if len(silence_starts) == 0:
+            return nonsilent_ranges
+        if self.prev_silence_start is None:
+            # 最初の無音区間より前は音のある区間
+            if silence_starts[0] > 0:
+                nonsilent_ranges.append([0, int(silence_starts[0])])
+            self.prev_silence_start = int(silence_starts[0])
+        silence_starts = np.concatenate(([self.prev_silence_start], silence_starts))
+        # 窓が連続しておらず、かつmin_silence_lenより離れている位置で無音区間が分かれる
+        for i in np.flatnonzero(np.diff(silence_starts) > self.min_silence_len):
+            nonsilent_ranges.append(
+                [
+                    int(silence_starts[i]) + self.min_silence_len,
+                    int(silence_starts[i + 1]),
+                ]
+            )
+        self.prev_silence_start = int(silence_starts[-1])
+        return nonsilent_ranges
+
+    def get_pending_start(self):
+        """
+        まだ確定していない音のある区間が始まりうる最初のミリ秒
+        これより前の音声は以降の区間には含まれないので捨ててよい
+        """
+        if self.prev_silence_start is None:
+            return 0
+        return self.prev_silence_start + self.min_silence_len
+
+    def feed(self, samples):
+        """
+        PCMのチャンク（インターリーブされた整数の配列）を与え、確定した音のある区間を返す
+        """
+        self.tail = np.concatenate((self.tail, samples.astype(self.dtype)))
+        self.frame_count += len(samples) // self.channels
+        # 全てのフレームが揃っているミリ秒まで二乗和を計算する
+        ms_end = int(self.frame_count * 1000 / self.frame_rate) + 1
+        while (
+            _get_boundaries(np.array([ms_end]), self.frame_rate)[0] > self.frame_count
+        ):
+            ms_end -= 1
+        self._add_ms_sums(ms_end, self.frame_count)
+        return self._get_nonsilent_ranges(ms_end - self.min_silence_len)
+
+    def finish(self):
+        """
+        音声の終わりを伝え、残りの音のある区間を返す
+        """
+        seg_len = round(1000 * (self.frame_count / self.frame_rate))
+        if seg_len < self.min_silence_len:
+            return [[0, seg_len]]
+        self._add_ms_sums(seg_len, self.frame_count)
+        nonsilent_ranges = self._get_nonsilent_ranges(seg_len - self.min_silence_len)
+        if self.prev_silence_start is None:
+            return nonsilent_ranges + [[0, seg_len]]
+        last_silence_end = self.prev_silence_start + self.min_silence_len
+        if last_silence_end != seg_len:
+            nonsilent_ranges.append([last_silence_end, seg_len])
+        return nonsilent_ranges
+
+
+def sweep_nonsilent(energy, min_silence_lens, silence_threshs, seek_step=1):
+    """
+    計算済みのエネルギーから、min_silence_lenとsilence_threshの全ての組み合わせの音のある区間を求める
+    窓ごとのRMSはmin_silence_lenごとに一度だけ計算し、閾値の判定はまとめて行う
+    (min_silence_len, silence_thresh, 音のある区間の配列（N x 2）)を順に返す
+    """
+    silence_threshs = list(silence_threshs)
+    for min_silence_len in min_silence_lens:
+        if energy.seg_len < min_silence_len:
+            for silence_thresh in silence_threshs:
+                yield min_silence_len, silence_thresh, np.array([[0, energy.seg_len]])
+            continue
+        starts, rms = get_window_rms(energy, min_silence_len, seek_step)
+        thresh_amplitudes = _get_silence_thresh(
+            energy.max_possible_amplitude, np.array(silence_threshs, dtype=np.float64)
+        )
+        is_silent = rms[np.newaxis, :] <= thresh_amplitudes[:, np.newaxis]
+        for silence_thresh, is_silent_row in zip(silence_threshs, is_silent):
+            silent_ranges = get_silent_ranges(
+                starts, is_silent_row, min_silence_len, seek_step
+            )
+            nonsilent_ranges = get_nonsilent_ranges(silent_ranges, energy.seg_len)
+            yield min_silence_len, silence_thresh, np.array(
+                nonsilent_ranges, dtype=np.int64
+            ).reshape(-1, 2)
@@ -0,0 +1,200 @@
+import os
+import csv
+import argparse
+import itertools
+import time
+import numpy as np
+from pydub import AudioSegment
+from pydub.silence import detect_nonsilent as pydub_detect_nonsilent
+from logzero import logger
+from silence import detect_nonsilent, get_samples, StreamingNonsilentDetector
+
+# 比較する音声の形式とパラメータ
+SAMPLE_RATES = [8000, 16000, 44100, 48000]
+CHANNELS = [1, 2]
+SAMPLE_WIDTHS = [1, 2, 3, 4]
+SEEK_STEPS = [1, 7, 10]
+MIN_SILENCE_LEN = 300
+SILENCE_THRESH = -40
+# 合成する音声の種類（短い音声はmin_silence_lenより短く、空の音声は長さ0）
+SIGNALS = ["bursts", "all_silent", "all_loud", "short", "empty"]
+
+
+def _make_samples(signal, seconds, frame_rate, channels, sample_width, rng):
+    """
+    比較用の合成音声を整数のサンプル（チャンネルごとに並べたもの）として作成する
+    burstsはランダムな長さの雑音と無音を交互に並べ、閾値付近の大きさの雑音も含める
+    """
+    max_amplitude = (1 << (8 * sample_width - 1)) - 1
+    if signal == "empty":
+        frame_count = 0
+    elif signal == "short":
+        frame_count = int(MIN_SILENCE_LEN / 2 * frame_rate / 1000)
+    else:
+        frame_count = int(seconds * frame_rate)
+    if signal == "all_silent":
+        levels = np.zeros(frame_count)
+    elif signal in ("all_loud", "short"):
+        levels = np.full(frame_count, 0.5)
+    else:
+        levels = np.zeros(frame_count)
+        position = 0
+        while position < frame_count:
+            length = int(rng.uniform(0.05, 0.8) * frame_rate)
+            # 無音・閾値付近・大きな音をランダムに選ぶ
+            levels[position : position + length] = rng.choice(
+                [0.0, 10 ** (SILENCE_THRESH / 20), 0.5]
+            )
+            position += length
+    noise = rng.uniform(-1, 1, size=(frame_count, channels))
+    return np.round(levels[:, np.newaxis] * noise * max_amplitude).astype(np.int64)
+
+
+def _to_pcm(samples, sample_width):
+    """
+    整数のサンプルを符号付きのリトルエンディアンのPCMのバイト列にする（audioopと同じく8bitも符号付き）
+    """
+    little_endian = samples.astype("<i4").reshape(-1, 1).view(np.uint8)
+    return little_endian[:, :sample_width].tobytes()
+
+
+def _detect_streaming(data, frame_rate, channels, sample_width, rng):
+    """
+    StreamingNonsilentDetectorにランダムな長さのチャンクで音声を与える
+    """
+    detector = StreamingNonsilentDetector(
+        frame_rate, channels, sample_width, MIN_SILENCE_LEN, SILENCE_THRESH
+    )
+    frame_width = sample_width * channels
+    nonsilent_ranges = []
+    position = 0
+    while position < len(data):
+        frames = int(rng.integers(1, frame_rate))
+        chunk = data[position : position + frames * frame_width]
+        nonsilent_ranges += detector.feed(get_samples(chunk, sample_width))
+        position += frames * frame_width
+    nonsilent_ranges += detector.finish()
+    return nonsilent_ranges
+
+
+def _to_list(nonsilent_ranges):
+    return [[int(start), int(end)] for start, end in nonsilent_ranges]
+
+
+def main(output_path, seconds=3, seed=0):
+    """
+    合成音声で、silence.pyのdetect_nonsilentとStreamingNonsilentDetector（seek_stepが1のときのみ）の結果が
+    pydub.silence.detect_nonsilentと一致するかをサンプリングレート・チャンネル数・サンプル幅・seek_stepごとに確認する
+    """
+    rng = np.random.default_rng(seed)
+    columns = [
+        "signal",
+        "sample_rate",
+        "channels",
+        "sample_width",
+        "seek_step",
+        "segments",
+        "match",
+        "streaming_match",
+        "pydub_seconds",
+        "numpy_seconds",
+    ]
+    mismatch_count = 0
+    case_count = 0
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, mode="w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for signal, frame_rate, channels, sample_width in itertools.product(
+            SIGNALS, SAMPLE_RATES, CHANNELS, SAMPLE_WIDTHS
+        ):
+            # pydubは空の24bitの音声を作成できない
+            if signal == "empty" and sample_width == 3:
+                continue
+            samples = _make_samples(
+                signal, seconds, frame_rate, channels, sample_width, rng
+            )
+            data = _to_pcm(samples, sample_width)
+            # 24bitの音声はpydubが32bitに変換するので、ストリーミングには元の24bitのまま与える
+            audio = AudioSegment(
+                data=data,
+                sample_width=sample_width,
+                frame_rate=frame_rate,
+                channels=channels,
+            )
+            for seek_step in SEEK_STEPS:
+                start = time.perf_counter()
+                expected = _to_list(
+                    pydub_detect_nonsilent(
+                        audio, MIN_SILENCE_LEN, SILENCE_THRESH, seek_step
+                    )
+                )
+                pydub_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                actual = _to_list(
+                    detect_nonsilent(audio, MIN_SILENCE_LEN, SILENCE_THRESH, seek_step)
+                )
+                numpy_seconds = time.perf_counter() - start
+                match = actual == expected
+                # ストリーミングはseek_stepが1のときのみ対応している
+                streaming_match = ""
+                if seek_step == 1:
+                    streaming = _detect_streaming(
+                        data, frame_rate, channels, sample_width, rng
+                    )
+                    streaming_match = _to_list(streaming) == expected
+                if not match or streaming_match is False:
+                    mismatch_count += 1
+                    logger.warning(
+                        f"{signal}（{frame_rate}Hz・{channels}ch・{sample_width * 8}bit・seek_step={seek_step}）で"
+                        f"pydubと一致しませんでした：{actual}, {expected}"
+                    )
+                writer.writerow(
+                    {
+                        "signal": signal,
+                        "sample_rate": frame_rate,
+                        "channels": channels,
+                        "sample_width": sample_width,
+                        "seek_step": seek_step,
+                        "segments": len(expected),
+                        "match": match,
+                        "streaming_match": streaming_match,
+                        "pydub_seconds": pydub_seconds,
+                        "numpy_seconds": numpy_seconds,
+                    }
+                )
+                case_count += 1
+
+    logger.info(
+        f"{case_count}通りのうち、pydubと一致しなかったもの：{mismatch_count}通り"
+    )
+    logger.info(f"結果を{output_path}に保存しました")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--output_path",
+        help="音声の形式・パラメータごとの比較結果を保存するCSVファイル",
+        type=str,
+        default="../data/preprocessed/silence_parity.csv",
+    )
+    parser.add_argument(
+        "--seconds",
+        default=3,
+        type=float,
+        help="比較に使う合成音声の長さ（秒）",
+    )
+    parser.add_argument(
+        "--seed",
+        default=0,
+        type=int,
+        help="合成音声とストリーミングでのチャンクの長さを決める乱数のシード値",
+    )
+
+    args = parser.parse_args()
+    output_path = args.output_path
+    seconds = args.seconds
+    seed = args.seed
+
+    main(output_path, seconds, seed)
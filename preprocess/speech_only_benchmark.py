@@ -0,0 +1,139 @@
+import os
+import csv
+import argparse
+import time
+import numpy as np
+from pydub import AudioSegment
+from logzero import logger
+from main import _get_speech_only_audio
+
+# 合成する発話区間の長さ（秒）の範囲と発話区間の間の無音の長さ（秒）の範囲
+SEGMENT_SECONDS = (1, 4)
+GAP_SECONDS = (0.5, 2)
+
+
+def _make_synthetic_audio(minutes, frame_rate, channels, seed=0):
+    """
+    ベンチマーク用の16bitの雑音の音声と、ランダムな長さの発話区間（ミリ秒）を作成する
+    """
+    rng = np.random.default_rng(seed)
+    frame_count = int(minutes * 60 * frame_rate)
+    samples = rng.integers(-3000, 3000, size=frame_count * channels, dtype=np.int16)
+    audio = AudioSegment(
+        data=samples.tobytes(), sample_width=2, frame_rate=frame_rate, channels=channels
+    )
+    speech_segments = []
+    position = 0
+    while True:
+        start = position + int(rng.uniform(*GAP_SECONDS) * 1000)
+        end = start + int(rng.uniform(*SEGMENT_SECONDS) * 1000)
+        if end > len(audio):
+            break
+        speech_segments.append((start, end))
+        position = end
+    return audio, speech_segments
+
+
+def _get_speech_only_audio_by_sum(audio, speech_segments):
+    """
+    以前の方法：発話区間ごとにAudioSegmentを+=で連結する（毎回全体がコピーされる）
+    """
+    subject_voice_sum = AudioSegment.empty()
+    for start, end in speech_segments:
+        subject_voice_sum += audio[start:end]
+    return subject_voice_sum
+
+
+def main(output_path, minutes=60, frame_rate=48000, channels=1, seed=0):
+    """
+    合成音声から発話区間のみの音声を作成する時間を、以前の+=での連結と現在のバイト列の一括の連結で比較する
+    """
+    audio, speech_segments = _make_synthetic_audio(minutes, frame_rate, channels, seed)
+    logger.info(
+        f"{minutes}分の合成音声（{frame_rate}Hz・{channels}ch・16bit）の{len(speech_segments)}個の発話区間を連結します"
+    )
+
+    start = time.perf_counter()
+    joined_audio = _get_speech_only_audio(audio, speech_segments)
+    join_seconds = time.perf_counter() - start
+    logger.info(f"バイト列の一括の連結：{join_seconds:.2f}秒")
+    start = time.perf_counter()
+    summed_audio = _get_speech_only_audio_by_sum(audio, speech_segments)
+    sum_seconds = time.perf_counter() - start
+    logger.info(f"+=での連結：{sum_seconds:.2f}秒")
+    is_identical = joined_audio.raw_data == summed_audio.raw_data
+    if not is_identical:
+        logger.warning("2つの方法で作成した音声が一致しませんでした")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, mode="w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "minutes",
+                "frame_rate",
+                "channels",
+                "segments",
+                "sum_seconds",
+                "join_seconds",
+                "identical",
+            ]
+        )
+        writer.writerow(
+            [
+                minutes,
+                frame_rate,
+                channels,
+                len(speech_segments),
+                sum_seconds,
+                join_seconds,
+                is_identical,
+            ]
+        )
+    logger.info(
+        f"{sum_seconds / max(join_seconds, 1e-9):.0f}倍速、出力の一致：{is_identical}"
+    )
+    logger.info(f"結果を{output_path}に保存しました")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--output_path",
+        help="ベンチマークの結果を保存するCSVファイル",
+        type=str,
+        default="../data/preprocessed/speech_only_benchmark.csv",
+    )
+    parser.add_argument(
+        "--minutes",
+        default=60,
+        type=float,
+        help="合成音声の長さ（分）",
+    )
+    parser.add_argument(
+        "--frame_rate",
+        default=48000,
+        type=int,
+        help="合成音声のサンプリングレート",
+    )
+    parser.add_argument(
+        "--channels",
+        default=1,
+        type=int,
+        help="合成音声のチャンネル数",
+    )
+    parser.add_argument(
+        "--seed",
+        default=0,
+        type=int,
+        help="合成音声と発話区間を決める乱数のシード値",
+    )
+
+    args = parser.parse_args()
+    output_path = args.output_path
+    minutes = args.minutes
+    frame_rate = args.frame_rate
+    channels = args.channels
+    seed = args.seed
+
+    main(output_path, minutes, frame_rate, channels, seed)
@@ -0,0 +1,70 @@
+import subprocess
+from logzero import logger
+from pydub import AudioSegment
+from pydub.utils import mediainfo_json
+
+# ffmpegで出力するPCMの形式（サンプル幅ごと）
+_PCM_FORMATS = {2: "s16le", 3: "s24le", 4: "s32le"}
+# AudioSegment.from_fileと同じく、fltpと報告されても16bitでデコードするコーデック
+_FLTP_16BIT_CODECS = ["mp3", "mp4", "aac", "webm", "ogg"]
+
+
+def get_audio_stream_info(voice_file_path):
+    """
+    音声ファイルのサンプリングレート・チャンネル数・サンプル幅を取得する
+    サンプル幅はAudioSegment.from_fileでデコードした場合と同じになるようにする
+    """
+    info = mediainfo_json(voice_file_path)
+    audio_streams = [x for x in info["streams"] if x["codec_type"] == "audio"]
+    if len(audio_streams) == 0:
+        logger.error(f"{voice_file_path}に音声ストリームがありません")
+        raise ValueError("音声ストリームがありません")
+    audio_stream = audio_streams[0]
+    # AudioSegment.from_fileと同じく、ffprobeがfltp（32bit）と報告するAACなどは16bitとする
+    if (
+        audio_stream.get("sample_fmt") == "fltp"
+        and audio_stream.get("codec_name") in _FLTP_16BIT_CODECS
+    ):
+        sample_width = 2
+    else:
+        sample_width = audio_stream.get("bits_per_sample", 16) // 8
+    if sample_width not in _PCM_FORMATS:
+        sample_width = 2
+    return int(audio_stream["sample_rate"]), int(audio_stream["channels"]), sample_width
+
+
+def iter_pcm_chunks(voice_file_path, sample_width, channels, chunk_frames):
+    """
+    ffmpegで音声ファイルをデコードし、chunk_framesフレームごとのPCM（バイト列）を順に返す
+    音声全体をメモリに読み込まないので、長い音声でもメモリ使用量は一定になる
+    """
+    pcm_format = _PCM_FORMATS[sample_width]
+    command = [
+        AudioSegment.converter,
+        "-loglevel",
+        "error",
+        "-i",
+        voice_file_path,
+        "-vn",
+        "-acodec",
+        f"pcm_{pcm_format}",
+        "-f",
+        pcm_format,
+        "-",
+    ]
+    chunk_bytes = chunk_frames * sample_width * channels
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            yield data
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read().decode(errors="replace")
+        process.stderr.close()
+        returncode = process.wait()
+    if returncode != 0:
+        logger.error(f"{voice_file_path}のデコードに失敗しました：{stderr}")
+        raise RuntimeError("音声のデコードに失敗しました")
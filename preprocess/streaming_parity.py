@@ -0,0 +1,294 @@
+import os
+import csv
+import argparse
+import subprocess
+import tempfile
+import imageio_ffmpeg
+from pydub import AudioSegment
+from logzero import logger
+from main import (
+    STREAM_CHUNK_SECONDS,
+    _get_asr_model_id,
+    _get_speech_segments,
+    _get_voice_text,
+    _get_voice_text_streaming,
+    _iter_streaming_utterances,
+    _open_voice_writer,
+    _save_voice,
+)
+from streaming import get_audio_stream_info
+from transcript_cache import get_transcript_key
+from utils import get_subject_voice_files
+
+# 合成するAAC（m4a）の音声のサンプリングレートとチャンネル数
+# ffprobeはAACをfltp（32bit）と報告するが、AudioSegment.from_fileは16bitでデコードする
+SYNTHETIC_FORMATS = [(48000, 1), (44100, 2)]
+SYNTHETIC_SECONDS = 60
+# 合成音声で発話と無音を切り替える周期と、そのうち発話の秒数
+_SYNTHETIC_PERIOD_SECONDS = 7
+_SYNTHETIC_SPEECH_SECONDS = 3
+
+
+def _make_synthetic_aac(output_path, frame_rate, channels):
+    """
+    正弦波と雑音を一定の周期で発話・無音（-60dB）に切り替えた合成音声をAACで保存する
+    """
+    layout = "mono" if channels == 1 else "stereo"
+    command = [
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        "-y",
+        "-loglevel",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        f"sine=frequency=300:sample_rate={frame_rate}:duration={SYNTHETIC_SECONDS}",
+        "-f",
+        "lavfi",
+        "-i",
+        f"anoisesrc=color=pink:amplitude=0.3:sample_rate={frame_rate}:duration={SYNTHETIC_SECONDS}",
+        "-filter_complex",
+        "[0][1]amix=inputs=2,"
+        f"volume='if(lt(mod(t,{_SYNTHETIC_PERIOD_SECONDS}),{_SYNTHETIC_SPEECH_SECONDS}),1,0.001)':eval=frame,"
+        f"aformat=channel_layouts={layout}[a]",
+        "-map",
+        "[a]",
+        "-c:a",
+        "aac",
+        output_path,
+    ]
+    subprocess.run(command, check=True)
+
+
+def _read_file(file_path):
+    with open(file_path, mode="rb") as f:
+        return f.read()
+
+
+def _run_in_memory(voice_file_path, tmp_dir, asr_model_id):
+    """
+    音声全体を読み込む前処理と同じ方法で、発話区間・前処理済みの音声・キャッシュのキーを作成する
+    """
+    audio = AudioSegment.from_file(voice_file_path)
+    speech_segments = _get_speech_segments(audio)
+    wav_paths = []
+    for canonical_audio in [False, True]:
+        wav_path = os.path.join(tmp_dir, f"memory_{canonical_audio}.wav")
+        _save_voice(audio, speech_segments, wav_path, canonical_audio)
+        wav_paths.append(wav_path)
+    keys = [
+        get_transcript_key(audio[start:end], asr_model_id)
+        for start, end in speech_segments
+    ]
+    return audio.sample_width, speech_segments, wav_paths, keys
+
+
+def _run_streaming(voice_file_path, tmp_dir, asr_model_id, stream_chunk_seconds):
+    """
+    --streamingの前処理と同じ方法で、発話区間・前処理済みの音声・キャッシュのキーを作成する
+    """
+    frame_rate, channels, sample_width = get_audio_stream_info(voice_file_path)
+    wav_paths = []
+    voice_writers = []
+    for canonical_audio in [False, True]:
+        wav_path = os.path.join(tmp_dir, f"streaming_{canonical_audio}.wav")
+        wav_paths.append(wav_path)
+        voice_writers.append(
+            _open_voice_writer(
+                wav_path, frame_rate, sample_width, channels, canonical_audio
+            )
+        )
+    speech_segments = []
+    keys = []
+    try:
+        for utterances in _iter_streaming_utterances(
+            voice_file_path, frame_rate, channels, sample_width, stream_chunk_seconds
+        ):
+            for utterance, start, end in utterances:
+                speech_segments.append((start, end))
+                keys.append(get_transcript_key(utterance, asr_model_id))
+                for voice_writer in voice_writers:
+                    voice_writer.writeframes(utterance.raw_data)
+    finally:
+        for voice_writer in voice_writers:
+            voice_writer.close()
+    return sample_width, speech_segments, wav_paths, keys
+
+
+def _compare_transcripts(voice_file_path, tmp_dir, stream_chunk_seconds):
+    """
+    音声全体を読み込む場合と--streamingの場合のテキスト化の結果（CSV）が一致するかを確認する
+    """
+    audio = AudioSegment.from_file(voice_file_path)
+    memory_text_path = os.path.join(tmp_dir, "memory.csv")
+    streaming_text_path = os.path.join(tmp_dir, "streaming.csv")
+    _get_voice_text([(audio, _get_speech_segments(audio), memory_text_path)])
+    _get_voice_text_streaming(
+        voice_file_path,
+        os.path.join(tmp_dir, "streaming_transcribed.wav"),
+        streaming_text_path,
+        stream_chunk_seconds=stream_chunk_seconds,
+    )
+    return _read_file(memory_text_path) == _read_file(streaming_text_path)
+
+
+def _compare(voice_file_path, tmp_dir, stream_chunk_seconds, with_transcript):
+    """
+    1つの音声について、音声全体を読み込む前処理と--streamingの前処理の出力を比較する
+    """
+    asr_model_id = _get_asr_model_id("array", 1)
+    (
+        memory_sample_width,
+        memory_segments,
+        memory_wav_paths,
+        memory_keys,
+    ) = _run_in_memory(voice_file_path, tmp_dir, asr_model_id)
+    (
+        streaming_sample_width,
+        streaming_segments,
+        streaming_wav_paths,
+        streaming_keys,
+    ) = _run_streaming(voice_file_path, tmp_dir, asr_model_id, stream_chunk_seconds)
+    wav_match, canonical_wav_match = [
+        _read_file(x) == _read_file(y)
+        for x, y in zip(memory_wav_paths, streaming_wav_paths)
+    ]
+    return {
+        "memory_sample_width": memory_sample_width,
+        "streaming_sample_width": streaming_sample_width,
+        "segments": len(memory_segments),
+        "segments_match": memory_segments == streaming_segments,
+        "wav_match": wav_match,
+        "canonical_wav_match": canonical_wav_match,
+        "cache_key_match": memory_keys == streaming_keys,
+        "transcript_match": (
+            _compare_transcripts(voice_file_path, tmp_dir, stream_chunk_seconds)
+            if with_transcript
+            else ""
+        ),
+    }
+
+
+def main(
+    input_data_dir,
+    output_path,
+    stream_chunk_seconds=STREAM_CHUNK_SECONDS,
+    with_synthetic=True,
+    with_transcript=False,
+):
+    """
+    被験者の音声（と合成したAACの音声）について、音声全体を読み込む前処理と--streamingの前処理で
+    サンプル幅・発話区間・前処理済みの音声（--canonical_audioを含む）のバイト列・テキストのキャッシュのキーが一致するかを確認する
+    キャッシュのキーはテキスト化に入力するPCMのハッシュなので、一致すればテキストも一致する
+    with_transcriptがTrueなら、実際にテキスト化した結果も比較する（reazonspeechが必要）
+    """
+    voice_files = get_subject_voice_files(input_data_dir)
+    logger.info(f"{len(voice_files)}個の音声を比較します")
+
+    columns = [
+        "data_id",
+        "memory_sample_width",
+        "streaming_sample_width",
+        "segments",
+        "segments_match",
+        "wav_match",
+        "canonical_wav_match",
+        "cache_key_match",
+        "transcript_match",
+    ]
+    mismatch_count = 0
+    case_count = 0
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(
+        output_path, mode="w", encoding="utf-8", newline=""
+    ) as f, tempfile.TemporaryDirectory() as tmp_dir:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        if with_synthetic:
+            for frame_rate, channels in SYNTHETIC_FORMATS:
+                data_id = f"synthetic_aac_{frame_rate}Hz_{channels}ch"
+                voice_file_path = os.path.join(tmp_dir, f"{data_id}.m4a")
+                _make_synthetic_aac(voice_file_path, frame_rate, channels)
+                voice_files.append((data_id, voice_file_path))
+        for data_id, voice_file_path in voice_files:
+            row = _compare(
+                voice_file_path, tmp_dir, stream_chunk_seconds, with_transcript
+            )
+            writer.writerow({"data_id": data_id, **row})
+            case_count += 1
+            is_match = row["memory_sample_width"] == row[
+                "streaming_sample_width"
+            ] and all(
+                row[x] is not False
+                for x in [
+                    "segments_match",
+                    "wav_match",
+                    "canonical_wav_match",
+                    "cache_key_match",
+                    "transcript_match",
+                ]
+            )
+            if not is_match:
+                mismatch_count += 1
+                logger.warning(
+                    f"{data_id}で--streamingの出力が一致しませんでした：{row}"
+                )
+            else:
+                logger.info(
+                    f"{data_id}：{row['segments']}個の発話区間と前処理済みの音声が一致しました"
+                    f"（{row['memory_sample_width'] * 8}bit）"
+                )
+
+    logger.info(
+        f"{case_count}個の音声のうち、--streamingの出力が一致しなかったもの：{mismatch_count}個"
+    )
+    logger.info(f"結果を{output_path}に保存しました")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--input_data_dir",
+        help="生データを格納しているディレクトリ",
+        type=str,
+        default="../data/raw",
+    )
+    parser.add_argument(
+        "--output_path",
+        help="音声ごとの比較結果を保存するCSVファイル",
+        type=str,
+        default="../data/preprocessed/streaming_parity.csv",
+    )
+    parser.add_argument(
+        "--stream_chunk_seconds",
+        default=STREAM_CHUNK_SECONDS,
+        type=float,
+        help="ストリーミングでデコードする際に一度に読み込む秒数",
+    )
+    parser.add_argument(
+        "--no_synthetic",
+        action="store_false",
+        dest="with_synthetic",
+        help="合成したAAC（m4a）の音声での比較を行わない",
+    )
+    parser.add_argument(
+        "--with_transcript",
+        action="store_true",
+        help="ReazonSpeechでテキスト化した結果も比較するか否か",
+    )
+
+    args = parser.parse_args()
+    input_data_dir = args.input_data_dir
+    output_path = args.output_path
+    stream_chunk_seconds = args.stream_chunk_seconds
+    with_synthetic = args.with_synthetic
+    with_transcript = args.with_transcript
+
+    logger.info(f"入力ディレクトリ：{input_data_dir}")
+    main(
+        input_data_dir,
+        output_path,
+        stream_chunk_seconds,
+        with_synthetic,
+        with_transcript,
+    )
@@ -0,0 +1,225 @@
+import os
+import csv
+import argparse
+import time
+import numpy as np
+from pydub import AudioSegment
+from logzero import logger
+from silence import (
+    MIN_SILENCE_LEN,
+    SILENCE_THRESH,
+    IGNORE_SEGMENTS_MILLI_SECONDS,
+    get_ms_energy,
+    sweep_nonsilent,
+)
+from utils import get_subject_voice_files, get_counsellor_voice_files
+
+# 発話区間の長さのヒストグラムの区切り（秒）
+HISTOGRAM_BIN_SECONDS = [0, 1, 2, 3, 5, 10, 20, 30, 60]
+
+
+def _get_histogram_columns():
+    """
+    ヒストグラムの各ビンの列名を作成する
+    """
+    columns = []
+    for low, high in zip(HISTOGRAM_BIN_SECONDS, HISTOGRAM_BIN_SECONDS[1:]):
+        columns.append(f"{low}-{high}s")
+    columns.append(f"{HISTOGRAM_BIN_SECONDS[-1]}s-")
+    return columns
+
+
+def _get_sweep_rows(energy, min_silence_lens, silence_threshs, ignore_milli_seconds):
+    """
+    パラメータの全ての組み合わせについて発話区間の数・合計の長さ・長さのヒストグラムを計算する
+    """
+    bin_edges = np.array(HISTOGRAM_BIN_SECONDS) * 1000
+    ignore_milli_seconds = np.array(ignore_milli_seconds)
+    rows = []
+    for min_silence_len, silence_thresh, nonsilent_ranges in sweep_nonsilent(
+        energy, min_silence_lens, silence_threshs
+    ):
+        lengths = nonsilent_ranges[:, 1] - nonsilent_ranges[:, 0]
+        # 区間ごとのビンの番号は無視する長さによらないので一度だけ計算する
+        bin_indices = np.digitize(lengths, bin_edges[1:])
+        # 無視する長さごとに残る区間をまとめて判定する（_is_ignored_segmentと同じ条件）
+        is_kept = lengths[np.newaxis, :] >= ignore_milli_seconds[:, np.newaxis]
+        for ignore_milli_second, is_kept_row in zip(ignore_milli_seconds, is_kept):
+            histogram = np.bincount(
+                bin_indices[is_kept_row], minlength=len(HISTOGRAM_BIN_SECONDS)
+            )
+            rows.append(
+                {
+                    "min_silence_len": int(min_silence_len),
+                    "silence_thresh": silence_thresh,
+                    "ignore_milli_seconds": int(ignore_milli_second),
+                    "segments": int(is_kept_row.sum()),
+                    "speech_seconds": lengths[is_kept_row].sum() / 1000,
+                    "histogram": histogram.tolist(),
+                }
+            )
+    return rows
+
+
+def _log_summary(summary, total_seconds):
+    """
+    全データを合計した結果をパラメータの組み合わせごとに出力する
+    """
+    histogram_columns = _get_histogram_columns()
+    for (min_silence_len, silence_thresh, ignore_milli_second), row in summary.items():
+        speech_ratio = (
+            row["speech_seconds"] / total_seconds * 100 if total_seconds else 0
+        )
+        histogram = " ".join(
+            f"{column}:{count}"
+            for column, count in zip(histogram_columns, row["histogram"])
+        )
+        logger.info(
+            f"min_silence_len={min_silence_len} silence_thresh={silence_thresh} ignore={ignore_milli_second}："
+            f"発話区間{row['segments']}個、発話{row['speech_seconds']:.1f}秒（{speech_ratio:.1f}%） {histogram}"
+        )
+
+
+def main(
+    input_data_dir,
+    output_path,
+    min_silence_lens,
+    silence_threshs,
+    ignore_milli_seconds,
+    is_counsellor=False,
+):
+    """
+    音声ごとにエネルギーを一度だけ計算し、無音判定のパラメータの組み合わせごとの発話区間を集計する
+    テキスト化や音声・動画の書き出しは行わない
+    """
+    if is_counsellor:
+        voice_files = get_counsellor_voice_files(input_data_dir)
+    else:
+        voice_files = get_subject_voice_files(input_data_dir)
+    logger.info(
+        f"{len(voice_files)}個の音声について{len(min_silence_lens) * len(silence_threshs) * len(ignore_milli_seconds)}通りのパラメータを評価します"
+    )
+
+    histogram_columns = _get_histogram_columns()
+    summary = {}
+    total_seconds = 0
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, mode="w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "data_id",
+                "min_silence_len",
+                "silence_thresh",
+                "ignore_milli_seconds",
+                "segments",
+                "speech_seconds",
+                "total_seconds",
+            ]
+            + histogram_columns
+        )
+        for data_id, voice_file_path in voice_files:
+            start = time.perf_counter()
+            audio = AudioSegment.from_file(voice_file_path)
+            decode_seconds = time.perf_counter() - start
+            energy = get_ms_energy(audio)
+            del audio
+            rows = _get_sweep_rows(
+                energy, min_silence_lens, silence_threshs, ignore_milli_seconds
+            )
+            seconds = energy.seg_len / 1000
+            total_seconds += seconds
+            for row in rows:
+                writer.writerow(
+                    [
+                        data_id,
+                        row["min_silence_len"],
+                        row["silence_thresh"],
+                        row["ignore_milli_seconds"],
+                        row["segments"],
+                        row["speech_seconds"],
+                        seconds,
+                    ]
+                    + row["histogram"]
+                )
+                key = (
+                    row["min_silence_len"],
+                    row["silence_thresh"],
+                    row["ignore_milli_seconds"],
+                )
+                if key not in summary:
+                    summary[key] = {
+                        "segments": 0,
+                        "speech_seconds": 0,
+                        "histogram": np.zeros(len(histogram_columns), dtype=np.int64),
+                    }
+                summary[key]["segments"] += row["segments"]
+                summary[key]["speech_seconds"] += row["speech_seconds"]
+                summary[key]["histogram"] += row["histogram"]
+            logger.info(
+                f"{data_id}：デコード{decode_seconds:.1f}秒、評価{time.perf_counter() - start - decode_seconds:.1f}秒"
+            )
+
+    _log_summary(summary, total_seconds)
+    logger.info(f"結果を{output_path}に保存しました")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--input_data_dir",
+        help="生データを格納しているディレクトリ",
+        type=str,
+        default="../data/raw",
+    )
+    parser.add_argument(
+        "--output_path",
+        help="パラメータの組み合わせごとの発話区間の集計結果を保存するCSVファイル",
+        type=str,
+        default="../data/preprocessed/silence_sweep.csv",
+    )
+    parser.add_argument(
+        "--min_silence_lens",
+        nargs="+",
+        type=int,
+        default=[300, MIN_SILENCE_LEN, 800, 1000],
+        help="評価するmin_silence_len（ミリ秒）",
+    )
+    parser.add_argument(
+        "--silence_threshs",
+        nargs="+",
+        type=int,
+        default=[-60, -55, SILENCE_THRESH, -45, -40],
+        help="評価するsilence_thresh（dBFS）",
+    )
+    parser.add_argument(
+        "--ignore_milli_seconds",
+        nargs="+",
+        type=int,
+        default=[0, 500, IGNORE_SEGMENTS_MILLI_SECONDS, 1500],
+        help="評価する無視する発話区間の長さ（ミリ秒）",
+    )
+    parser.add_argument(
+        "--counsellor",
+        action="store_true",
+        dest="is_counsellor",
+        help="被験者ではなくカウンセラーの音声を評価するか否か",
+    )
+
+    args = parser.parse_args()
+    input_data_dir = args.input_data_dir
+    output_path = args.output_path
+    min_silence_lens = args.min_silence_lens
+    silence_threshs = args.silence_threshs
+    ignore_milli_seconds = args.ignore_milli_seconds
+    is_counsellor = args.is_counsellor
+
+    logger.info(f"入力ディレクトリ：{input_data_dir}")
+    main(
+        input_data_dir,
+        output_path,
+        min_silence_lens,
+        silence_threshs,
+        ignore_milli_seconds,
+        is_counsellor,
+    )
@@ -0,0 +1,107 @@
+import hashlib
+import os
+import sqlite3
+import time
+from logzero import logger
+
+# キャッシュに保存する発話テキストの最大件数（超えた場合は最後に使われた時刻が古いものから削除する）
+DEFAULT_MAX_ENTRIES = 500000
+
+
+def get_transcript_key(utterance, model_id):
+    """
+    発話区間の音声のPCMデータとモデルからキャッシュのキーを作成する
+    """
+    sha256 = hashlib.sha256()
+    sha256.update(
+        f"{model_id}:{utterance.frame_rate}:{utterance.channels}:{utterance.sample_width}:".encode()
+    )
+    sha256.update(utterance.raw_data)
+    return sha256.hexdigest()
+
+
+class TranscriptCache:
+    """
+    発話区間の音声ごとのテキスト化結果をSQLiteに保存するキャッシュ
+    """
+
+    def __init__(self, cache_path, max_entries=DEFAULT_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # 並列実行時は複数のプロセスから同じファイルに書き込むため、ロックを待てるようにする
+        self.connection = sqlite3.connect(cache_path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS transcripts ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS transcripts_last_used ON transcripts (last_used)"
+        )
+        self.connection.commit()
+
+    def get(self, key):
+        """
+        キャッシュされたテキストを取得する（なければNoneを返す）
+        """
+        row = self.connection.execute(
+            "SELECT text FROM transcripts WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute(
+            "UPDATE transcripts SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        self.connection.commit()
+        return row[0]
+
+    def put(self, key, text):
+        """
+        テキストをキャッシュに保存する
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO transcripts (key, text, last_used) VALUES (?, ?, ?)",
+            (key, text, time.time()),
+        )
+        self.connection.commit()
+
+    def log_stats(self):
+        """
+        キャッシュのヒット数・ミス数を出力する
+        """
+        total = self.hits + self.misses
+        hit_rate = self.hits / total * 100 if total > 0 else 0
+        logger.info(
+            f"テキスト化のキャッシュ：ヒット{self.hits}件、ミス{self.misses}件（ヒット率{hit_rate:.1f}%）"
+        )
+
+    def evict(self):
+        """
+        最大件数を超えた分を最後に使われた時刻が古いものから削除する
+        """
+        (count,) = self.connection.execute(
+            "SELECT COUNT(*) FROM transcripts"
+        ).fetchone()
+        if count <= self.max_entries:
+            return
+        self.connection.execute(
+            "DELETE FROM transcripts WHERE key IN ("
+            "SELECT key FROM transcripts ORDER BY last_used ASC LIMIT ?)",
+            (count - self.max_entries,),
+        )
+        self.connection.commit()
+        logger.info(
+            f"テキスト化のキャッシュから{count - self.max_entries}件を削除しました"
+        )
+
+    def close(self):
+        """
+        上限を超えた分を削除してからキャッシュを閉じる
+        """
+        self.evict()
+        self.connection.close()
@@ -1,8 +1,20 @@
-import glob
 import os
 import random
+import sys
 import numpy as np
 import torch
+import logzero
+
+# リポジトリ直下のcommon/（特徴量抽出と共有するモジュール）を読み込めるようにする
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common.catalog import get_data_files
+from common.models import (
+    set_device,
+    set_num_threads,
+    register_model,
+    get_model,
+    log_model_load_seconds,
+)
 
 # NOTE: ファイルパターンが変われば追加する
 subject_voice_file_patterns = [
@@ -12,6 +24,8 @@ subject_voice_file_patterns = [
     "被験者.m4a",
 ]
 
+# macOSで作成したファイル名は濁点が分解された形（NFD）になるため、アバターは
+# NFD（"ハ"+結合用濁点）とNFC（"バ"）の両方のパターンを持つ（見た目は同じだが別の文字列）
 counsellor_voice_file_patterns = [
     "*_zoom_音声_アバター.m4a",
     "*_zoom_音声_アバター.m4a",
@@ -20,38 +34,41 @@ counsellor_voice_file_patterns = [
 
 
 def get_subject_voice_files(input_data_dir):
-    result = []
-    for pattern in subject_voice_file_patterns:
-        full_pattern = os.path.join(input_data_dir, "*", pattern)
-        file_paths = glob.glob(full_pattern, recursive=True)
-        for file_path in file_paths:
-            data_id = os.path.relpath(file_path, input_data_dir).split(os.sep)[0]
-            result.append((data_id, file_path))
-    result.sort()
-    return result
+    return get_data_files(input_data_dir, subject_voice_file_patterns)
 
 
 def get_counsellor_voice_files(input_data_dir):
-    result = []
-    for pattern in counsellor_voice_file_patterns:
-        full_pattern = os.path.join(input_data_dir, "*", pattern)
-        file_paths = glob.glob(full_pattern, recursive=True)
-        for file_path in file_paths:
-            data_id = os.path.relpath(file_path, input_data_dir).split(os.sep)[0]
-            result.append((data_id, file_path))
-    result.sort()
-    return result
+    return get_data_files(input_data_dir, counsellor_voice_file_patterns)
 
 
 def get_video_files(input_data_dir):
-    pattern = os.path.join(input_data_dir, "*", "*.mp4")
-    file_paths = glob.glob(pattern, recursive=True)
-    result = []
-    for file_path in file_paths:
-        data_id = os.path.relpath(file_path, input_data_dir).split(os.sep)[0]
-        result.append((data_id, file_path))
-    result.sort()
-    return result
+    return get_data_files(input_data_dir, ["*.mp4"])
+
+
+def get_missing_modalities(input_data_dir):
+    """
+    データIDごとに見つからなかったファイルの種類を取得する
+    """
+    modality_files = {
+        "被験者の音声": get_subject_voice_files(input_data_dir),
+        "カウンセラーの音声": get_counsellor_voice_files(input_data_dir),
+        "動画": get_video_files(input_data_dir),
+    }
+    modality_data_ids = {
+        modality: {data_id for data_id, _ in files}
+        for modality, files in modality_files.items()
+    }
+    data_ids = set().union(*modality_data_ids.values())
+    missing_modalities = {}
+    for data_id in sorted(data_ids):
+        missing = [
+            modality
+            for modality, ids in modality_data_ids.items()
+            if data_id not in ids
+        ]
+        if missing:
+            missing_modalities[data_id] = missing
+    return missing_modalities
 
 
 def set_random_seed(seed=42):
@@ -62,3 +79,14 @@ def set_random_seed(seed=42):
         torch.cuda.manual_seed_all(seed)
         torch.backends.cudnn.deterministic = True
         torch.backends.cudnn.benchmark = False
+
+
+def set_log_session(data_id):
+    """
+    どのデータIDのログか分かるようにログの先頭にデータIDを付ける
+    """
+    logzero.formatter(
+        logzero.LogFormatter(
+            fmt=f"%(color)s[%(levelname)1.1s %(asctime)s {data_id} %(module)s:%(lineno)d]%(end_color)s %(message)s"
+        )
+    )
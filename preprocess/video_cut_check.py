@@ -0,0 +1,183 @@
+import os
+import csv
+import argparse
+import errno
+import subprocess
+import tempfile
+import time
+import imageio_ffmpeg
+from logzero import logger
+from main import VIDEO_FPS, _get_select_expr, _get_video
+
+# Linuxのコマンドライン引数1つの長さの上限（MAX_ARG_STRLEN）
+MAX_ARG_STRLEN = 128 * 1024
+# 合成する動画の大きさと音声のサンプリングレート
+VIDEO_SIZE = "64x64"
+AUDIO_SAMPLE_RATE = 8000
+
+
+def _make_synthetic_video(video_path, seconds):
+    """
+    テストパターンの映像と正弦波の音声からなる合成動画を作成する
+    """
+    command = [
+        imageio_ffmpeg.get_ffmpeg_exe(),
+        "-y",
+        "-loglevel",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc2=size={VIDEO_SIZE}:rate={VIDEO_FPS}:duration={seconds}",
+        "-f",
+        "lavfi",
+        "-i",
+        f"sine=frequency=440:sample_rate={AUDIO_SAMPLE_RATE}:duration={seconds}",
+        "-c:v",
+        "libx264",
+        "-pix_fmt",
+        "yuv420p",
+        "-c:a",
+        "aac",
+        video_path,
+    ]
+    subprocess.run(command, check=True)
+
+
+def _make_speech_segments(segment_count, segment_milli_seconds, gap_milli_seconds):
+    """
+    一定の長さの発話区間（ミリ秒）を一定の間隔で並べる
+    """
+    period = segment_milli_seconds + gap_milli_seconds
+    return [
+        (i * period, i * period + segment_milli_seconds) for i in range(segment_count)
+    ]
+
+
+def _is_inline_e2big(select_expr):
+    """
+    以前と同じくフィルタの式をコマンドライン引数に直接渡した場合に、引数が長すぎて起動できないかを確認する
+    """
+    try:
+        subprocess.run(
+            [
+                imageio_ffmpeg.get_ffmpeg_exe(),
+                "-version",
+                "-filter_complex",
+                select_expr,
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError as e:
+        if e.errno == errno.E2BIG:
+            return True
+        raise
+    return False
+
+
+def main(
+    output_path, segment_count=5000, segment_milli_seconds=100, gap_milli_seconds=100
+):
+    """
+    コマンドライン引数1つの上限を超える長さのフィルタの式になる数の発話区間で、
+    合成動画から発話区間の動画を切り抜けるか（フレーム数が発話区間の合計と一致するか）を確認する
+    """
+    speech_segments = _make_speech_segments(
+        segment_count, segment_milli_seconds, gap_milli_seconds
+    )
+    select_expr = _get_select_expr(speech_segments)
+    seconds = speech_segments[-1][1] / 1000 + 1
+    expected_frames = round(
+        sum(end - start for start, end in speech_segments) / 1000 * VIDEO_FPS
+    )
+    inline_e2big = _is_inline_e2big(select_expr)
+    logger.info(
+        f"{segment_count}個の発話区間のフィルタの式は{len(select_expr)}文字です"
+        f"（上限{MAX_ARG_STRLEN}文字、直接渡した場合に起動できない：{inline_e2big}）"
+    )
+    if len(select_expr) <= MAX_ARG_STRLEN:
+        logger.warning(
+            "フィルタの式がコマンドライン引数の上限を超えていないため、--segment_countを増やしてください"
+        )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = os.path.join(tmp_dir, "synthetic.mp4")
+        video_output_path = os.path.join(tmp_dir, "cut.mp4")
+        logger.info(f"{seconds:.0f}秒の合成動画を作成しています...")
+        _make_synthetic_video(video_path, seconds)
+        start = time.perf_counter()
+        _get_video(video_path, speech_segments, video_output_path)
+        cut_seconds = time.perf_counter() - start
+        frame_count, _ = imageio_ffmpeg.count_frames_and_secs(video_output_path)
+
+    is_match = frame_count == expected_frames
+    if not is_match:
+        logger.warning(
+            f"切り抜いた動画のフレーム数{frame_count}が発話区間の合計{expected_frames}と一致しません"
+        )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, mode="w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "segments",
+                "select_expr_length",
+                "inline_e2big",
+                "expected_frames",
+                "frames",
+                "match",
+                "cut_seconds",
+            ]
+        )
+        writer.writerow(
+            [
+                segment_count,
+                len(select_expr),
+                inline_e2big,
+                expected_frames,
+                frame_count,
+                is_match,
+                cut_seconds,
+            ]
+        )
+    logger.info(
+        f"{frame_count}フレーム（期待値{expected_frames}）、切り抜き{cut_seconds:.1f}秒"
+    )
+    logger.info(f"結果を{output_path}に保存しました")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--output_path",
+        help="確認の結果を保存するCSVファイル",
+        type=str,
+        default="../data/preprocessed/video_cut_check.csv",
+    )
+    parser.add_argument(
+        "--segment_count",
+        default=5000,
+        type=int,
+        help="合成する発話区間の数",
+    )
+    parser.add_argument(
+        "--segment_milli_seconds",
+        default=100,
+        type=int,
+        help="合成する発話区間の長さ（ミリ秒）",
+    )
+    parser.add_argument(
+        "--gap_milli_seconds",
+        default=100,
+        type=int,
+        help="合成する発話区間の間の長さ（ミリ秒）",
+    )
+
+    args = parser.parse_args()
+    output_path = args.output_path
+    segment_count = args.segment_count
+    segment_milli_seconds = args.segment_milli_seconds
+    gap_milli_seconds = args.gap_milli_seconds
+
+    main(output_path, segment_count, segment_milli_seconds, gap_milli_seconds)